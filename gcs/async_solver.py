@@ -0,0 +1,138 @@
+"""
+async_solver: asyncio front end to a GCS for interactive clients
+
+Edits made through an `AsyncGCS` are queued instead of being applied
+to the underlying GCS immediately, and repeated edits of the same value
+are coalesced so that only the latest one is applied. `update` applies
+the queued edits and solves in an executor, off the event loop.
+
+If a newer edit arrives while a solve is in flight, the solve is
+cancelled at the next equation set boundary. Sets that were already
+solved keep their values, the new edits are applied, and solving
+resumes from there. Only results that reflect every edit made so far
+are published. A solve that fails publishes nothing: the equation set
+that failed is kept in `failed` until a later solve succeeds.
+"""
+
+import asyncio
+
+
+class AsyncGCS(object):
+    """
+    Latest-wins asyncio wrapper around a GCS
+
+    Parameters
+    ----------
+    gcs: GCS
+        the geometric constraint solver to drive
+    executor
+        `concurrent.futures` executor to solve in (defaults to the
+        event loop's default executor)
+    """
+
+    __slots__ = (
+        "gcs",  # underlying GCS
+        "executor",  # executor that solves are run in
+        "pending",  # queued edits: key -> (func, args)
+        "generation",  # incremented each time an edit is queued
+        "lock",  # serializes solves
+        "result",  # latest published values: var -> val
+        "result_generation",  # generation that `result` reflects
+        "failed",  # equation set whose solve failed (or None)
+        "failed_generation",  # generation that `failed` reflects
+    )
+
+    def __init__(self, gcs, executor=None):
+        self.gcs = gcs
+        self.executor = executor
+
+        self.pending = {}
+        self.generation = 0
+
+        self.lock = None
+        self.result = None
+        self.result_generation = -1
+        self.failed = None
+        self.failed_generation = -1
+
+    # --------------------------------------------
+    # edits
+    # --------------------------------------------
+
+    def _queue(self, key, func, args):
+        """
+        Queue an edit, replacing a pending edit with the same key
+
+        A replaced edit keeps its place in the queue, so it stays in
+        order with the edits queued around it
+        """
+        self.pending[key] = (func, args)
+        self.generation += 1
+
+    def modify_set_constraint(self, cstr, val):
+        """Queue a modification of the value of a "set" constraint"""
+        self._queue(
+            ("modify_set_constraint", cstr), self.gcs.modify_set_constraint, (cstr, val)
+        )
+
+    def modify_variable(self, var, val):
+        """Queue a modification of the value of a variable"""
+        self._queue(("modify_variable", var), self.gcs.modify_variable, (var, val))
+
+    def edit(self, func, *args):
+        """
+        Queue an arbitrary edit, like `edit(gcs.add_constraint, cstr)`
+
+        These edits are never coalesced and are applied in order
+        """
+        self._queue(object(), func, args)
+
+    # --------------------------------------------
+    # update
+    # --------------------------------------------
+
+    def is_current(self):
+        """Does the published result reflect every queued edit?"""
+        return self.result_generation == self.generation
+
+    def is_failed(self):
+        """Did solving the queued edits fail (see `failed`)?"""
+        return self.failed_generation == self.generation
+
+    async def update(self):
+        """
+        Apply queued edits and solve, returning the latest consistent values
+
+        Concurrent calls share solves: a call that waited for another
+        solve to finish returns its result if no edits came in since.
+        If the solve fails, the last consistent values are returned, and
+        the set that failed is kept in `failed` (see `is_failed`).
+        """
+        loop = asyncio.get_event_loop()
+
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            while not (self.is_current() or self.is_failed()):
+                generation = self.generation
+
+                edits, self.pending = self.pending, {}
+                for func, args in edits.values():
+                    func(*args)
+
+                done = await loop.run_in_executor(
+                    self.executor,
+                    self.gcs.update,
+                    lambda: self.generation != generation,
+                )
+
+                if done:
+                    self.result = {var: var.val for var in self.gcs.solver.vars}
+                    self.result_generation = generation
+                    self.failed = None
+                elif self.gcs.solver.failed_set is not None:
+                    self.failed = self.gcs.solver.failed_set
+                    self.failed_generation = generation
+
+            return self.result
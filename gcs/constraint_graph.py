@@ -3,6 +3,8 @@
 import igraph
 from matplotlib import cm
 
+from .graph_export import eqn_set_graph
+
 
 def create_solver_graph(gs, cmap=cm.rainbow):
     """
@@ -26,12 +28,16 @@ def create_solver_graph(gs, cmap=cm.rainbow):
     # var_idx = dict(map(op.itemgetter(1, 0), enumerate(var_list)))
     # eqn_idx = dict(map(op.itemgetter(1, 0), enumerate(eqn_list, len(var_list))))
     var_idx = {var: i for i, var in enumerate(var_list)}
-    eqn_idx = {eqn: i + len(var_list) for i, eqn in enumerate(eqn_list)}
 
-    g = igraph.Graph(len(var_list) + len(eqn_list))
+    # build all edges up front and create the graph in one call
+    edges = [
+        (i, var_idx[var])
+        for i, eqn in enumerate(eqn_list, len(var_list))
+        for var in eqn.all_vars
+        if var in var_idx
+    ]
 
-    for eqn in gs.eqns:
-        g.add_edges((eqn_idx[eqn], var_idx[var]) for var in eqn.all_vars)
+    g = igraph.Graph(n=len(var_list) + len(eqn_list), edges=edges)
 
     g.vs["label"] = [var.name for var in var_list] + [eqn.name for eqn in eqn_list]
 
@@ -40,23 +46,17 @@ def create_solver_graph(gs, cmap=cm.rainbow):
     # rectangle, circle, hidden, triangle_up, triangle_down, aliases...
     # X11 colors, hex string, tuple
 
+    # one color per equation set, looked up per vertex
     eqn_set_list = list(gs.eqn_sets)
-    eqn_set_idx = {eqn_set: i for i, eqn_set in enumerate(eqn_set_list)}
-
-    g.vs["color"] = [
-        cmap(
-            0.3
-            if var.solved_by is None
-            else float(eqn_set_idx[var.solved_by]) / len(eqn_set_list)
-        )
-        for var in var_list
-    ] + [
-        cmap(
-            0.6
-            if eqn.eqn_set is None
-            else float(eqn_set_idx[eqn.eqn_set]) / len(eqn_set_list)
-        )
-        for eqn in eqn_list
+    n_sets = len(eqn_set_list)
+    set_colors = {
+        eqn_set: cmap(float(i) / n_sets) for i, eqn_set in enumerate(eqn_set_list)
+    }
+    var_default = cmap(0.3)
+    eqn_default = cmap(0.6)
+
+    g.vs["color"] = [set_colors.get(var.solved_by, var_default) for var in var_list] + [
+        set_colors.get(eqn.eqn_set, eqn_default) for eqn in eqn_list
     ]
 
     g.vs["edge_color"] = [
@@ -68,3 +68,39 @@ def create_solver_graph(gs, cmap=cm.rainbow):
     # size, width
 
     return g
+
+
+def create_eqn_set_graph(gs, cmap=cm.rainbow):
+    """
+    Returns an igraph graph of the equation sets of a solved solver
+
+    Each vertex is an equation set, and edges point from the set
+    that solves a var to the sets that require it. Vertex size
+    grows with the number of equations in the set
+
+    Parameters
+    ----------
+    gs
+        Geom solver instance
+    cmap
+        Color map to use to color graph vertices
+    """
+    nodes, edges = eqn_set_graph(gs)
+    nodes = list(nodes)
+
+    node_idx = {node_id: i for i, (node_id, attrs) in enumerate(nodes)}
+
+    g = igraph.Graph(
+        n=len(nodes),
+        edges=[(node_idx[s], node_idx[t]) for s, t in edges],
+        directed=True,
+    )
+
+    g.vs["label"] = [attrs["label"] for node_id, attrs in nodes]
+    g.vs["shape"] = [
+        "square" if attrs["constrained"] else "circle" for node_id, attrs in nodes
+    ]
+    g.vs["color"] = [cmap(float(i) / max(len(nodes), 1)) for i in range(len(nodes))]
+    g.vs["size"] = [20 + 5 * attrs["n_eqns"] for node_id, attrs in nodes]
+
+    return g
@@ -1,9 +1,283 @@
+import json
+import timeit
+from collections import Counter
+
+import numpy as np
 import scipy.optimize as opt
 
 from .solve_elements import EqnSet
 
+# ------------------------------------------------------------------------------
+# Solver Strategy
+# ------------------------------------------------------------------------------
+
+# name of the `scipy.optimize.root` option that bounds the work of each method
+BUDGET_OPTIONS = {
+    "hybr": "maxfev",
+    "lm": "maxiter",
+    "broyden1": "maxiter",
+    "broyden2": "maxiter",
+    "anderson": "maxiter",
+    "krylov": "maxiter",
+    "df-sane": "maxfev",
+}
 
-def solve_numeric(eqn_set: EqnSet, ftol=1.0e-10):
+
+class SolverStrategy(object):
+    """
+    Portfolio of numeric root finding methods that can learn which one works
+
+    By default (`learn` false) the methods are tried in the order of the
+    configured chain, `hybr` then `lm`, so which root a set converges to
+    doesn't depend on earlier solves (or their timing), and nothing is
+    recorded. A learning strategy records, for each equation set
+    signature (number of vars and the kinds of constraints in the set),
+    how often each method succeeded and how long it took, and tries
+    methods in order of their historical performance for the signature,
+    falling back along the chain. The learned table can be saved and
+    loaded as json.
+
+    Parameters
+    ----------
+    methods
+        fallback chain of `scipy.optimize.root` methods, in default order
+    budgets
+        maximum number of function evaluations/iterations per attempt,
+        keyed by method (methods not in the dict are unbounded)
+    restart
+        if true, make a last attempt from the initial guess with each
+        method after the chain fails from the previous attempt's result
+    scale
+        if true, solve in scaled variables and residuals (see
+        `scale_factors`), and only if that fails, unscaled
+    sparse
+        if true, give hybr/lm a finite difference Jacobian that perturbs
+        structurally independent vars together (see `column_coloring`)
+        whenever that takes fewer evaluations than one per var (on by
+        default)
+    learn
+        if true, record the results of attempts and order the methods
+        by the recorded table (see `order`)
+    """
+
+    __slots__ = (
+        "methods",  # fallback chain of methods
+        "budgets",  # per-attempt evaluation budget for each method
+        "restart",  # retry from the initial guess after the chain fails
+        "scale",  # solve in scaled space
+        "sparse",  # use colored finite difference Jacobians
+        "learn",  # order methods by the recorded table
+        "table",  # signature -> method -> [successes, failures, total time]
+        "counts",  # Counter of solves, attempts, fallbacks, unscaled, failures, nfev
+    )
+
+    def __init__(
+        self,
+        methods=("hybr", "lm"),
+        budgets=None,
+        restart=True,
+        scale=False,
+        sparse=True,
+        learn=False,
+    ):
+        self.methods = tuple(methods)
+        self.budgets = dict(budgets or {})
+        self.restart = restart
+        self.scale = scale
+        self.sparse = sparse
+        self.learn = learn
+        self.table = {}
+        self.counts = Counter()
+
+    @staticmethod
+    def signature(eqn_set):
+        """Hashable description of an equation set: size and constraint kinds"""
+        kinds = Counter(
+            type(eqn.parent).__name__ if eqn.parent is not None else "Eqn"
+            for eqn in eqn_set.eqns
+        )
+        return (len(eqn_set.vars),) + tuple(sorted(kinds.items()))
+
+    def order(self, signature):
+        """Methods in the order they should be tried for a signature"""
+        if not self.learn:
+            return list(self.methods)
+
+        stats = self.table.get(signature, {})
+
+        def rank(method):
+            n_success, n_fail, t = stats.get(method, (0, 0, 0.0))
+            if n_success == 0:
+                # methods that never worked keep their place in the chain
+                return (1, n_fail, self.methods.index(method))
+            return (0, -n_success / (n_success + n_fail), t / n_success)
+
+        return sorted(self.methods, key=rank)
+
+    def options(self, method):
+        """Options passed to `scipy.optimize.root` for a single attempt"""
+        if method in self.budgets and method in BUDGET_OPTIONS:
+            return {BUDGET_OPTIONS[method]: self.budgets[method]}
+        return {}
+
+    def record(self, signature, method, success, t):
+        """Record the result of a single attempt (if the strategy learns)"""
+        if not self.learn:
+            return
+
+        stats = self.table.setdefault(signature, {})
+        n_success, n_fail, t_total = stats.get(method, (0, 0, 0.0))
+
+        if success:
+            stats[method] = (n_success + 1, n_fail, t_total + t)
+        else:
+            stats[method] = (n_success, n_fail + 1, t_total)
+
+    def save(self, path):
+        """Write the learned table to a json file"""
+        rows = [
+            {
+                "signature": [sig[0], [list(kind) for kind in sig[1:]]],
+                "method": method,
+                "stats": list(stats),
+            }
+            for sig, methods in self.table.items()
+            for method, stats in methods.items()
+        ]
+        with open(path, "w") as f:
+            json.dump(rows, f)
+
+    def load(self, path):
+        """Merge a learned table from a json file into this one"""
+        with open(path) as f:
+            rows = json.load(f)
+
+        for row in rows:
+            n_vars, kinds = row["signature"]
+            sig = (n_vars,) + tuple((name, n) for name, n in kinds)
+            self.table.setdefault(sig, {})[row["method"]] = tuple(row["stats"])
+
+
+# strategy used by `solve_numeric` when none is given
+#   (it doesn't learn: one shared table would make the method order, and
+#   so the roots found, depend on every solve in the process)
+default_strategy = SolverStrategy()
+
+# ------------------------------------------------------------------------------
+# Numeric Solving
+# ------------------------------------------------------------------------------
+
+
+def column_coloring(eqn_list, var_list):
+    """
+    Group the vars of a system so that no two vars in a group share an eqn
+
+    This is the Curtis-Powell-Reid grouping: perturbing all vars of a
+    group at once changes each equation through at most one of them,
+    so one evaluation per group gives a full finite difference Jacobian.
+    Vars are colored greedily, most connected first.
+
+    Returns
+    -------
+    groups: list of lists of int
+        column (var) indices in each group
+    col_rows: list of lists of int
+        row (eqn) indices that depend on each column
+    """
+    var_idx = {var: j for j, var in enumerate(var_list)}
+    rows = [
+        [var_idx[var] for var in eqn.all_vars if var in var_idx] for eqn in eqn_list
+    ]
+
+    col_rows = [[] for _ in var_list]
+    for i, cols in enumerate(rows):
+        for j in cols:
+            col_rows[j].append(i)
+
+    colors = [-1] * len(var_list)
+    for j in sorted(range(len(var_list)), key=lambda j: -len(col_rows[j])):
+        used = set(colors[k] for i in col_rows[j] for k in rows[i])
+        color = 0
+        while color in used:
+            color += 1
+        colors[j] = color
+
+    groups = [[] for _ in range(max(colors) + 1)] if colors else []
+    for j, color in enumerate(colors):
+        groups[color].append(j)
+
+    return groups, col_rows
+
+
+def sparse_jacobian(F, groups, col_rows):
+    """
+    Finite difference Jacobian function of `F` using grouped columns
+
+    `groups` and `col_rows` come from `column_coloring`. The returned
+    function costs `len(groups) + 2` evaluations of `F`: one at `V`, one
+    per group, and one more to leave the values at `V`.
+    """
+
+    def jac(V):
+        V = np.asarray(V, dtype=float)
+        F0 = np.asarray(F(V), dtype=float)
+        J = np.zeros((len(F0), len(V)))
+        h = np.sqrt(np.finfo(float).eps) * np.maximum(np.abs(V), 1.0)
+
+        for cols in groups:
+            V1 = V.copy()
+            V1[cols] += h[cols]
+            dF = np.asarray(F(V1), dtype=float) - F0
+
+            for j in cols:
+                rows = col_rows[j]
+                J[rows, j] = dF[rows] / h[j]
+
+        F(V)  # restore the values at V
+        return J
+
+    return jac
+
+
+def scale_factors(F, V0, floor=1.0, jac=None):
+    """
+    Variable and residual scale factors of a system `F(V) = 0` at `V0`
+
+    Each variable is scaled by its magnitude (but at least `floor`), and
+    each residual by the norm of its row of the (forward difference, or
+    `jac` if given) Jacobian with respect to the scaled variables.
+    Solving `R * F(D * Z) = 0` for `Z` then works with variables and
+    residuals that are all of order one, whatever their units.
+
+    Returns
+    -------
+    D, R: ndarray
+        variable and residual scale factors
+    """
+    V0 = np.asarray(V0, dtype=float)
+    D = np.maximum(np.abs(V0), floor)
+
+    if jac is not None:
+        J = jac(V0) * D
+    else:
+        F0 = np.asarray(F(V0), dtype=float)
+        J = np.empty((len(F0), len(V0)))
+
+        for j in range(len(V0)):
+            h = np.sqrt(np.finfo(float).eps) * D[j]
+            V = V0.copy()
+            V[j] += h
+            J[:, j] = (np.asarray(F(V)) - F0) / h * D[j]
+
+        F(V0)  # restore the initial values
+
+    norms = np.sqrt((J * J).sum(axis=1))
+    R = 1.0 / np.where(norms > 0.0, norms, 1.0)
+
+    return D, R
+
+
+def solve_numeric(eqn_set: EqnSet, ftol=1.0e-10, strategy=None):
     """
     Solve an equation set numerically
 
@@ -13,6 +287,8 @@ def solve_numeric(eqn_set: EqnSet, ftol=1.0e-10):
         the equation set to solve
     ftol
         solver tolerance
+    strategy: SolverStrategy
+        method portfolio to use (defaults to `default_strategy`)
 
     Returns
     -------
@@ -33,26 +309,166 @@ def solve_numeric(eqn_set: EqnSet, ftol=1.0e-10):
                 return False
         return True
 
-    V0 = [var.val for var in var_list]
+    strategy = strategy or default_strategy
+    signature = strategy.signature(eqn_set) if strategy.learn else None
+
+    V0 = np.array([var.val for var in var_list], dtype=float)
 
     def F(V):
+        strategy.counts["nfev"] += 1
+
         for var, val in zip(var_list, V):
             var.val = val
 
         # TODO: added ability to solve underconstrained systems
         return [eqn() for eqn in eqn_list] + [0.0] * (len(var_list) - len(eqn_list))
 
-    # solve methods: hybr, lm, (krylov used to work)
-    sol = opt.root(F, V0, args=(), method="hybr")
-    VF = sol.x
+    # Jacobian from one evaluation per group of independent vars, if that
+    #   beats one per var (hybr/lm reuse the residuals they already have)
+    jac = None
+    if strategy.sparse:
+        groups, col_rows = column_coloring(eqn_list, var_list)
+        if len(groups) + 2 < len(var_list):
+            jac = sparse_jacobian(F, groups, col_rows)
+
+    # solve for Z in scaled space, where V = D * Z
+    #   (single variables are left alone, scaling can't help those)
+    scaled = strategy.scale and len(var_list) > 1
+    if scaled:
+        D, R = scale_factors(F, V0, jac=jac)
+    else:
+        D, R = np.ones(len(V0)), np.ones(len(V0))
+
+    def G(Z):
+        return R * np.asarray(F(D * Z))
+
+    def G_jac(Z):
+        return R[:, None] * jac(D * Z) * D
+
+    def attempt(method, V):
+        t = timeit.default_timer()
+        sol = opt.root(
+            G,
+            V / D,
+            args=(),
+            method=method,
+            jac=G_jac if jac is not None and method in ("hybr", "lm") else None,
+            options=strategy.options(method),
+        )
+        VF = D * sol.x
+        success = all(abs(f) < ftol for f in F(VF))
+        strategy.record(signature, method, success, timeit.default_timer() - t)
+        strategy.counts["attempts"] += 1
+        return success, VF
+
+    strategy.counts["solves"] += 1
+    methods = strategy.order(signature)
+    first_attempt = strategy.counts["attempts"]
+
+    def chain():
+        # each method in the chain starts from where the last one left off
+        VF = V0
+        for method in methods:
+            success, VF = attempt(method, VF)
+            if success:
+                return True
+
+        # last-ditch effort: start over from the initial guess
+        #   (the first method in the chain already started from there)
+        if strategy.restart:
+            for method in methods[1:]:
+                success, VF = attempt(method, V0)
+                if success:
+                    return True
+
+        return False
+
+    success = chain()
+
+    # scale factors taken at a poor initial guess can mislead every method:
+    #   try everything once more unscaled before giving up
+    if not success and scaled:
+        D, R = np.ones(len(V0)), np.ones(len(V0))
+        success = chain()
+        strategy.counts["unscaled"] += success
+
+    # a fallback: the first attempt didn't do it
+    strategy.counts["fallbacks"] += (
+        not success or strategy.counts["attempts"] > first_attempt + 1
+    )
+    strategy.counts["failures"] += not success
+    return success
+
+
+def solve_least_squares(eqn_set: EqnSet, targets, weight=1.0, ftol=1.0e-10):
+    """
+    Solve an underconstrained equation set as close as possible to targets
+
+    The equations and the weighted distances of the target vars to
+    their targets are minimized together in a least squares sense, and
+    the result is then projected back onto the equations with minimum
+    norm Gauss-Newton steps, so the equations hold while the vars stay
+    near the targets.
+
+    Parameters
+    ----------
+    eqn_set: EqnSet
+        the (solved, underconstrained) equation set
+    targets: dict
+        target value of some of the vars solved by the set
+    weight
+        weight of the target distances relative to the residuals
+    ftol
+        solver tolerance
+
+    Returns
+    -------
+    success: bool
+        true if the equations hold at the new values
+    """
+    eqn_list = list(eqn_set.eqns)
+    var_list = list(eqn_set.vars)
+
+    target_idx = [j for j, var in enumerate(var_list) if var in targets]
+    T = np.array([targets[var_list[j]] for j in target_idx], dtype=float)
+    sw = np.sqrt(weight)
+
+    V0 = np.array([var.val for var in var_list], dtype=float)
+
+    def F(V):
+        for var, val in zip(var_list, V):
+            var.val = val
+
+        return [eqn() for eqn in eqn_list]
+
+    jac = sparse_jacobian(F, *column_coloring(eqn_list, var_list))
+
+    def G(V):
+        return np.concatenate([F(V), sw * (V[target_idx] - T)])
+
+    def G_jac(V):
+        J = np.zeros((len(eqn_list) + len(target_idx), len(var_list)))
+        J[: len(eqn_list)] = jac(V)
+        J[len(eqn_list) + np.arange(len(target_idx)), target_idx] = sw
+        return J
+
+    V = V0
+    if target_idx:
+        V = opt.least_squares(G, V0, jac=G_jac, xtol=ftol).x
+
+    # project onto the equations (lstsq gives the smallest step)
+    for _ in range(20):
+        R = np.asarray(F(V), dtype=float)
+        if all(abs(r) < ftol for r in R):
+            return True
 
-    if any(abs(f) >= ftol for f in F(VF)):
-        sol = opt.root(F, VF, args=(), method="lm")
-        VF = sol.x
+        V = V - np.linalg.lstsq(jac(V), R, rcond=None)[0]
 
-    # TODO: could add last-ditch effort to use lm on V0
+    success = all(abs(f) < ftol for f in F(V))
+    if not success:
+        F(V0)  # keep the previous (consistent) values
 
-    return all(abs(f) < ftol for f in F(VF))
+    return success
 
 
 #    if sol.success:
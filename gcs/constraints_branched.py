@@ -0,0 +1,129 @@
+"""
+
+constraints - branch-locked versions of common geometric constraints
+
+The unsigned constraints use abs() and min() to accept every
+configuration (either side of a line, either orientation of an angle),
+which makes their residuals non-smooth exactly where Newton steps need
+derivatives. Here each constraint takes a branch `s` (+1 or -1) that
+selects one configuration, and returns a smooth signed residual for it.
+
+The `*_branch` functions return the branch that the given values are
+currently closest to, so a branch can be recorded from an initial guess.
+
+"""
+
+from math import hypot, atan2, pi
+
+
+def _sign(v):
+    return 1 if v >= 0.0 else -1
+
+
+# --------------------------------------------------------------------
+# basic
+# --------------------------------------------------------------------
+
+
+def distance_1D(x, d, s):
+    # s: +1 if x[1] is after x[0]
+    return s * (x[1] - x[0]) - d
+
+
+def distance_1D_branch(x, d):
+    return _sign(x[1] - x[0])
+
+
+def offset_line_point(x, d, s):
+    (x1, y1, x2, y2, x3, y3) = x  # 3rd point is the point
+
+    # s: side of the line the point is on (+1 is left of p1 -> p2)
+    dL = hypot(x2 - x1, y2 - y1)
+    cross = (y3 - y1) * (x2 - x1) - (x3 - x1) * (y2 - y1)
+
+    # same scaling as the unsigned residual (dL^2 * signed distance)
+    return dL * (cross - s * d * dL)
+
+
+def offset_line_point_branch(x, d):
+    (x1, y1, x2, y2, x3, y3) = x
+
+    return _sign((y3 - y1) * (x2 - x1) - (x3 - x1) * (y2 - y1))
+
+
+def _turn(ux, uy, vx, vy):
+    # angle from u to v, measured like the atan2(x, y) differences of
+    # the unsigned constraints, but continuous except at +-pi
+    return atan2(vx * uy - vy * ux, ux * vx + uy * vy)
+
+
+def _fold(a):
+    # the unsigned angles are differences of two atan2 values, so an
+    # angle a in (pi, 2pi) is the same configuration as 2pi - a
+    a = a % (2.0 * pi)
+    return 2.0 * pi - a if a > pi else a
+
+
+def angle_point4(x, a, s):
+    (x1, y1, x2, y2, x3, y3, x4, y4) = x
+
+    return s * _turn(x2 - x1, y2 - y1, x4 - x3, y4 - y3) - _fold(a)
+
+
+def angle_point4_branch(x, a):
+    (x1, y1, x2, y2, x3, y3, x4, y4) = x
+
+    return _sign(_turn(x2 - x1, y2 - y1, x4 - x3, y4 - y3))
+
+
+def angle_point3(x, a, s):
+    (x1, y1, x2, y2, x3, y3) = x  # 2nd point is the base of the angle
+
+    return s * _turn(x1 - x2, y1 - y2, x3 - x2, y3 - y2) - _fold(a)
+
+
+def angle_point3_branch(x, a):
+    (x1, y1, x2, y2, x3, y3) = x
+
+    return _sign(_turn(x1 - x2, y1 - y2, x3 - x2, y3 - y2))
+
+
+def angle_point2(x, a, s):
+    (x1, y1, x2, y2) = x
+
+    return s * atan2(x1 - x2, y1 - y2) - a
+
+
+def angle_point2_branch(x, a):
+    (x1, y1, x2, y2) = x
+
+    return _sign(atan2(x1 - x2, y1 - y2))
+
+
+# --------------------------------------------------------------------
+# non-basic
+# --------------------------------------------------------------------
+
+
+def tangent_line_circle(x, r, s):
+    # 3rd point is circle center
+    return offset_line_point(x, r, s)
+
+
+def tangent_line_circle_branch(x, r):
+    return offset_line_point_branch(x, r)
+
+
+def tangent_circle_circle(x, r1, r2, s):
+    # s: +1 for outside tangency, -1 for inside tangency
+    (x1, y1, x2, y2) = x
+
+    return hypot(x2 - x1, y2 - y1) - (r1 + s * r2)
+
+
+def tangent_circle_circle_branch(x, r1, r2):
+    (x1, y1, x2, y2) = x
+
+    d = hypot(x2 - x1, y2 - y1)
+
+    return 1 if abs(d - (r1 + r2)) <= abs(d - (r1 - r2)) else -1
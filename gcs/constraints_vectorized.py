@@ -0,0 +1,114 @@
+"""
+
+constraints - vectorized versions of common geometric constraints
+
+Each function evaluates one kind of constraint for many equations at
+once. `x` has one row per equation, holding the values of the
+equation's var list in the same order as the scalar functions (vars,
+then the constraint's parameter), and `c` has one row of per-equation
+constants (the branch of a locked constraint, a set value, ...).
+
+Row by row, the results are those of `constraints_unsigned` and
+`constraints_branched`.
+
+"""
+
+import numpy as np
+
+# --------------------------------------------------------------------
+# basic
+# --------------------------------------------------------------------
+
+
+def set_val(x, c):
+    return x[:, 0] - c[:, 0]
+
+
+def difference(x, c):
+    return x[:, 0] - x[:, 1]
+
+
+def distance(x, c):
+    # (x1, y1, x2, y2, d)
+    return np.hypot(x[:, 2] - x[:, 0], x[:, 3] - x[:, 1]) - x[:, 4]
+
+
+def distance_1D(x, c):
+    # (x1, x2, d)
+    return np.abs(x[:, 1] - x[:, 0]) - x[:, 2]
+
+
+def distance_1D_signed(x, c):
+    # c: (branch,)
+    return c[:, 0] * (x[:, 1] - x[:, 0]) - x[:, 2]
+
+
+def point_on_line(x, c):
+    (x1, y1, x2, y2, x3, y3) = x.T  # 3rd point is the point
+
+    return (y3 - y1) * (x2 - x1) - (x3 - x1) * (y2 - y1)
+
+
+def offset_line_point(x, c):
+    (x1, y1, x2, y2, x3, y3, d) = x.T
+
+    dL = np.hypot(x2 - x1, y2 - y1)
+
+    return np.minimum(
+        (dL * (y3 - y1) + d * (x2 - x1)) * (x2 - x1)
+        - (dL * (x3 - x1) - d * (y2 - y1)) * (y2 - y1),
+        (dL * (y3 - y1) - d * (x2 - x1)) * (x2 - x1)
+        - (dL * (x3 - x1) + d * (y2 - y1)) * (y2 - y1),
+    )
+
+
+def offset_line_point_signed(x, c):
+    (x1, y1, x2, y2, x3, y3, d) = x.T
+
+    dL = np.hypot(x2 - x1, y2 - y1)
+    cross = (y3 - y1) * (x2 - x1) - (x3 - x1) * (y2 - y1)
+
+    return dL * (cross - c[:, 0] * d * dL)
+
+
+def _turn(ux, uy, vx, vy):
+    return np.arctan2(vx * uy - vy * ux, ux * vx + uy * vy)
+
+
+def _fold(a):
+    a = np.mod(a, 2.0 * np.pi)
+    return np.where(a > np.pi, 2.0 * np.pi - a, a)
+
+
+def angle_point3(x, c):
+    (x1, y1, x2, y2, x3, y3, a) = x.T  # 2nd point is the base of the angle
+
+    return np.abs(np.arctan2(x3 - x2, y3 - y2) - np.arctan2(x1 - x2, y1 - y2)) - a
+
+
+def angle_point3_signed(x, c):
+    (x1, y1, x2, y2, x3, y3, a) = x.T
+
+    return c[:, 0] * _turn(x1 - x2, y1 - y2, x3 - x2, y3 - y2) - _fold(a)
+
+
+# --------------------------------------------------------------------
+# non-basic
+# --------------------------------------------------------------------
+
+
+def point_on_circle(x, c):
+    return distance(x, c)
+
+
+def line_length(x, c):
+    return distance(x, c)
+
+
+def tangent_line_circle(x, c):
+    # 3rd point is circle center
+    return offset_line_point(x, c)
+
+
+def tangent_line_circle_signed(x, c):
+    return offset_line_point_signed(x, c)
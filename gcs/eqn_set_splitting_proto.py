@@ -1,4 +1,5 @@
 # note: these functions are not used, see equation_solving instead
+#   (they are kept to compare against, see test/split_benchmark.py)
 
 from blist import sortedlist
 
@@ -13,7 +14,6 @@ def split_equation_set_v1(eqn_set):
     nEq = len(eqn_set.eqns)
 
     solve_sets = set()
-    underconstrained_set = EqnSet()
 
     # keep track of what has been visited
     unique_eqn_combos = set()
@@ -26,7 +26,7 @@ def split_equation_set_v1(eqn_set):
     while pq:
         eqn_set = pq.pop()
 
-        if eqn_set.is_solvable():
+        if eqn_set.is_constrained():
             # set this equation set as solved
             solve_sets.add(eqn_set)
             eqn_set.set_solved()
@@ -37,7 +37,7 @@ def split_equation_set_v1(eqn_set):
                 p.discard(eqn_set)
 
             # delete any empty eqn sets and re-sort the pq
-            pq = filter(lambda p: not p.is_empty(), pq)
+            pq = [p for p in pq if not p.is_empty()]
             pq.sort(key=lambda p: p.key(nEq))
 
             unique_eqn_combos = set(frozenset(eqs.eqns | eqs.vars) for eqs in pq)
@@ -48,18 +48,20 @@ def split_equation_set_v1(eqn_set):
                 eqn_combo = frozenset(eqs.eqns | eqs.vars)
                 if eqn_combo not in unique_eqn_combos:
                     unique_eqn_combos.add(eqn_combo)
-                    pq.add(eqs)
+                    pq.append(eqs)
 
             pq.sort(key=lambda p: p.key(nEq))
 
     # create eqn set(s) of underconstrained systems
-    underconstrained_set = EqnSet()
-    for eqn in unsolved_eqns:
-        underconstrained_set.add(eqn)
+    if unsolved_eqns:
+        underconstrained_set = EqnSet()
+        for eqn in unsolved_eqns:
+            underconstrained_set.add(eqn)
 
-    underconstrained_set.set_solved()
+        underconstrained_set.set_solved()
+        solve_sets.add(underconstrained_set)
 
-    return solve_sets, underconstrained_set
+    return solve_sets
 
 
 # version that tries to solve many eqn sets at a time
@@ -70,7 +72,6 @@ def split_equation_set_v2(eqn_set):
     nEq = len(eqn_set.eqns)
 
     solve_sets = set()
-    underconstrained_set = EqnSet()
 
     # keep track of what has been visited
     unique_eqn_combos = set()
@@ -83,7 +84,7 @@ def split_equation_set_v2(eqn_set):
     while pq:
         # try to solve as many eqn sets as possible
         eqn_set = None
-        while pq and pq[-1].is_solvable():
+        while pq and pq[-1].is_constrained():
             eqn_set = pq.pop()
 
             # set this equation set as solved
@@ -96,9 +97,9 @@ def split_equation_set_v2(eqn_set):
                 p.discard(eqn_set)
 
         # then sort the pq if solves happened, otherwise add to the pq
-        if eqn_set:
+        if eqn_set is not None:
             # delete any empty eqn sets and re-sort the pq
-            pq = filter(lambda p: not p.is_empty(), pq)
+            pq = [p for p in pq if not p.is_empty()]
             pq.sort(key=lambda p: p.key(nEq))
 
             unique_eqn_combos = set(frozenset(eqs.eqns | eqs.vars) for eqs in pq)
@@ -111,18 +112,20 @@ def split_equation_set_v2(eqn_set):
                 eqn_combo = frozenset(eqs.eqns | eqs.vars)
                 if eqn_combo not in unique_eqn_combos:
                     unique_eqn_combos.add(eqn_combo)
-                    pq.add(eqs)
+                    pq.append(eqs)
 
             pq.sort(key=lambda p: p.key(nEq))
 
     # create eqn set(s) of underconstrained systems
-    underconstrained_set = EqnSet()
-    for eqn in unsolved_eqns:
-        underconstrained_set.add(eqn)
+    if unsolved_eqns:
+        underconstrained_set = EqnSet()
+        for eqn in unsolved_eqns:
+            underconstrained_set.add(eqn)
 
-    underconstrained_set.set_solved()
+        underconstrained_set.set_solved()
+        solve_sets.add(underconstrained_set)
 
-    return solve_sets, underconstrained_set
+    return solve_sets
 
 
 # version using blist.sortedlist
@@ -133,7 +136,6 @@ def split_equation_set_v3(eqn_set):
     nEq = len(eqn_set.eqns)
 
     solve_sets = set()
-    underconstrained_set = EqnSet()
 
     # keep track of what has been visited
     unique_eqn_combos = set()
@@ -147,7 +149,7 @@ def split_equation_set_v3(eqn_set):
     while pq:
         eqn_set = pq.pop()
 
-        if eqn_set.is_solvable():
+        if eqn_set.is_constrained():
             # set this equation set as solved
             solve_sets.add(eqn_set)
             eqn_set.set_solved()
@@ -173,13 +175,15 @@ def split_equation_set_v3(eqn_set):
                     pq.add(eqs)
 
     # create eqn set(s) of underconstrained systems
-    underconstrained_set = EqnSet()
-    for eqn in unsolved_eqns:
-        underconstrained_set.add(eqn)
+    if unsolved_eqns:
+        underconstrained_set = EqnSet()
+        for eqn in unsolved_eqns:
+            underconstrained_set.add(eqn)
 
-    underconstrained_set.set_solved()
+        underconstrained_set.set_solved()
+        solve_sets.add(underconstrained_set)
 
-    return solve_sets, underconstrained_set
+    return solve_sets
 
 
 # use the blist version
@@ -1,14 +1,23 @@
 from __future__ import print_function, division
 
 from operator import methodcaller
+from timeit import default_timer
 
 # for sorted insertion: heapq, bisect, blist, sortedcontainers...
 from blist import blist  # , sortedlist
 from sortedcontainers import SortedList as sortedlist
 
-from .constraint_solver import solve_numeric
+from .constraint_solver import solve_numeric, solve_least_squares
 from .solve_elements import EqnSet
 
+try:
+    _popcount = int.bit_count  # python 3.10+
+except AttributeError:
+
+    def _popcount(x):
+        return bin(x).count("1")
+
+
 # ------------------------------------------------------------------------------
 # Equation Set Splitting
 # ------------------------------------------------------------------------------
@@ -20,12 +29,116 @@ from .solve_elements import EqnSet
 # optional sympy solver??
 
 
-def split_equation_set(eqn_set):
-    """Split an equation set up into smaller solvable equation sets"""
+class SplitBudget(object):
+    """
+    Limit on how far a split search explores
+
+    Parameters
+    ----------
+    max_nodes
+        maximum number of candidate sets taken from the queue per split
+        (None for no limit)
+    max_time
+        maximum wall-clock seconds per split (None for no limit)
+
+    A split that runs out of budget stops searching, and returns the
+    sets it found so far plus the remaining equations grouped into
+    coupled sets (see `coupled_eqn_sets`). The counters add up over
+    all splits that used this budget.
+    """
+
+    __slots__ = (
+        "max_nodes",  # max candidate sets explored per split (or None)
+        "max_time",  # max seconds per split (or None)
+        "splits",  # number of splits started
+        "nodes",  # number of candidate sets explored
+        "exhausted",  # number of splits that ran out of budget
+    )
+
+    def __init__(self, max_nodes=None, max_time=None):
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+
+        self.splits = 0
+        self.nodes = 0
+        self.exhausted = 0
+
+    def start(self):
+        """
+        Start a split, returning a function that is called for every
+        explored candidate set and returns true once the budget is spent
+        """
+        self.splits += 1
+
+        max_nodes = self.max_nodes
+        deadline = None if self.max_time is None else default_timer() + self.max_time
+        nodes = [0]
+
+        def spent():
+            # a refused candidate set is not counted as explored
+            if (max_nodes is not None and nodes[0] >= max_nodes) or (
+                deadline is not None and default_timer() > deadline
+            ):
+                self.exhausted += 1
+                return True
+
+            nodes[0] += 1
+            self.nodes += 1
+            return False
+
+        return spent
+
+    def stats(self):
+        """Counters for reporting"""
+        return {
+            "splits": self.splits,
+            "nodes": self.nodes,
+            "exhausted": self.exhausted,
+        }
+
+
+def coupled_eqn_sets(eqns):
+    """
+    Group eqns into solved equation sets of eqns that share unsolved vars
+
+    Each set is a connected component: its eqns are coupled with each
+    other through their unsolved vars, and with no eqn of another set.
+    """
+    eqns = set(eqns)
+    solve_sets = set()
+
+    while eqns:
+        eqn_set = EqnSet()
+        connected_eqns = {eqns.pop()}
+
+        while connected_eqns:
+            eqn = connected_eqns.pop()
+            eqns.discard(eqn)
+            eqn_set.add(eqn)
+
+            for var in eqn.vars:
+                connected_eqns.update(e for e in var.eqns if e in eqns)
+
+        eqn_set.set_solved()
+        solve_sets.add(eqn_set)
+
+    return solve_sets
+
+
+def split_equation_set(eqn_set, budget=None):
+    """
+    Split an equation set up into smaller solvable equation sets
+
+    If a `SplitBudget` is given and runs out, the equations that are
+    left are returned as coupled sets instead of searching further.
+    """
 
     # used for tiebreaker of priority key
     n_eq = len(eqn_set.eqns) + 1
 
+    spent = budget.start() if budget is not None else None
+    exhausted = False
+
     solve_sets = set()
 
     # keep track of what has been visited
@@ -38,6 +151,10 @@ def split_equation_set(eqn_set):
     )
 
     while pq:
+        if spent is not None and spent():
+            exhausted = True
+            break
+
         eqn_set = pq.pop()
 
         if eqn_set.is_constrained():
@@ -63,6 +180,11 @@ def split_equation_set(eqn_set):
                     unique_eqn_combos.add(eqn_combo)
                     pq.add(eqs)
 
+    # out of budget: what is left is solved as coupled sets
+    if exhausted:
+        solve_sets.update(coupled_eqn_sets(unsolved_eqns))
+        return solve_sets
+
     # create eqn set(s) of underconstrained systems
     # TODO: can create multiple unconstrained sets
     if unsolved_eqns:
@@ -73,23 +195,121 @@ def split_equation_set(eqn_set):
         underconstrained_set.set_solved()
         solve_sets.add(underconstrained_set)
 
-    # while unsolved_eqns:
-    #     eqn = unsolved_eqns.pop()
-    #     eqn_set = EqnSet()
-    #
-    #     connected_eqns = {eqn}
-    #
-    #     while connected_eqns:
-    #         eqn = connected_eqns.pop()
-    #         unsolved_eqns.discard(eqn)
-    #         eqn_set.add(eqn)
-    #
-    #         for var in eqn.vars:
-    #             connected_eqns.update(eqn for eqn in var.eqns
-    #                                       if  eqn not in eqn_set.eqns)
-    #
-    #     eqn_set.set_solved()
-    #     solve_sets.add(eqn_set)
+    return solve_sets
+
+
+def _bits(mask):
+    """Indices of the set bits of an int"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def split_equation_set_bitset(eqn_set, budget=None):
+    """
+    Split an equation set up into smaller solvable equation sets
+
+    Same best-first search (and `budget`) as `split_equation_set`, but
+    candidate sets are int bitmasks over dense eqn/var indices. Growing
+    a candidate, its degrees of freedom and dedup are bit operations,
+    and only accepted sets are turned into `EqnSet`s.
+    """
+
+    # dense indices
+    eqn_list = list(eqn_set.eqns)
+    var_list = list(eqn_set.all_vars)
+    var_idx = {var: i for i, var in enumerate(var_list)}
+
+    eqn_all = [sum(1 << var_idx[var] for var in eqn.all_vars) for eqn in eqn_list]
+    var_eqns = [0] * len(var_list)
+    for e, eqn in enumerate(eqn_list):
+        for v in _bits(eqn_all[e]):
+            var_eqns[v] |= 1 << e
+
+    # vars that are not unknowns of this set count as solved already
+    solved_vars = sum(1 << var_idx[var] for var in eqn_set.all_vars - eqn_set.vars)
+    unsolved_eqns = (1 << len(eqn_list)) - 1
+
+    # used for tiebreaker of priority key
+    n_eq = len(eqn_list) + 1
+
+    def candidate(seq, eqns, vars, all_vars):
+        # (key, insertion order, eqns, active vars, all vars): the pq is
+        #   sorted by key like `EqnSet.key`, latest first among ties
+        n_eqns = _popcount(eqns)
+        key = n_eqns - _popcount(vars) + n_eqns / n_eq
+        return (key, seq, eqns, vars, all_vars)
+
+    solve_sets = set()
+
+    pq = sortedlist(
+        candidate(e, 1 << e, eqn_all[e] & ~solved_vars, eqn_all[e])
+        for e in range(len(eqn_list))
+    )
+    seq = len(eqn_list)
+    unique_eqn_combos = set()
+
+    spent = budget.start() if budget is not None else None
+    exhausted = False
+
+    while pq:
+        if spent is not None and spent():
+            exhausted = True
+            break
+
+        _, _, c_eqns, c_vars, c_all = pq.pop()
+
+        if _popcount(c_eqns) == _popcount(c_vars):
+            # set this equation set as solved
+            solved = EqnSet()
+            solved.eqns = set(eqn_list[e] for e in _bits(c_eqns))
+            solved.vars = set(var_list[v] for v in _bits(c_vars))
+            solved.all_vars = set(var_list[v] for v in _bits(c_all))
+            solved.set_solved()
+            solve_sets.add(solved)
+
+            solved_vars |= c_vars
+            unsolved_eqns &= ~c_eqns
+
+            # discard this equation set from all sets in the pq,
+            #   delete any empty eqn sets and re-sort the pq
+            pq = sortedlist(
+                candidate(p[1], p[2] & ~c_eqns, p[3] & ~c_vars, p[4])
+                for p in pq
+                if p[2] & ~c_eqns
+            )
+
+            unique_eqn_combos = set((p[2], p[3]) for p in pq)
+
+        else:
+            # add the frontier to the pq
+            f_eqns = 0
+            for v in _bits(c_vars):
+                f_eqns |= var_eqns[v]
+            f_eqns &= unsolved_eqns & ~c_eqns
+
+            for e in _bits(f_eqns):
+                eqns = c_eqns | 1 << e
+                vars = c_vars | eqn_all[e] & ~solved_vars
+                if (eqns, vars) not in unique_eqn_combos:
+                    unique_eqn_combos.add((eqns, vars))
+                    pq.add(candidate(seq, eqns, vars, c_all | eqn_all[e]))
+                    seq += 1
+
+    # out of budget: what is left is solved as coupled sets
+    if exhausted:
+        solve_sets.update(coupled_eqn_sets(eqn_list[e] for e in _bits(unsolved_eqns)))
+        return solve_sets
+
+    # create eqn set(s) of underconstrained systems
+    if unsolved_eqns:
+        underconstrained_set = EqnSet()
+        for e in _bits(unsolved_eqns):
+            underconstrained_set.add(eqn_list[e])
+
+        underconstrained_set.set_solved()
+        solve_sets.add(underconstrained_set)
 
     return solve_sets
 
@@ -99,21 +319,66 @@ def split_equation_set(eqn_set):
 # ------------------------------------------------------------------------------
 
 
-def solve_eqn_set(eqn_set):
-    """Solve a single equation set"""
+def solve_eqn_set(eqn_set, strategy=None):
+    """Solve a single equation set (with a `SolverStrategy`, if given)"""
     # TODO: add other methods (ie analytic, sympy, ...)
-    return solve_numeric(eqn_set, 1.0e-8)
+    return solve_numeric(eqn_set, 1.0e-8, strategy)
+
+
+def solve_drag(eqn_set, targets, weight=1.0):
+    """Solve an underconstrained equation set near target var values"""
+    return solve_least_squares(eqn_set, targets, weight, 1.0e-8)
 
 
-def solve_eqn_sets(solve_sets, modified_vars, solve_func=solve_eqn_set):
+class SolveCancelled(Exception):
+    """
+    Raised when solving equation sets is cancelled between two sets
+
+    `modified_vars` holds the modified vars that still have to be
+    accounted for by a later solve. Sets that were already solved
+    keep their values and are not included.
+    """
+
+    def __init__(self, modified_vars):
+        super().__init__("solve cancelled")
+        self.modified_vars = modified_vars
+
+
+def solve_eqn_sets(
+    solve_sets,
+    modified_vars,
+    solve_func=solve_eqn_set,
+    cancel=None,
+    cache=None,
+    updated_vars=None,
+    linear=None,
+):
     """
     Solve a group of equation sets in which only certain variables
     have been modified.
+
+    If `cancel` is given, it is called before each equation set is
+    solved, and if it returns true, `SolveCancelled` is raised.
+
+    If `cache` (a `SolutionCache`) is given, equation sets are solved
+    through it so previously found solutions are reused.
+
+    If `updated_vars` (a set) is given, the modified vars and all vars
+    solved for are added to it as the solve progresses.
+
+    If `linear` (a `LinearSolver`) is given, all linear equation sets
+    that are ready to be solved at the same time are solved together
+    by it instead of one by one.
     """
 
     # track modified and solved vars
     modified_vars = set(modified_vars)  # don't really need to copy here...
     solved_vars = set()
+    done_sets = set()
+
+    if updated_vars is None:
+        updated_vars = set()
+    updated_vars |= modified_vars
 
     # `q` represents the equation sets that are ready to be solved now
     # TODO: threading
@@ -122,26 +387,68 @@ def solve_eqn_sets(solve_sets, modified_vars, solve_func=solve_eqn_set):
     q = [eqs for eqs in solve_sets if not eqs.requires]
     q = blist(q)  # use blist instead of list
 
+    def needs_solve(eqn_set):
+        return any(var in eqn_set.requires for var in modified_vars) or (
+            any(var in eqn_set.solves for var in modified_vars)
+            and not eqn_set.is_satisfied()
+        )
+
     while q:
         # get the next set that is ready to solve
         eqn_set = q.pop(0)
 
-        # solve the eqn_set *if necessary*
-        if any(var in eqn_set.requires for var in modified_vars) or (
-            any(var in eqn_set.solves for var in modified_vars)
-            and not eqn_set.is_satisfied()
-        ):
+        if cancel is not None and cancel():
+            raise SolveCancelled(
+                set(
+                    var
+                    for var in modified_vars
+                    if var.solved_by not in done_sets
+                    or not var.required_by <= done_sets
+                )
+            )
 
-            if not solve_func(eqn_set):
-                print("FAIL")
-                return eqn_set  # return the eqn set that failed for reporting
+        # linear sets: take every other linear set that is ready too
+        #   (they can't depend on each other, or they wouldn't be ready)
+        if linear is not None and linear.is_linear(eqn_set):
+            batch = [eqn_set] + [eqs for eqs in q if linear.is_linear(eqs)]
+            q = blist(eqs for eqs in q if not linear.is_linear(eqs))
+
+            to_solve = [eqs for eqs in batch if needs_solve(eqs)]
+            if to_solve:
+                failed = linear.solve(to_solve, solve_func)
+                if failed is not None:
+                    # values were changed by the attempts all the same
+                    for eqs in to_solve:
+                        updated_vars |= eqs.solves
+                    return failed
 
+        else:
+            batch = [eqn_set]
+
+            # solve the eqn_set *if necessary*
+            to_solve = batch if needs_solve(eqn_set) else []
+            if to_solve:
+                if cache is not None:
+                    success = cache.solve(eqn_set, solve_func)
+                else:
+                    success = solve_func(eqn_set)
+
+                if not success:
+                    print("FAIL")
+                    updated_vars |= eqn_set.solves  # changed by the attempt
+                    return eqn_set  # return the eqn set that failed for reporting
+
+        for eqn_set in to_solve:
             modified_vars |= eqn_set.solves
+            updated_vars |= eqn_set.solves
 
-        # add all vars solved by this set to the set of solved vars
-        solved_vars |= eqn_set.solves
+        for eqn_set in batch:
+            # add all vars solved by this set to the set of solved vars
+            solved_vars |= eqn_set.solves
+            done_sets.add(eqn_set)
 
         # create the frontier to add to the queue
+        #   (one set for the whole batch, so no set is queued twice)
         # TODO: much more efficient way to get the frontier
         #  1) don't look at eqn set if it has already been looked at
         #  2) keep track of linked list b/n eqn sets directly
@@ -154,8 +461,9 @@ def solve_eqn_sets(solve_sets, modified_vars, solve_func=solve_eqn_set):
                     v in solved_vars for v in eqs.requires
                 )  # if all other required vars have been solved for
             )
+            for eqn_set in batch
             for var in eqn_set.solves
-        ]  # for each var solved by this eqn set
+        ]  # for each var solved by the sets of this batch
 
         q += frontier
 
@@ -2,10 +2,14 @@
 geom2d: 2D geometry and constraints built from equation solving elements
 """
 
+from math import hypot
+
 import matplotlib.pyplot as plt  # TODO: add/remove this for profiling
 
-from .solve_elements import Eqn, Var
+from .solve_elements import Eqn, EqualityEqn, Var, Parameter
 from . import constraints_unsigned as cstr
+from . import constraints_branched as bcstr
+from . import constraints_vectorized as vcstr
 
 # from . import constraints_signed   as cstr
 
@@ -14,6 +18,11 @@ try:
 except ImportError:
     pass
 
+# default for constraints created without an explicit `lock`: if true,
+# multi-branch constraints lock onto one branch and use its smooth
+# signed residual instead of the unsigned one
+lock_branches = False
+
 # ----------------------------------------------------------
 # Geometry
 # ----------------------------------------------------------
@@ -30,6 +39,14 @@ class Geometry:
     def draw(self, view):
         pass
 
+    def bbox(self):
+        """Bounding box (xmin, ymin, xmax, ymax), or None if not spatial"""
+        return None
+
+    def distance(self, x, y):
+        """Distance from a point to this geometry, or None if not spatial"""
+        return None
+
     def delete(self):
         for var in self.vars:
             var.delete()
@@ -48,6 +65,12 @@ class Point(Geometry):
         ax = ax or plt.gca()
         ax.scatter(x=(self.x.val,), y=(self.y.val,))
 
+    def bbox(self):
+        return (self.x.val, self.y.val, self.x.val, self.y.val)
+
+    def distance(self, x, y):
+        return hypot(x - self.x.val, y - self.y.val)
+
     def draw(self, view):
         self.geom = model.vertex([self.x.val, self.y.val, 0])
         view.display(self.geom)
@@ -73,6 +96,22 @@ class LineSegment(Geometry):
         self.p1.plot(ax)
         self.p2.plot(ax)
 
+    def bbox(self):
+        x1, y1, x2, y2 = (var.val for var in self.vars)
+        return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+    def distance(self, x, y):
+        x1, y1, x2, y2 = (var.val for var in self.vars)
+        dx = x2 - x1
+        dy = y2 - y1
+        L2 = dx * dx + dy * dy
+
+        # parameter of the closest point along the segment
+        t = 0.0 if L2 == 0.0 else ((x - x1) * dx + (y - y1) * dy) / L2
+        t = min(max(t, 0.0), 1.0)
+
+        return hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+
     def draw(self, view):
         self.geom = model.segment(
             [self.p1.x.val, self.p1.y.val, 0], [self.p2.x.val, self.p2.y.val, 0]
@@ -94,6 +133,14 @@ class Circle(Geometry):
         ax.add_artist(circle)
         self.p.plot(ax)
 
+    def bbox(self):
+        cx, cy, r = self.p.x.val, self.p.y.val, abs(self.r.val)
+        return (cx - r, cy - r, cx + r, cy + r)
+
+    def distance(self, x, y):
+        # distance to the circle itself, not the disk
+        return abs(hypot(x - self.p.x.val, y - self.p.y.val) - abs(self.r.val))
+
     def draw(self, view):
         self.geom = model.circle(self.r.val)
         self.geom.translate([self.p.x.val, self.p.y.val, 0])
@@ -106,45 +153,183 @@ class Circle(Geometry):
 
 
 class Constraint(object):
+    # attributes that can change after construction (a set value, a
+    #   branch, ...), which are recorded by undo journals
+    settings = ()
+
     def __init__(self, name):
         self.name = name
         self.equations = []
 
+    def get_settings(self):
+        """Values of the constraint's `settings`"""
+        return tuple(getattr(self, name) for name in self.settings)
+
+    def set_settings(self, values):
+        """Put back values from `get_settings`"""
+        for name, val in zip(self.settings, values):
+            setattr(self, name, val)
+
+        for eqn in self.equations:
+            eqn.invalidate()
+
+    def vectorized(self, eqn):
+        """
+        `(f, consts)` for evaluating an equation of this constraint with
+        others of its kind: `f(x, c)` from `constraints_vectorized` and
+        the eqn's row of `c`. None if it has to be evaluated on its own.
+        """
+        return None
+
+
+class BranchedConstraint(Constraint):
+    """
+    Constraint whose unsigned residual covers several branches
+
+    If locked, the branch (+1 or -1: side, orientation) that holds for
+    the initial values is recorded when an equation is first evaluated,
+    and the smooth signed residual of that branch is used from then on.
+    The equations' var lists end with the constraint's parameter.
+    """
+
+    unsigned = None  # unsigned residual: unsigned(x, p)
+    signed = None  # branch residual: signed(x, p, branch)
+    branch_of = None  # branch closest to the values: branch_of(x, p)
+    vec_unsigned = None  # vectorized unsigned residual
+    vec_signed = None  # vectorized branch residual (branch in c)
+    linear_when_locked = False  # is the branch residual linear in its vars
+
+    settings = ("branch", "locked")
+
+    def __init__(self, name, branch=None, lock=None):
+        super().__init__(name)
+
+        self.branch = branch
+        self._locked = lock_branches if lock is None else lock
+
+    @property
+    def locked(self):
+        """Is the constraint locked onto its branch"""
+        return self._locked
+
+    @locked.setter
+    def locked(self, locked):
+        self._locked = locked
+        self.update_linear()
+
+    def update_linear(self):
+        """Tag the equations as linear while they are locked (if they can be)"""
+        if self.linear_when_locked:
+            for eqn in self.equations:
+                eqn.linear_in = frozenset(eqn.var_list if self._locked else ())
+
+    def residual(self, *vals):
+        x, p = vals[:-1], vals[-1]
+
+        if not self.locked:
+            return self.unsigned(x, p)
+
+        if self.branch is None:
+            self.branch = self.branch_of(x, p)
+
+        return self.signed(x, p, self.branch)
+
+    def vectorized(self, eqn):
+        if not self.locked:
+            return self.vec_unsigned, ()
+
+        # the branch is recorded by the first scalar evaluation
+        if self.branch is None:
+            return None
+
+        return self.vec_signed, (self.branch,)
+
+    def flip(self):
+        """Switch to the other branch (the solver has to re-solve its vars)"""
+        if self.branch is None:
+            eqn = self.equations[0]
+            self.branch = self.branch_of(
+                [var.val for var in eqn.var_list[:-1]], eqn.var_list[-1].val
+            )
+
+        self.branch = -self.branch
+        self.locked = True
+
+        for eqn in self.equations:
+            eqn.invalidate()
+
 
 class SetVar(Constraint):
+    settings = ("val",)
+
     def __init__(self, name, var, val):
         super().__init__(name)
 
         self.var = var
         self.val = val
 
-        self.equations = [Eqn(name, lambda var: cstr.set_val([var], self.val), [var])]
+        self.equations = [
+            Eqn(
+                name,
+                self.residual,
+                [var],
+                self,
+                linear_in=[var],
+                fixed_coeffs=True,
+            )
+        ]
 
+    def residual(self, var):
+        return cstr.set_val([var], self.val)
 
-class HorzDist(Constraint):
-    def __init__(self, name, p1, p2, d):
-        super().__init__(name)
+    def vectorized(self, eqn):
+        return vcstr.set_val, (self.val,)
+
+
+class HorzDist(BranchedConstraint):
+    # locked, the residual is linear with coefficients +-1
+    linear_when_locked = True
+
+    unsigned = staticmethod(cstr.distance_1D)
+    signed = staticmethod(bcstr.distance_1D)
+    branch_of = staticmethod(bcstr.distance_1D_branch)
+    vec_unsigned = staticmethod(vcstr.distance_1D)
+    vec_signed = staticmethod(vcstr.distance_1D_signed)
+
+    def __init__(self, name, p1, p2, d, branch=None, lock=None):
+        super().__init__(name, branch, lock)
 
         self.p1 = p1
         self.p2 = p2
         self.d = d
 
         self.equations = [
-            Eqn(name, lambda x1, x2, d: cstr.distance_1D([x1, x2], d), [p1.x, p2.x, d])
+            Eqn(name, self.residual, [p1.x, p2.x, d], self, fixed_coeffs=True)
         ]
+        self.update_linear()
 
 
-class VertDist(Constraint):
-    def __init__(self, name, p1, p2, d):
-        super().__init__(name)
+class VertDist(BranchedConstraint):
+    # locked, the residual is linear with coefficients +-1
+    linear_when_locked = True
+
+    unsigned = staticmethod(cstr.distance_1D)
+    signed = staticmethod(bcstr.distance_1D)
+    branch_of = staticmethod(bcstr.distance_1D_branch)
+    vec_unsigned = staticmethod(vcstr.distance_1D)
+    vec_signed = staticmethod(vcstr.distance_1D_signed)
+
+    def __init__(self, name, p1, p2, d, branch=None, lock=None):
+        super().__init__(name, branch, lock)
 
         self.p1 = p1
         self.p2 = p2
         self.d = d
 
         self.equations = [
-            Eqn(name, lambda y1, y2, d: cstr.distance_1D([y1, y2], d), [p1.y, p2.y, d])
+            Eqn(name, self.residual, [p1.y, p2.y, d], self, fixed_coeffs=True)
         ]
+        self.update_linear()
 
 
 class LineLength(Constraint):
@@ -157,15 +342,28 @@ class LineLength(Constraint):
         self.equations = [
             Eqn(
                 name,
-                lambda Lx1, Ly1, Lx2, Ly2, d: cstr.line_length([Lx1, Ly1, Lx2, Ly2], d),
+                self.residual,
                 [L.p1.x, L.p1.y, L.p2.x, L.p2.y, d],
+                self,
             )
         ]
 
+    def residual(self, Lx1, Ly1, Lx2, Ly2, d):
+        return cstr.line_length([Lx1, Ly1, Lx2, Ly2], d)
 
-class AnglePoint3(Constraint):
-    def __init__(self, name, p1, p2, p3, a):
-        super().__init__(name)
+    def vectorized(self, eqn):
+        return vcstr.line_length, ()
+
+
+class AnglePoint3(BranchedConstraint):
+    unsigned = staticmethod(cstr.angle_point3)
+    signed = staticmethod(bcstr.angle_point3)
+    branch_of = staticmethod(bcstr.angle_point3_branch)
+    vec_unsigned = staticmethod(vcstr.angle_point3)
+    vec_signed = staticmethod(vcstr.angle_point3_signed)
+
+    def __init__(self, name, p1, p2, p3, a, branch=None, lock=None):
+        super().__init__(name, branch, lock)
 
         self.p1 = p1
         self.p2 = p2
@@ -173,19 +371,19 @@ class AnglePoint3(Constraint):
         self.a = a
 
         self.equations = [
-            Eqn(
-                name,
-                lambda x1, y1, x2, y2, x3, y3, a: cstr.angle_point3(
-                    [x1, y1, x2, y2, x3, y3], a
-                ),
-                [p1.x, p1.y, p2.x, p2.y, p3.x, p3.y, a],
-            )
+            Eqn(name, self.residual, [p1.x, p1.y, p2.x, p2.y, p3.x, p3.y, a], self)
         ]
 
 
-class TangentLineCircle(Constraint):
-    def __init__(self, name, L, C):
-        super().__init__(name)
+class TangentLineCircle(BranchedConstraint):
+    unsigned = staticmethod(cstr.tangent_line_circle)
+    signed = staticmethod(bcstr.tangent_line_circle)
+    branch_of = staticmethod(bcstr.tangent_line_circle_branch)
+    vec_unsigned = staticmethod(vcstr.tangent_line_circle)
+    vec_signed = staticmethod(vcstr.tangent_line_circle_signed)
+
+    def __init__(self, name, L, C, branch=None, lock=None):
+        super().__init__(name, branch, lock)
 
         self.L = L
         self.C = C
@@ -193,10 +391,9 @@ class TangentLineCircle(Constraint):
         self.equations = [
             Eqn(
                 name,
-                lambda Lx1, Ly1, Lx2, Ly2, cx, cy, cr: cstr.tangent_line_circle(
-                    [Lx1, Ly1, Lx2, Ly2, cx, cy], cr
-                ),
+                self.residual,
                 [L.p1.x, L.p1.y, L.p2.x, L.p2.y, C.p.x, C.p.y, C.r],
+                self,
             )
         ]
 
@@ -211,26 +408,70 @@ class PointOnCircle(Constraint):
         self.equations = [
             Eqn(
                 name,
-                lambda x, y, cx, cy, cr: cstr.point_on_circle([x, y, cx, cy], cr),
+                self.residual,
                 [p.x, p.y, C.p.x, C.p.y, C.r],
+                self,
             )
         ]
 
+    def residual(self, x, y, cx, cy, cr):
+        return cstr.point_on_circle([x, y, cx, cy], cr)
+
+    def vectorized(self, eqn):
+        return vcstr.point_on_circle, ()
+
+
+class PointOnLine(Constraint):
+    def __init__(self, name, p, L):
+        super().__init__(name)
+
+        self.p = p
+        self.L = L
+
+        # linear in the point once the line is known
+        self.equations = [
+            Eqn(
+                name,
+                self.residual,
+                [L.p1.x, L.p1.y, L.p2.x, L.p2.y, p.x, p.y],
+                self,
+                linear_in=[p.x, p.y],
+            )
+        ]
+
+    def residual(self, Lx1, Ly1, Lx2, Ly2, x, y):
+        return cstr.point_on_line([Lx1, Ly1, Lx2, Ly2, x, y])
+
+    def vectorized(self, eqn):
+        return vcstr.point_on_line, ()
+
 
 class GroundPoint(Constraint):
     # note: untested
-    def __init__(self, name, p):
+    settings = ("gx", "gy")
+
+    def __init__(self, name, p, gx=None, gy=None):
         super().__init__(name)
 
+        # grounded where the point is, unless given
         self.p = p
-        self.gx = p.x.val
-        self.gy = p.y.val
+        self.gx = p.x.val if gx is None else gx
+        self.gy = p.y.val if gy is None else gy
 
         self.equations = [
-            Eqn(name, lambda x: x - self.gx, [p.x]),
-            Eqn(name, lambda y: y - self.gy, [p.y]),
+            Eqn(name, self.residual_x, [p.x], self, [p.x], True),
+            Eqn(name, self.residual_y, [p.y], self, [p.y], True),
         ]
 
+    def residual_x(self, x):
+        return x - self.gx
+
+    def residual_y(self, y):
+        return y - self.gy
+
+    def vectorized(self, eqn):
+        return vcstr.set_val, (self.gx if eqn is self.equations[0] else self.gy,)
+
 
 class CoincidentPoint2(Constraint):
     def __init__(self, name, p1, p2):
@@ -240,6 +481,9 @@ class CoincidentPoint2(Constraint):
         self.p2 = p2
 
         self.equations = [
-            Eqn(name + ".x", lambda x1, x2: cstr.set_val([x1], x2), [p1.x, p2.x]),
-            Eqn(name + ".y", lambda y1, y2: cstr.set_val([y1], y2), [p1.y, p2.y]),
+            EqualityEqn(name + ".x", p1.x, p2.x, self),
+            EqualityEqn(name + ".y", p1.y, p2.y, self),
         ]
+
+    def vectorized(self, eqn):
+        return vcstr.difference, ()
@@ -1,5 +1,12 @@
-from .equation_solving import split_equation_set, solve_eqn_set
+from .equation_solving import split_equation_set_bitset, solve_eqn_set
 from .system_solver import Solver
+from .rendering import SketchRenderer
+from .journal import Journal
+from . import graph_copy
+
+
+# a copy draws its own artists and keeps its own undo history
+_UNCOPIED = ("renderer", "journal")
 
 
 class GCS:
@@ -9,16 +16,44 @@ class GCS:
         "geometry",  # set of geometry elements in the system
         "constraints",  # set of constraints in the system
         "solver",  # underlying Solver object
+        "index",  # spatial index of geometry (or None)
+        "renderer",  # SketchRenderer used by `render` (or None)
+        "journal",  # Journal of solved states for undo/redo (or None)
     )
 
     def __init__(
-        self, split_func=split_equation_set, solve_func=solve_eqn_set, solve_tol=1.0e-6
+        self,
+        split_func=split_equation_set_bitset,
+        solve_func=solve_eqn_set,
+        solve_tol=1.0e-6,
+        cache=None,
+        index=None,
+        aliases=True,
+        linear=True,
+        split_budget=None,
+        undo_steps=None,
+        strategy=None,
     ):
 
         self.geometry = set()
         self.constraints = set()
 
-        self.solver = Solver(split_func, solve_func, solve_tol)
+        self.solver = Solver(
+            split_func,
+            solve_func,
+            solve_tol,
+            cache,
+            aliases,
+            linear,
+            split_budget,
+            strategy,
+        )
+        self.index = index
+        self.renderer = None
+
+        self.journal = None
+        if undo_steps is not None:
+            self.journal = Journal(self.solver, self, undo_steps)
 
     # --------------------------------------------
 
@@ -27,22 +62,41 @@ class GCS:
         self.geometry.add(geom)
         self.solver.add_variables(geom.vars)
 
+        if self.index is not None:
+            self.index.insert(geom)
+
+        self._restructure()
+        self.drop_renderer()
+
     def delete_geometry(self, geom):
         """Delete a geometry element"""
         self.geometry.discard(geom)
         for var in geom.vars:
             self.solver.delete_variable(var)
 
+        if self.index is not None:
+            self.index.remove(geom)
+
+        self._restructure()
+        self.drop_renderer()
+
     # --------------------------------------------
 
     def add_variable(self, var):
         self.solver.add_variable(var)
+        self._restructure()
 
     def modify_variable(self, var, val):
         self.solver.modify_variable(var, val)
+        self._touch((var, var.rep()))
 
     def delete_variable(self, var):
         self.solver.delete_variable(var)
+        self._restructure()
+
+    def modify_parameter(self, param, val):
+        self.solver.modify_parameter(param, val)
+        self._touch((param,))
 
     # --------------------------------------------
 
@@ -50,17 +104,66 @@ class GCS:
         """Add a new constraint to the system"""
         self.constraints.add(cstr)
         self.solver.add_equations(cstr.equations)
+        self._restructure()
 
     def modify_set_constraint(self, cstr, val):
         """Modify the value of a "set" constraint"""
-        # TODO: replace "set" constraints with "constant" constraints
+        # note: a Parameter (see `modify_parameter`) is cheaper for constants
         cstr.val = val
         self.solver.modify_variable(cstr.var, val)
 
+        # the cached residuals only know the versions of the vars, and
+        #   the var's version doesn't change if it already holds `val`
+        for eqn in cstr.equations:
+            eqn.invalidate()
+        self.solver.refresh_residuals(cstr.equations)
+        self._touch((cstr, cstr.var, cstr.var.rep()))
+
+    def flip_constraint(self, cstr):
+        """Switch a `BranchedConstraint` to its other branch"""
+        cstr.flip()
+        self.solver.modify_equations(cstr.equations)
+        self._touch((cstr,))
+
     def delete_constraint(self, cstr):
         """Delete a constraint and its equations"""
         self.constraints.discard(cstr)
         self.solver.delete_equations(cstr.equations)
+        self._restructure()
+
+    # --------------------------------------------
+
+    def add_block(self, block):
+        """
+        Add a `RigidBlock`: its placement vars, its geometry and the
+        constraint that places it
+        """
+        self.add_geometry(block)
+        for geom in block.geometry:
+            self.add_geometry(geom)
+
+        self.add_constraint(block.placement)
+
+    def modify_block_parameter(self, block, param, val):
+        """
+        Change a dimension of a `RigidBlock` (a `Parameter` of its
+        original constraints): the block is re-solved on its own, and
+        only its changed local coordinates are passed on (ValueError if
+        the block can't be solved)
+        """
+        for local, local_val in block.modify_parameter(param, val):
+            self.modify_parameter(local, local_val)
+
+        # the block's dimensions and local solution are undone with it
+        self._touch((block.placement,))
+
+    def delete_block(self, block):
+        """Delete a `RigidBlock` with its geometry"""
+        self.delete_constraint(block.placement)
+        for geom in block.geometry:
+            self.delete_geometry(geom)
+
+        self.delete_geometry(block)
 
     # --------------------------------------------
 
@@ -70,13 +173,123 @@ class GCS:
     def is_constrained(self):
         return self.solver.is_constrained()
 
+    def residual_report(self):
+        return self.solver.residual_report()
+
+    def derivatives(self, params):
+        return self.solver.derivatives(params)
+
+    def preview(self, changes):
+        return self.solver.preview(changes)
+
+    def stats(self):
+        stats = self.solver.stats()
+        if self.journal is not None:
+            stats["journal"] = self.journal.stats()
+        return stats
+
     # --------------------------------------------
 
-    def update(self):
-        self.solver.update()
+    def update(self, cancel=None):
+        done = self.solver.update(cancel)
+        self._track_updates()
+
+        if self.journal is not None:
+            self.journal.touch(self.solver.updated_vars)
+            if done:
+                self.journal.record()
+
+        return done
+
+    def drag(self, targets, weight=1.0, cancel=None):
+        """
+        Pull vars toward target values without restructuring the solver
+
+        `targets` maps vars to values (see `Solver.drag`)
+        """
+        done = self.solver.drag(targets, weight, cancel)
+        self._track_updates()
+
+        # a drag is recorded as one step with the next update or undo
+        self._touch(self.solver.updated_vars)
+
+        return done
+
+    def drag_point(self, p, x, y, weight=1.0, cancel=None):
+        """Pull a point toward (x, y), like pinning it under a cursor"""
+        return self.drag({p.x: x, p.y: y}, weight, cancel)
+
+    def _track_updates(self):
+        # re-bin only the geometry whose vars changed
+        if self.index is not None:
+            self.index.refresh(self.solver.updated_vars)
+
+        if self.renderer is not None:
+            self.renderer.dirty |= self.solver.updated_vars
 
     def reset(self):
         self.solver.reset()
+        self._restructure()
+
+    def _touch(self, elements):
+        # edits of values and settings, for the journal's next record
+        if self.journal is not None:
+            self.journal.touch(elements)
+
+    def _restructure(self):
+        if self.journal is not None:
+            self.journal.restructure()
+
+    # --------------------------------------------
+
+    def undo(self):
+        """
+        Go back to the state of the previous update, without splitting
+        or solving (needs `undo_steps`). Edits since the last update are
+        what is undone. Returns False if there is nothing to undo.
+        """
+        return self._restore(self.journal.undo)
+
+    def redo(self):
+        """Go forward to the state of the next update again (see `undo`)"""
+        return self._restore(self.journal.redo)
+
+    def _restore(self, step):
+        geometry = set(self.geometry)
+        if not step():
+            return False
+
+        if self.index is not None:
+            for geom in geometry - self.geometry:
+                self.index.remove(geom)
+            for geom in self.geometry - geometry:
+                self.index.insert(geom)
+
+        if geometry != self.geometry:
+            self.drop_renderer()
+
+        self._track_updates()
+        return True
+
+    # --------------------------------------------
+
+    def deep_copy(self):
+        """
+        Independent deep copy of this solver, with its decomposition and
+        values, that can be edited and updated without affecting this
+        one (see `graph_copy`)
+        """
+        gcs = graph_copy.deep_copy(self, _UNCOPIED)
+
+        # a copy starts its own undo history
+        if self.journal is not None:
+            gcs.journal = Journal(gcs.solver, gcs, self.journal.undo_entries.maxlen)
+
+        return gcs
+
+    def __reduce__(self):
+        # pickled flat: the object graph is too deep for recursive pickling
+        return graph_copy.unflatten, (graph_copy.flatten(self, _UNCOPIED),)
 
     # --------------------------------------------
 
@@ -85,6 +298,29 @@ class GCS:
         for g in self.geometry:
             g.plot(ax)
 
+    def render(self, ax=None):
+        """
+        Plot all geometry with batched artists that are updated in place
+
+        The first call builds a SketchRenderer; later calls only update
+        the entries whose vars changed in `update` since the last call
+        """
+        if self.renderer is not None and ax is not None and ax is not self.renderer.ax:
+            self.drop_renderer()
+
+        if self.renderer is None:
+            self.renderer = SketchRenderer(self.geometry, ax)
+        else:
+            self.renderer.refresh()
+
+        return self.renderer
+
+    def drop_renderer(self):
+        """Remove the artists drawn by `render`"""
+        if self.renderer is not None:
+            self.renderer.remove()
+            self.renderer = None
+
     def draw(self, view):
         for g in self.geometry:
             g.draw(view)
@@ -0,0 +1,171 @@
+"""
+graph_copy: deep copy or pickle a whole solver object graph
+
+A solved system is one large graph of linked objects (vars, eqns,
+equation sets, constraints, geometry), deep enough that `copy.deepcopy`
+and `pickle` run out of recursion. Here the graph is walked without
+recursion and flattened into a list of `(class, state)` entries, in
+which references to other objects of the graph are replaced by their
+index. The flat form pickles with shallow recursion, and `unflatten`
+builds an independent copy from it: the decomposition and all values
+carry over, so the copy can be edited and updated without splitting
+or solving again.
+
+A copy is a full deep copy: every object of the graph is copied, so it
+costs time and memory in proportion to the whole system, not to what
+is edited afterwards. It only beats rebuilding because nothing is
+split or solved.
+
+Objects of classes from this package are part of the graph. Their state
+is read from their slots (or `__dict__`), or from `__getstate__` if the
+class defines one (to leave out caches that can't be copied, like LU
+factorizations). Bound methods of graph objects (like constraint
+residuals used as `Eqn.f`) are rebound to the copies; NumPy arrays are
+copied, and anything else (numbers, strings, functions) is shared.
+"""
+
+import numpy as np
+from collections import OrderedDict
+from types import MethodType
+
+_PACKAGE = __name__.rpartition(".")[0]
+_object_getstate = getattr(object, "__getstate__", None)
+
+
+class _Ref(int):
+    """Index of an object in a flattened graph"""
+
+    __slots__ = ()
+
+
+class _Method(object):
+    """A method bound to an object in a flattened graph"""
+
+    __slots__ = ("ref", "name")
+
+    def __init__(self, ref, name):
+        self.ref = ref
+        self.name = name
+
+
+_ATOMS = frozenset((float, int, bool, str, type(None)))
+_graph_types = {}  # type -> are its instances graph objects
+
+
+def _in_graph(val):
+    kind = type(val)
+    in_graph = _graph_types.get(kind)
+    if in_graph is None:
+        in_graph = _graph_types[kind] = kind.__module__.startswith(_PACKAGE + ".")
+    return in_graph
+
+
+def _state(obj):
+    """Attribute name -> value of an object of the graph"""
+    getstate = getattr(type(obj), "__getstate__", None)
+    if getstate is not None and getstate is not _object_getstate:
+        state = obj.__getstate__()
+        if isinstance(state, tuple):  # (dict state, slot state)
+            merged = dict(state[0] or {})
+            merged.update(state[1] or {})
+            state = merged
+        return state
+
+    state = dict(getattr(obj, "__dict__", {}))
+    for cls in type(obj).__mro__:
+        for slot in cls.__dict__.get("__slots__", ()):
+            if hasattr(obj, slot):
+                state[slot] = getattr(obj, slot)
+
+    return state
+
+
+# ------------------------------------------------------------------------------
+# Flatten / unflatten
+# ------------------------------------------------------------------------------
+
+
+def flatten(root, skip=()):
+    """
+    Flatten the object graph reachable from `root`
+
+    Returns a list of `(class, state)` entries, root first, in which
+    graph objects are replaced by `_Ref` indices into the list.
+    Attributes of `root` named in `skip` are set to None (and whatever
+    only they reference is left out).
+    """
+    index = {id(root): _Ref(0)}  # id -> ref of each object
+    objects = [root]
+
+    def ref(obj):
+        r = index.get(id(obj))
+        if r is None:
+            r = index[id(obj)] = _Ref(len(objects))
+            objects.append(obj)
+        return r
+
+    def encode(val):
+        kind = type(val)
+
+        if kind in _ATOMS:
+            return val
+        r = index.get(id(val))
+        if r is not None:
+            return r
+
+        if kind in (list, tuple, set, frozenset):
+            return kind(encode(v) for v in val)
+        if kind in (dict, OrderedDict):
+            return kind((encode(k), encode(v)) for k, v in val.items())
+        if kind is MethodType and _in_graph(val.__self__):
+            return _Method(ref(val.__self__), val.__func__.__name__)
+        if kind is np.ndarray:
+            return val.copy()
+        if _in_graph(val):
+            return ref(val)
+
+        return val
+
+    # objects are appended while walking, so this visits all of them
+    state = _state(root)
+    for name in skip:
+        state[name] = None
+    flat = [(type(root), encode(state))]
+
+    i = 1
+    while i < len(objects):
+        obj = objects[i]
+        flat.append((type(obj), encode(_state(obj))))
+        i += 1
+
+    return flat
+
+
+def unflatten(flat):
+    """Build the object graph of `flatten` again, and return its root"""
+    objects = [cls.__new__(cls) for cls, _ in flat]
+
+    def decode(val):
+        kind = type(val)
+
+        if kind is _Ref:
+            return objects[val]
+        if kind in (list, tuple, set, frozenset):
+            return kind(decode(v) for v in val)
+        if kind in (dict, OrderedDict):
+            return kind((decode(k), decode(v)) for k, v in val.items())
+        if kind is _Method:
+            return getattr(objects[val.ref], val.name)
+
+        return val
+
+    for obj, (_, state) in zip(objects, flat):
+        for name, val in state.items():
+            setattr(obj, name, decode(val))
+
+    return objects[0]
+
+
+def deep_copy(root, skip=()):
+    """Independent copy of the object graph reachable from `root`"""
+    return unflatten(flatten(root, skip))
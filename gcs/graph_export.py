@@ -0,0 +1,171 @@
+"""
+graph_export: stream solver graphs to JSON or GraphML
+
+Two views of a solved `Solver` can be exported:
+
+- the solver graph: one node per Var and Eqn, with an edge between an
+  Eqn and each Var it depends on. Each node records the equation set
+  it belongs to.
+- the equation set graph: the condensed DAG with one node per EqnSet
+  and an edge from the set that solves a var to each set that requires
+  it.
+
+Nodes and edges are produced by generators and written as they are
+produced (GraphML collects the nodes first), so large decompositions
+can be inspected without building an igraph graph or loading a
+plotting stack.
+"""
+
+import json
+from xml.sax.saxutils import escape, quoteattr
+
+# ------------------------------------------------------------------------------
+# Graph views
+# ------------------------------------------------------------------------------
+
+
+def _eqn_set_ids(gs):
+    return {eqn_set: i for i, eqn_set in enumerate(gs.eqn_sets)}
+
+
+def solver_graph(gs):
+    """
+    Node and edge generators of the var/eqn graph of a solver
+
+    Returns `(nodes, edges)`, where nodes yields `(id, attrs)` and
+    edges yields `(source id, target id)`
+    """
+    set_ids = _eqn_set_ids(gs)
+    var_ids = {var: "v%d" % i for i, var in enumerate(gs.vars)}
+
+    def nodes():
+        for var, var_id in var_ids.items():
+            yield var_id, {
+                "label": var.name,
+                "kind": "var",
+                "eqn_set": set_ids.get(var.solved_by, -1),
+                "constrained": var.is_constrained(),
+            }
+
+        for i, eqn in enumerate(gs.eqns):
+            yield "e%d" % i, {
+                "label": eqn.name,
+                "kind": "eqn",
+                "eqn_set": set_ids.get(eqn.eqn_set, -1),
+                "constrained": True,
+            }
+
+    def edges():
+        for i, eqn in enumerate(gs.eqns):
+            for var in eqn.all_vars:
+                if var in var_ids:
+                    yield "e%d" % i, var_ids[var]
+
+    return nodes(), edges()
+
+
+def eqn_set_graph(gs):
+    """
+    Node and edge generators of the condensed equation set DAG of a solver
+
+    Returns `(nodes, edges)` like `solver_graph`. Edges point from the
+    set solving a var to the sets that require it.
+    """
+    set_ids = _eqn_set_ids(gs)
+
+    def nodes():
+        for eqn_set, i in set_ids.items():
+            yield "s%d" % i, {
+                "label": ", ".join(sorted(eqn.name for eqn in eqn_set.eqns)),
+                "n_eqns": len(eqn_set.eqns),
+                "n_solves": len(eqn_set.solves),
+                "n_requires": len(eqn_set.requires),
+                "constrained": eqn_set.is_constrained(),
+            }
+
+    def edges():
+        for eqn_set, i in set_ids.items():
+            sources = set(
+                var.solved_by for var in eqn_set.requires if var.solved_by in set_ids
+            )
+            for source in sources:
+                yield "s%d" % set_ids[source], "s%d" % i
+
+    return nodes(), edges()
+
+
+# ------------------------------------------------------------------------------
+# Writers
+# ------------------------------------------------------------------------------
+
+
+def write_json(graph, f):
+    """
+    Write a `(nodes, edges)` graph to a text file as JSON
+
+    Format: `{"nodes": [{"id": ..., attrs...}], "edges": [[source, target]]}`
+    """
+    nodes, edges = graph
+
+    f.write('{"nodes": [')
+    for i, (node_id, attrs) in enumerate(nodes):
+        if i:
+            f.write(",")
+        node = {"id": node_id}
+        node.update(attrs)
+        f.write("\n" + json.dumps(node))
+
+    f.write('\n], "edges": [')
+    for i, edge in enumerate(edges):
+        if i:
+            f.write(",")
+        f.write("\n" + json.dumps(edge))
+
+    f.write("\n]}\n")
+
+
+_GRAPHML_TYPES = {bool: "boolean", int: "int", float: "double", str: "string"}
+
+
+def write_graphml(graph, f, directed=False):
+    """
+    Write a `(nodes, edges)` graph to a text file as GraphML
+
+    The var/eqn graph of `solver_graph` is undirected; pass `directed`
+    for the DAG of `eqn_set_graph`. Attribute keys have to be declared
+    before the graph, so nodes are collected first to declare the keys
+    of all of them (edges are still streamed).
+    """
+    nodes, edges = graph
+    nodes = list(nodes)
+
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+
+    # first value of each key, for its type
+    keys = {}
+    for node_id, attrs in nodes:
+        for key, val in attrs.items():
+            keys.setdefault(key, val)
+
+    for key, val in keys.items():
+        f.write(
+            '<key id=%s for="node" attr.name=%s attr.type="%s"/>\n'
+            % (quoteattr(key), quoteattr(key), _GRAPHML_TYPES.get(type(val), "string"))
+        )
+
+    f.write('<graph edgedefault="%s">\n' % ("directed" if directed else "undirected"))
+
+    for node_id, attrs in nodes:
+        f.write("<node id=%s>" % quoteattr(node_id))
+        for key, val in attrs.items():
+            val = str(val).lower() if isinstance(val, bool) else str(val)
+            f.write("<data key=%s>%s</data>" % (quoteattr(key), escape(val)))
+        f.write("</node>\n")
+
+    for source, target in edges:
+        f.write(
+            "<edge source=%s target=%s/>\n" % (quoteattr(source), quoteattr(target))
+        )
+
+    f.write("</graph>\n</graphml>\n")
@@ -0,0 +1,423 @@
+"""
+journal: undo and redo solver states without splitting or solving
+
+The state of a solver is spread over its elements: the links between
+vars, eqns and equation sets (which set solves or requires a var, which
+eqns a var still takes part in, ...), the union-find classes of var
+aliases, the values of vars and parameters, and the constraints' own
+settings (set values, branches: see `Constraint.settings`). A `Journal`
+keeps a capture of all of it, and every `record` stores only the
+elements whose capture changed since the last one, with their old and
+new state. Undoing or redoing an entry puts those states back, which
+takes time proportional to the change and no splitting or solving.
+
+An edit that only changes values (a dimension, a set value, a flipped
+branch, a drag) is recorded from the elements it touched and the vars
+the update changed, so recording costs as much as the update did. The
+owner of the journal (a GCS) reports the elements it edits (`touch`)
+and edits that change the structure (`restructure`). A structural edit
+is followed by a reset and a re-split of the whole system, and its
+record compares the captures of every element, which is cheap next to
+that. Because the solver hands back the same equation set objects for
+parts of the decomposition that didn't change (see
+`Solver.reuse_eqn_sets`), such a record holds only the sets it actually
+changed.
+"""
+
+from collections import deque
+
+from .solve_elements import Var, Eqn, EqnSet, Parameter
+
+# ------------------------------------------------------------------------------
+# Element states
+# ------------------------------------------------------------------------------
+
+
+def _var_state(var):
+    return (
+        frozenset(var.eqns),
+        frozenset(var.all_eqns),
+        var.solved_by,
+        frozenset(var.required_by),
+        var.alias,
+        frozenset(var.aliases),
+        var._val,
+    )
+
+
+def _restore_var(var, state):
+    eqns, all_eqns, var.solved_by, required_by, var.alias, aliases, var._val = state
+    var.eqns = set(eqns)
+    var.all_eqns = set(all_eqns)
+    var.required_by = set(required_by)
+    var.aliases = set(aliases)
+
+    # a value (or alias) was put back: cached residuals are stale
+    var._version += 1
+    for eqn in var.all_eqns:
+        eqn.invalidate()
+
+
+def _eqn_state(eqn):
+    return (
+        frozenset(eqn.vars),
+        frozenset(eqn.all_vars),
+        frozenset(eqn.params),
+        eqn.eqn_set,
+    )
+
+
+def _restore_eqn(eqn, state):
+    vars, all_vars, params, eqn.eqn_set = state
+    eqn.vars = set(vars)
+    eqn.all_vars = set(all_vars)
+    eqn.params = set(params)
+    eqn.invalidate()
+
+
+def _eqn_set_state(eqn_set):
+    return (
+        frozenset(eqn_set.eqns),
+        frozenset(eqn_set.vars),
+        frozenset(eqn_set.all_vars),
+        frozenset(eqn_set.solves),
+        frozenset(eqn_set.requires),
+    )
+
+
+def _restore_eqn_set(eqn_set, state):
+    eqns, vars, all_vars, solves, requires = state
+    eqn_set.eqns = set(eqns)
+    eqn_set.vars = set(vars)
+    eqn_set.all_vars = set(all_vars)
+    eqn_set.solves = set(solves)
+    eqn_set.requires = set(requires)
+
+
+def _param_state(param):
+    return (frozenset(param.eqns), param._val)
+
+
+def _restore_param(param, state):
+    eqns, param._val = state
+    param.eqns = set(eqns)
+    param.version += 1
+
+
+_STATES = {
+    Var: (_var_state, _restore_var),
+    Eqn: (_eqn_state, _restore_eqn),
+    EqnSet: (_eqn_set_state, _restore_eqn_set),
+    Parameter: (_param_state, _restore_param),
+}
+
+
+def _functions(obj):
+    for cls in type(obj).__mro__:
+        if cls in _STATES:
+            return _STATES[cls]
+    return None
+
+
+def _capture(obj):
+    functions = _functions(obj)
+    if functions is not None:
+        return functions[0](obj)
+
+    # constraints: their own settings (set value, branch, lock, ...)
+    get_settings = getattr(obj, "get_settings", None)
+    return get_settings() if get_settings is not None else ()
+
+
+def _restore(obj, state):
+    functions = _functions(obj)
+    if functions is not None:
+        functions[1](obj, state)
+    elif state:
+        # a set value or branch that was put back changes the residuals
+        obj.set_settings(state)
+
+
+# ------------------------------------------------------------------------------
+# Journal
+# ------------------------------------------------------------------------------
+
+
+class _Pending(object):
+    """Key of the solver's pending changes in the captured states"""
+
+    __slots__ = ()
+
+
+_PENDING = _Pending()
+
+
+class Journal(object):
+    """
+    Bounded undo/redo journal of the states of a solver
+
+    Parameters
+    ----------
+    solver
+        the `Solver` whose states are recorded
+    owner
+        object with `geometry` and `constraints` sets that change along
+        with the solver (like a GCS), or None
+    max_entries
+        number of undo steps that are kept (older ones are dropped)
+    """
+
+    __slots__ = (
+        "solver",  # Solver being journaled
+        "owner",  # object with geometry and constraints sets (or None)
+        "states",  # element -> captured state at the last record
+        "undo_entries",  # deque of entries: element -> (old, new state)
+        "redo_entries",  # entries that were undone, last one last
+        "restored",  # number of element states put back by undo/redo
+        "touched",  # elements edited since the last record
+        "structural",  # true if the structure changed since the last record
+    )
+
+    def __init__(self, solver, owner=None, max_entries=100):
+        self.solver = solver
+        self.owner = owner
+
+        self.undo_entries = deque(maxlen=max_entries)
+        self.redo_entries = []
+        self.restored = 0
+        self.touched = set()
+        self.structural = False
+
+        self.states = self._capture_all()
+
+    def touch(self, elements):
+        """Note elements whose values or settings were edited"""
+        self.touched.update(elements)
+
+    def restructure(self):
+        """Note an edit of the structure (geometry, vars or constraints)"""
+        self.structural = True
+
+    def _elements(self):
+        solver = self.solver
+        yield solver
+        yield _PENDING
+        if solver.aliases is not None:
+            yield solver.aliases
+        if self.owner is not None:
+            yield self.owner
+
+        yield from solver.vars
+        yield from solver.eqn_sets
+        yield from solver.modified_eqn_sets
+
+        for eqn in solver.eqns:
+            yield eqn
+            yield from eqn.params
+            if eqn.parent is not None:
+                yield eqn.parent
+
+    def _capture_element(self, obj):
+        solver = self.solver
+
+        if obj is solver:
+            return (
+                frozenset(solver.vars),
+                frozenset(solver.eqns),
+                frozenset(solver.eqn_sets),
+            )
+        if obj is _PENDING:
+            return (
+                solver.modified,
+                frozenset(solver.modified_eqn_sets),
+                frozenset(solver.modified_vars),
+            )
+        if obj is solver.aliases:
+            return (
+                frozenset(obj.eqns),
+                tuple(obj.root.items()),
+                tuple((root, frozenset(m)) for root, m in obj.members.items()),
+            )
+        if obj is self.owner:
+            return (frozenset(obj.geometry), frozenset(obj.constraints))
+
+        return _capture(obj)
+
+    def _restore_element(self, obj, state):
+        solver = self.solver
+
+        if obj is solver:
+            vars, eqns, eqn_sets = state
+            solver.vars = set(vars)
+            solver.eqns = set(eqns)
+            solver.eqn_sets = set(eqn_sets)
+        elif obj is _PENDING:
+            solver.modified, modified_eqn_sets, modified = state
+            solver.modified_eqn_sets = set(modified_eqn_sets)
+            solver.modified_vars = set(modified)
+        elif obj is solver.aliases:
+            eqns, root, members = state
+            obj.eqns = set(eqns)
+            obj.root = dict(root)
+            obj.members = dict((r, set(m)) for r, m in members)
+        elif obj is self.owner:
+            geometry, constraints = state
+            obj.geometry = set(geometry)
+            obj.constraints = set(constraints)
+        else:
+            _restore(obj, state)
+
+    def _capture_all(self):
+        states = {}
+        for obj in self._elements():
+            if obj not in states:
+                states[obj] = self._capture_element(obj)
+        return states
+
+    # --------------------------------------------
+    # record, undo, redo
+    # --------------------------------------------
+
+    def _record_all(self):
+        """Entry of every element whose capture changed"""
+        states = self._capture_all()
+
+        entry = {}
+        for obj, state in states.items():
+            old = self.states.get(obj)
+            if old != state:
+                entry[obj] = (old, state)
+
+        # elements that left the solver (like deleted eqns)
+        for obj, old in self.states.items():
+            if obj not in states:
+                state = self._capture_element(obj)
+                if state != old:
+                    entry[obj] = (old, state)
+
+        self.states = states
+        return entry
+
+    def _record_touched(self):
+        """Entry of the edited elements and the vars the solver updated"""
+        solver = self.solver
+        elements = set(self.touched)
+        elements |= solver.updated_vars
+        elements |= solver.modified_vars
+        elements.add(_PENDING)
+
+        entry = {}
+        for obj in elements:
+            state = self._capture_element(obj)
+            old = self.states.get(obj)
+            if old != state:
+                entry[obj] = (old, state)
+                self.states[obj] = state
+
+        return entry
+
+    def record(self):
+        """
+        Record the changes since the last record as one undo step
+
+        Returns whether anything changed. Recording drops the redo steps.
+        """
+        solver = self.solver
+        if self.structural or solver.modified or solver.modified_eqn_sets:
+            entry = self._record_all()
+        else:
+            entry = self._record_touched()
+
+        self.touched = set()
+        self.structural = False
+
+        if not entry:
+            return False
+
+        self.undo_entries.append(entry)
+        self.redo_entries = []
+        return True
+
+    def _apply(self, entry, index):
+        # index 0: old states (undo), 1: new states (redo)
+        changed_vars = set()
+
+        for obj, states in entry.items():
+            state = states[index]
+            # an element that didn't exist yet keeps its last capture
+            if state is not None:
+                self._restore_element(obj, state)
+                self.states[obj] = state
+
+            if isinstance(obj, Var):
+                changed_vars.add(obj)
+            elif isinstance(obj, EqnSet):
+                self.solver.invalidate(obj)
+            elif _functions(obj) is None:
+                # constraint settings: the sets may not be linear anymore
+                for eqn in getattr(obj, "equations", ()):
+                    if eqn.eqn_set is not None:
+                        self.solver.invalidate(eqn.eqn_set)
+
+        self.solver.residual_engine = None
+        self.solver.updated_vars = changed_vars
+        self.solver.add_aliases(changed_vars)
+        self.restored += len(entry)
+
+    def pending(self):
+        """Are there changes since the last record?"""
+        solver = self.solver
+        return bool(
+            self.touched
+            or self.structural
+            or solver.modified
+            or solver.modified_eqn_sets
+            or solver.modified_vars
+        )
+
+    def can_undo(self):
+        return bool(self.undo_entries)
+
+    def can_redo(self):
+        return bool(self.redo_entries)
+
+    def undo(self):
+        """
+        Go back to the state of the previous record
+
+        Changes that were not recorded yet are recorded first (and are
+        what is undone). Returns False if there is nothing to undo.
+        """
+        if self.pending():
+            self.record()
+
+        if not self.undo_entries:
+            return False
+
+        entry = self.undo_entries.pop()
+        self._apply(entry, 0)
+        self.redo_entries.append(entry)
+        return True
+
+    def redo(self):
+        """Go forward to the state of the next record (False if none)"""
+        if self.pending():
+            # edited since the undo: the redo steps don't apply anymore
+            self.record()
+
+        if not self.redo_entries:
+            return False
+
+        entry = self.redo_entries.pop()
+        self._apply(entry, 1)
+        self.undo_entries.append(entry)
+        return True
+
+    def stats(self):
+        """Counters for reporting"""
+        return {
+            "undo": len(self.undo_entries),
+            "redo": len(self.redo_entries),
+            "elements": len(self.states),
+            "restored": self.restored,
+        }
@@ -0,0 +1,247 @@
+"""
+linear_solver: solve batches of linear equation sets with a sparse LU
+
+Many equations are linear in the vars they solve for (setting a value,
+a 1D offset with a locked branch, a point on a known line), and are
+tagged as such (see `Eqn.linear_in`). Instead of root finding these
+equation sets one at a time, `solve_eqn_sets` hands all linear sets
+that are ready to be solved at the same time to a `LinearSolver`. They
+are independent of each other, so together they form one sparse block
+diagonal system `A dV = -F(V0)`, which is solved with a single LU
+factorization.
+
+`A` is found by finite differences over groups of structurally
+independent vars (exact for affine equations). If all equations of a
+batch have fixed coefficients, the factorization is kept, and later
+solves of the same batch (only required vars or parameters changed)
+reuse it without evaluating `A` again. Only the batches that were used
+last are kept (`max_batches`).
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from .constraint_solver import column_coloring
+
+
+def is_linear(eqn_set):
+    """Is a (solved) constrained equation set linear in the vars it solves"""
+    if not eqn_set.solves or not eqn_set.is_constrained():
+        return False
+
+    for eqn in eqn_set.eqns:
+        linear_in = set(var.rep() for var in eqn.linear_in if var not in eqn.params)
+        if not eqn.all_vars & eqn_set.solves <= linear_in:
+            return False
+
+    return True
+
+
+class LinearSolver(object):
+    """
+    Solver for batches of linear equation sets
+
+    Parameters
+    ----------
+    tol
+        residual tolerance that a solution has to satisfy (otherwise
+        the sets are solved one by one with the regular solve function)
+    max_batches
+        number of batch layouts (and factorizations) kept, least
+        recently used ones are dropped first
+    """
+
+    __slots__ = (
+        "tol",  # residual tolerance
+        "max_batches",  # LRU budget of batches
+        "linear",  # eqn_set -> is linear (cached)
+        "batches",  # frozenset of eqn sets -> batch layout and LU (LRU order)
+        "batch_keys",  # eqn_set -> keys of the batches it is part of
+        "factorizations",  # number of LU factorizations
+        "reuses",  # number of solves that reused a factorization
+        "fallbacks",  # number of batches solved set by set instead
+    )
+
+    def __init__(self, tol=1.0e-8, max_batches=64):
+        self.tol = tol
+        self.max_batches = max_batches
+
+        self.linear = {}
+        self.batches = OrderedDict()
+        self.batch_keys = {}
+
+        self.factorizations = 0
+        self.reuses = 0
+        self.fallbacks = 0
+
+    def is_linear(self, eqn_set):
+        """Is an equation set linear (cached until invalidated)"""
+        linear = self.linear.get(eqn_set)
+        if linear is None:
+            linear = self.linear[eqn_set] = is_linear(eqn_set)
+        return linear
+
+    def invalidate(self, eqn_set):
+        """Forget an equation set and every batch it was part of"""
+        self.linear.pop(eqn_set, None)
+
+        for key in self.batch_keys.pop(eqn_set, ()):
+            self.batches.pop(key, None)
+
+    def clear(self):
+        """Forget all equation sets and batches"""
+        self.linear.clear()
+        self.batches.clear()
+        self.batch_keys.clear()
+
+    def __getstate__(self):
+        # LU factorizations can't be copied or pickled: a copy of this
+        #   solver factors its batches again
+        state = {slot: getattr(self, slot) for slot in self.__slots__}
+        state["batches"] = OrderedDict()
+        state["batch_keys"] = {}
+        return None, state
+
+    def stats(self):
+        """Counters of factorizations, reuses and fallbacks"""
+        return {
+            "factorizations": self.factorizations,
+            "reuses": self.reuses,
+            "fallbacks": self.fallbacks,
+        }
+
+    # --------------------------------------------
+    # solve
+    # --------------------------------------------
+
+    def _batch(self, eqn_sets):
+        key = frozenset(eqn_sets)
+        batch = self.batches.get(key)
+
+        if batch is not None:
+            self.batches.move_to_end(key)
+            return batch
+
+        set_list = list(eqn_sets)
+        var_list = [var for eqn_set in set_list for var in eqn_set.solves]
+        eqn_list = [eqn for eqn_set in set_list for eqn in eqn_set.eqns]
+        groups, col_rows = column_coloring(eqn_list, var_list)
+        fixed = all(eqn.fixed_coeffs for eqn in eqn_list)
+
+        # [var_list, eqn_list, groups, col_rows, fixed coeffs, LU, set_list]
+        batch = [var_list, eqn_list, groups, col_rows, fixed, None, set_list]
+        self.batches[key] = batch
+
+        for eqn_set in set_list:
+            self.batch_keys.setdefault(eqn_set, set()).add(key)
+
+        while len(self.batches) > self.max_batches:
+            old_key, _ = self.batches.popitem(last=False)
+            for eqn_set in old_key:
+                keys = self.batch_keys.get(eqn_set)
+                if keys is not None:
+                    keys.discard(old_key)
+                    if not keys:
+                        del self.batch_keys[eqn_set]
+
+        return batch
+
+    def solve(self, eqn_sets, solve_func):
+        """
+        Solve independent linear equation sets together
+
+        Falls back to `solve_func` for each set if the batch can't be
+        solved directly (singular, or not actually linear).
+
+        Returns None on success, otherwise the equation set that failed
+        """
+        batch = self._batch(eqn_sets)
+        var_list, eqn_list, groups, col_rows, fixed, lu, set_list = batch
+
+        def F(V):
+            for var, val in zip(var_list, V):
+                var.val = val
+
+            return np.array([eqn() for eqn in eqn_list], dtype=float)
+
+        V0 = np.array([var.val for var in var_list], dtype=float)
+        F0 = F(V0)
+
+        A = None
+        if lu is not None:
+            self.reuses += 1
+        else:
+            # affine, so a unit step gives the exact coefficients
+            rows, cols, vals = [], [], []
+            for group in groups:
+                V = V0.copy()
+                V[group] += 1.0
+                dF = F(V) - F0
+
+                for j in group:
+                    for i in col_rows[j]:
+                        rows.append(i)
+                        cols.append(j)
+                        vals.append(dF[i])
+
+            A = sp.csc_matrix((vals, (rows, cols)), shape=(len(F0), len(V0)))
+
+            try:
+                lu = splu(A)
+            except RuntimeError:  # singular
+                lu = None
+
+            self.factorizations += 1
+
+            if fixed and lu is not None:
+                batch[5] = lu
+
+        R = None
+        if lu is not None:
+            R = F(V0 - lu.solve(F0))
+            if np.all(np.abs(R) < self.tol):
+                return None
+
+        # not solvable as a linear system: one set at a time, and the sets
+        #   to blame are kept out of batches until they are invalidated
+        self.fallbacks += 1
+        self.invalidate_batch(eqn_sets)
+        for eqn_set in self._failed(set_list, A, R):
+            self.linear[eqn_set] = False
+        F(V0)
+
+        for eqn_set in eqn_sets:
+            if not solve_func(eqn_set):
+                return eqn_set
+
+        return None
+
+    def _failed(self, set_list, A, R):
+        """
+        Sets of a batch that failed: the ones whose equations don't hold
+        after the solve (`R`, the residuals), or with a singular block of
+        the batch matrix `A` if it couldn't be factorized. `set_list` is
+        the batch's own order of sets, which its rows and columns follow.
+        """
+        failed = []
+        i = j = 0
+        for eqn_set in set_list:
+            m, n = len(eqn_set.eqns), len(eqn_set.solves)
+            if R is not None:
+                if np.any(np.abs(R[i : i + m]) >= self.tol):
+                    failed.append(eqn_set)
+            elif np.linalg.matrix_rank(A[i : i + m, j : j + n].toarray()) < n:
+                failed.append(eqn_set)
+            i, j = i + m, j + n
+
+        # the batch as a whole failed, even if no single set shows it
+        return failed or list(set_list)
+
+    def invalidate_batch(self, eqn_sets):
+        """Drop the kept factorization of a batch"""
+        batch = self.batches.get(frozenset(eqn_sets))
+        if batch is not None:
+            batch[5] = None
@@ -0,0 +1,146 @@
+"""
+rendering: batched, incremental matplotlib rendering of geometry
+
+`Geometry.plot` adds one or more artists per element, which becomes
+slow for large sketches and has to be redone from scratch every frame.
+A `SketchRenderer` draws a whole sketch with three artists: a
+`LineCollection` for line segments, a `PatchCollection` for circles and
+a single scatter for points (including segment endpoints and circle
+centers, like `Geometry.plot`). After a solve, only the entries that
+depend on changed vars are rewritten.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.patches import Circle as CirclePatch
+
+from . import geom2d
+
+
+class SketchRenderer(object):
+    """
+    Draw geometry elements with one artist per kind of element
+
+    Parameters
+    ----------
+    geometry
+        iterable of `geom2d` geometry elements
+    ax
+        matplotlib axes to draw on (defaults to the current axes)
+    """
+
+    __slots__ = (
+        "ax",  # axes drawn on
+        "points",  # list of (x var, y var) for each scatter marker
+        "segments",  # list of (x1, y1, x2, y2 vars) for each line segment
+        "circles",  # list of (cx, cy, r vars) for each circle
+        "var_refs",  # var -> list of (kind, index) that depend on it
+        "offsets",  # (n, 2) array of marker positions
+        "segment_data",  # (n, 2, 2) array of segment endpoints
+        "patches",  # list of circle patches
+        "scatter",  # PathCollection of markers
+        "lines",  # LineCollection of segments
+        "circle_collection",  # PatchCollection of circles
+        "dirty",  # vars changed since the last refresh
+    )
+
+    def __init__(self, geometry, ax=None):
+        self.ax = ax or plt.gca()
+
+        self.points = []
+        self.segments = []
+        self.circles = []
+
+        for g in geometry:
+            if isinstance(g, geom2d.Point):
+                self.points.append((g.x, g.y))
+            elif isinstance(g, geom2d.LineSegment):
+                self.segments.append(tuple(g.vars))
+                self.points.append((g.p1.x, g.p1.y))
+                self.points.append((g.p2.x, g.p2.y))
+            elif isinstance(g, geom2d.Circle):
+                self.circles.append(tuple(g.vars))
+                self.points.append((g.p.x, g.p.y))
+
+        self.var_refs = {}
+        for kind, items in (
+            ("point", self.points),
+            ("segment", self.segments),
+            ("circle", self.circles),
+        ):
+            for i, item_vars in enumerate(items):
+                for var in item_vars:
+                    self.var_refs.setdefault(var, []).append((kind, i))
+
+        self.offsets = np.array(
+            [[x.val, y.val] for x, y in self.points], dtype=float
+        ).reshape(-1, 2)
+        self.segment_data = np.array(
+            [[[x1.val, y1.val], [x2.val, y2.val]] for x1, y1, x2, y2 in self.segments],
+            dtype=float,
+        ).reshape(-1, 2, 2)
+        self.patches = [
+            CirclePatch((cx.val, cy.val), r.val) for cx, cy, r in self.circles
+        ]
+
+        self.lines = LineCollection(self.segment_data)
+        self.circle_collection = PatchCollection(
+            self.patches, facecolor="none", edgecolor="C0"
+        )
+        self.ax.add_collection(self.lines)
+        self.ax.add_collection(self.circle_collection)
+        self.scatter = self.ax.scatter(self.offsets[:, 0], self.offsets[:, 1])
+
+        self.dirty = set()
+        self.autoscale()
+
+    def refresh(self, vars=None):
+        """
+        Update the artists for changed vars
+
+        If `vars` is None, the vars accumulated in `dirty` are used
+        """
+        if vars is None:
+            vars, self.dirty = self.dirty, set()
+
+        changed = {"point": set(), "segment": set(), "circle": set()}
+        for var in vars:
+            for kind, i in self.var_refs.get(var, ()):
+                changed[kind].add(i)
+
+        for i in changed["point"]:
+            x, y = self.points[i]
+            self.offsets[i] = (x.val, y.val)
+
+        for i in changed["segment"]:
+            x1, y1, x2, y2 = self.segments[i]
+            self.segment_data[i] = ((x1.val, y1.val), (x2.val, y2.val))
+
+        for i in changed["circle"]:
+            cx, cy, r = self.circles[i]
+            self.patches[i].center = (cx.val, cy.val)
+            self.patches[i].radius = r.val
+
+        if changed["point"]:
+            self.scatter.set_offsets(self.offsets)
+        if changed["segment"]:
+            self.lines.set_segments(self.segment_data)
+        if changed["circle"]:
+            self.circle_collection.set_paths(self.patches)
+
+    def autoscale(self):
+        """Fit the axes limits to the drawn geometry"""
+        self.ax.update_datalim(self.offsets)
+        self.ax.update_datalim(self.segment_data.reshape(-1, 2))
+        for cx, cy, r in self.circles:
+            self.ax.update_datalim(
+                [(cx.val - r.val, cy.val - r.val), (cx.val + r.val, cy.val + r.val)]
+            )
+        self.ax.autoscale_view()
+
+    def remove(self):
+        """Remove all artists from the axes"""
+        for artist in (self.scatter, self.lines, self.circle_collection):
+            if artist in self.ax.collections:
+                artist.remove()
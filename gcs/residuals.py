@@ -0,0 +1,149 @@
+"""
+residuals: evaluate the residuals of a whole system at array speed
+
+Checking whether a system is satisfied means evaluating every equation
+one Python call at a time. A `ResidualEngine` instead groups equations
+by the kind of their constraint (see `Constraint.vectorized`), gathers
+each group's var values into one array and evaluates the group with a
+single NumPy call. Equations without a vectorized form (or whose
+constraint hasn't recorded its branch yet) are evaluated on their own.
+
+The grouping is built once for a set of equations, and can be reused
+for as long as the equations don't change. A changed constant (like the
+value of a `SetVar`) is updated in place with `refresh`. The residuals
+are kept along with the versions of the vars they were evaluated at, so
+checking again when no value changed costs no evaluation.
+"""
+
+from operator import attrgetter
+
+import numpy as np
+
+_val = attrgetter("val")
+_version = attrgetter("version")
+
+
+class ResidualEngine(object):
+    """
+    Grouped, vectorized evaluation of the residuals of a list of eqns
+
+    Parameters
+    ----------
+    eqns
+        equations to evaluate (residuals are returned in this order)
+    """
+
+    __slots__ = (
+        "eqns",  # list of equations
+        "groups",  # list of [f, eqn indices, flat var list, consts]
+        "others",  # indices of eqns that are evaluated on their own
+        "positions",  # eqn -> (group, row in the group's consts)
+        "all_vars",  # vars (and parameters) of all eqns
+        "versions",  # versions of all_vars at the last evaluation (or None)
+        "residuals",  # residual vector of the last evaluation
+    )
+
+    def __init__(self, eqns):
+        self.eqns = list(eqns)
+        self.others = []
+        self.positions = {}
+
+        groups = {}
+        for i, eqn in enumerate(self.eqns):
+            vectorized = getattr(eqn.parent, "vectorized", None)
+            kind = vectorized(eqn) if vectorized is not None else None
+
+            if kind is None:
+                self.others.append(i)
+                continue
+
+            f, consts = kind
+            group = groups.setdefault((f, len(eqn.var_list)), [f, [], [], []])
+            self.positions[eqn] = (group, len(group[1]))
+            group[1].append(i)
+            group[2].extend(eqn.var_list)
+            group[3].append(consts)
+
+        self.groups = []
+        for group in groups.values():
+            f, rows, var_list, consts = group
+            group[1] = np.array(rows, dtype=int)
+            group[3] = np.array(consts, dtype=float).reshape(len(rows), -1)
+            self.groups.append(group)
+
+        self.all_vars = list(set(var for eqn in self.eqns for var in eqn.var_list))
+        self.versions = None
+        self.residuals = None
+
+    def refresh(self, eqns):
+        """
+        Update the constants of eqns whose constraints changed them
+
+        Returns False if an eqn changed its kind of evaluation (like a
+        constraint that was locked onto a branch), in which case the
+        engine has to be built again.
+        """
+        self.versions = None
+
+        for eqn in eqns:
+            position = self.positions.get(eqn)
+            vectorized = getattr(eqn.parent, "vectorized", None)
+            kind = vectorized(eqn) if vectorized is not None else None
+
+            if position is None:
+                if kind is not None:
+                    return False
+                continue
+
+            group, row = position
+            if kind is None or kind[0] is not group[0]:
+                return False
+            group[3][row] = kind[1]
+
+        return True
+
+    def evaluate(self):
+        """Residual vector of all eqns, with the current var values"""
+        versions = np.fromiter(
+            map(_version, self.all_vars), dtype=np.int64, count=len(self.all_vars)
+        )
+        if self.versions is not None and np.array_equal(versions, self.versions):
+            return self.residuals
+
+        R = np.empty(len(self.eqns), dtype=float)
+
+        for f, rows, var_list, consts in self.groups:
+            x = np.fromiter(map(_val, var_list), dtype=float, count=len(var_list))
+            R[rows] = f(x.reshape(len(rows), -1), consts)
+
+        for i in self.others:
+            R[i] = self.eqns[i]()
+
+        self.versions = versions
+        self.residuals = R
+        return R
+
+    def check(self, tol=1.0e-6):
+        """
+        Evaluate all eqns, returning `(residuals, max error, violated)`
+
+        `violated` lists the constraints (or eqns without one) that have
+        an equation whose absolute residual is not below `tol`
+        """
+        R = self.evaluate()
+        E = np.abs(R)
+
+        max_error = float(E.max()) if len(E) else 0.0
+        if max_error < tol:
+            return R, max_error, []
+
+        violated = []
+        seen = set()
+        for i in np.flatnonzero(~(E < tol)):
+            eqn = self.eqns[i]
+            item = eqn.parent if eqn.parent is not None else eqn
+            if item not in seen:
+                seen.add(item)
+                violated.append(item)
+
+        return R, max_error, violated
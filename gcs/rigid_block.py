@@ -0,0 +1,325 @@
+"""
+rigid_block: fully dimensioned sub-shapes placed as rigid bodies
+
+Drawings often reuse sub-shapes whose dimensions fix their geometry up
+to where they are and which way they face. Solved with the rest of the
+sketch, every var of such a shape is an unknown of the parent system,
+and its constraints are solved again whenever their equation sets are
+touched.
+
+A `RigidBlock` takes the geometry and constraints of a sub-shape and
+solves copies of them once, in a `GCS` of its own, with its first point
+held where it is and its point farthest from that held to the direction
+it is in. The solved coordinates relative to the first point become
+`Parameter`s of the block's `RigidPlacement` constraint, which ties the
+block's geometry in the parent to three vars: a translation (`tx`,
+`ty`: where the first point is) and a rotation (`angle`) about the
+first point. Other vars (like radii) keep their local values. Other
+constraints of the parent can use the block's geometry like any other,
+and only the placement is solved for.
+
+The block's constraints are moved into the local copy: the original
+constraints are detached from the geometry and can't be added to a
+solver. `RigidBlock.modify_parameter` changes one of their dimensions
+(given by the original `Parameter`), re-solves the local copy from its
+previous solution and returns the local coordinates that changed, for
+the parent to update (see `GCS.modify_block_parameter`).
+"""
+
+import copy
+from math import cos, sin, hypot
+
+from .solve_elements import Eqn, EqualityEqn, Var, Parameter
+from . import geom2d as g2d
+from .geom_solver import GCS
+
+# ----------------------------------------------------------
+# Rigid blocks
+# ----------------------------------------------------------
+
+
+def _points(geom):
+    """Points of a geometry element (itself, or the ones it is made of)"""
+    if isinstance(geom, g2d.Point):
+        return [geom]
+    return [val for val in vars(geom).values() if isinstance(val, g2d.Point)]
+
+
+class RigidBlock(g2d.Geometry):
+    """
+    Geometry and constraints solved once and placed as a rigid body
+
+    Its vars are the placement: `tx`, `ty` and `angle`. Add it to a
+    `GCS` with `GCS.add_block`, which also adds its geometry and its
+    placement constraint.
+
+    Parameters
+    ----------
+    name
+        name of the block (and prefix of its vars)
+    geometry
+        geometry elements of the block, with at least two points
+    constraints
+        constraints between the block's geometry (not yet added to a
+        solver), which have to fix it up to a translation and rotation
+    solve_tol
+        tolerance of the local solve
+    """
+
+    def __init__(self, name, geometry, constraints, solve_tol=1.0e-6):
+        super().__init__(name)
+
+        self.geometry = list(geometry)
+        self.constraints = list(constraints)
+
+        self.points = []
+        seen = set()
+        for geom in self.geometry:
+            for p in _points(geom):
+                if p not in seen:
+                    seen.add(p)
+                    self.points.append(p)
+
+        point_vars = set(var for p in self.points for var in (p.x, p.y))
+        self.scalars = [
+            var for geom in self.geometry for var in geom.vars if var not in point_vars
+        ]
+
+        if len(self.points) < 2:
+            raise ValueError("rigid block %s needs at least two points" % name)
+
+        # local copies, without the eqns of constraints outside the block
+        memo = {}
+        for var in list(point_vars) + self.scalars:
+            memo[id(var)] = Var(var.name, var.val)
+
+        params = set(
+            param
+            for cstr in self.constraints
+            for eqn in cstr.equations
+            for param in eqn.params
+        )
+        for param in params:
+            memo[id(param)] = Parameter(param.name, param.val)
+
+        local_geometry = copy.deepcopy(self.geometry, memo)
+        local_constraints = copy.deepcopy(self.constraints, memo)
+
+        for cstr in local_constraints:
+            for eqn in cstr.equations:
+                for var in eqn.all_vars:
+                    var.eqns.add(eqn)
+                    var.all_eqns.add(eqn)
+                for param in eqn.params:
+                    param.eqns.add(eqn)
+
+        self.local_vars = {var: memo[id(var)] for var in point_vars}
+        self.local_vars.update((var, memo[id(var)]) for var in self.scalars)
+        self.params = {param: memo[id(param)] for param in params}
+
+        # the originals now only live on in the local copy
+        for cstr in self.constraints:
+            for eqn in cstr.equations:
+                eqn.delete()
+
+        # frame: the first point, and the direction to the farthest one
+        origin = self.points[0]
+        ox, oy = origin.x.val, origin.y.val
+        far = max(self.points, key=lambda p: hypot(p.x.val - ox, p.y.val - oy))
+        if hypot(far.x.val - ox, far.y.val - oy) == 0.0:
+            raise ValueError("rigid block %s has no extent" % name)
+
+        local_origin = memo[id(origin)]
+        frame = g2d.LineSegment(name + ".frame", ox, oy, far.x.val, far.y.val)
+        frame_constraints = [
+            g2d.SetVar(name + ".ox", local_origin.x, ox),
+            g2d.SetVar(name + ".oy", local_origin.y, oy),
+            g2d.PointOnLine(name + ".dir", memo[id(far)], frame),
+        ]
+        for var in frame.vars:
+            frame_constraints.append(g2d.SetVar(var.name, var, var.val))
+
+        self.solver = GCS(solve_tol=solve_tol)
+        for geom in local_geometry + [frame]:
+            self.solver.add_geometry(geom)
+        for cstr in local_constraints + frame_constraints:
+            self.solver.add_constraint(cstr)
+
+        self.solver.update()
+        self.solves = 1
+
+        if not self.solver.is_constrained():
+            raise ValueError("rigid block %s is not fully dimensioned" % name)
+        if not self.solver.is_satisfied():
+            raise ValueError("rigid block %s could not be solved" % name)
+
+        self.origin = (ox, oy)
+        self.local = {
+            var: Parameter(var.name + ".local", val)
+            for var, val in self._local_values()
+        }
+
+        # placement vars, and the geometry where the placement puts it
+        self.tx = Var(name + ".tx", ox)
+        self.ty = Var(name + ".ty", oy)
+        self.angle = Var(name + ".angle", 0.0)
+        self.vars = [self.tx, self.ty, self.angle]
+
+        for var, param in self.local.items():
+            var.val = param.val
+        for p in self.points:
+            p.x.val += ox
+            p.y.val += oy
+
+        self.placement = RigidPlacement(name + ".placement", self)
+
+    def _local_values(self):
+        """(member var, local value) of the local solution"""
+        ox, oy = self.origin
+        offsets = {}
+        for p in self.points:
+            offsets[p.x] = ox
+            offsets[p.y] = oy
+
+        return [
+            (var, local.val - offsets.get(var, 0.0))
+            for var, local in self.local_vars.items()
+        ]
+
+    def modify_parameter(self, param, val):
+        """
+        Change a dimension of the block and re-solve its local copy
+
+        `param` is a `Parameter` of the original constraints. Returns
+        the local coordinates that changed, as `(Parameter, value)`
+        pairs for the parent solver to apply. If the local copy can't
+        be solved, the block is left as it was and ValueError is raised.
+        """
+        state = self.get_state()
+
+        param.val = val
+        self.solver.modify_parameter(self.params[param], val)
+        self.solves += 1
+
+        if not self.solver.update():
+            self.set_state(state)
+            raise ValueError(
+                "rigid block %s could not be solved with %s = %r"
+                % (self.name, param.name, val)
+            )
+
+        return [
+            (self.local[var], local_val)
+            for var, local_val in self._local_values()
+            if local_val != self.local[var].val
+        ]
+
+    def get_state(self):
+        """Dimensions and local solution, for `set_state`"""
+        return (
+            tuple((param, param.val) for param in self.params),
+            tuple((var, local.val) for var, local in self.local_vars.items()),
+        )
+
+    def set_state(self, state):
+        """
+        Put back dimensions and the local solution from `get_state`
+
+        The local copy is not re-solved: the state is one it was solved
+        to before.
+        """
+        params, local_vals = state
+        for param, val in params:
+            param.val = val
+            self.params[param].val = val
+        for var, val in local_vals:
+            self.local_vars[var].val = val
+
+    def is_satisfied(self):
+        """Is the local copy solved?"""
+        return self.solver.is_satisfied()
+
+
+class RigidPlacement(g2d.Constraint):
+    """
+    Ties the geometry of a `RigidBlock` to its placement vars
+
+    Each point is its local coordinates, rotated by the block's angle
+    and moved by its translation; other vars equal their local values.
+    The first point is the translation, and points that are coincident
+    in the local copy (aliases there) are equal, so that the parent
+    merges them too.
+
+    Its settings are the state of the block (see `RigidBlock.get_state`),
+    so that undoing a change of a block dimension puts back the local
+    solution along with the local coordinates in the parent.
+    """
+
+    def __init__(self, name, block):
+        super().__init__(name)
+
+        self.block = block
+        local = block.local
+        local_vars = block.local_vars
+
+        origin = block.points[0]
+        placed = {}  # local (x, y) representatives -> point placed by them
+        for p in block.points:
+            key = (local_vars[p.x].rep(), local_vars[p.y].rep())
+            q = placed.setdefault(key, p)
+            if q is not p or p is origin:
+                x, y = (q.x, q.y) if q is not p else (block.tx, block.ty)
+                self.equations.append(EqualityEqn(name + ":" + p.x.name, p.x, x, self))
+                self.equations.append(EqualityEqn(name + ":" + p.y.name, p.y, y, self))
+                continue
+
+            lx, ly = local[p.x], local[p.y]
+
+            # linear (with coefficients +-1) once the angle is known
+            self.equations.append(
+                Eqn(
+                    name + ":" + p.x.name,
+                    self.residual_x,
+                    [p.x, block.tx, block.angle, lx, ly],
+                    self,
+                    linear_in=[p.x, block.tx],
+                    fixed_coeffs=True,
+                )
+            )
+            self.equations.append(
+                Eqn(
+                    name + ":" + p.y.name,
+                    self.residual_y,
+                    [p.y, block.ty, block.angle, lx, ly],
+                    self,
+                    linear_in=[p.y, block.ty],
+                    fixed_coeffs=True,
+                )
+            )
+
+        for var in block.scalars:
+            self.equations.append(
+                Eqn(
+                    name + ":" + var.name,
+                    self.residual_scalar,
+                    [var, local[var]],
+                    self,
+                    linear_in=[var],
+                    fixed_coeffs=True,
+                )
+            )
+
+    def get_settings(self):
+        return self.block.get_state()
+
+    def set_settings(self, values):
+        self.block.set_state(values)
+
+    def residual_x(self, x, tx, angle, lx, ly):
+        return x - (tx + cos(angle) * lx - sin(angle) * ly)
+
+    def residual_y(self, y, ty, angle, lx, ly):
+        return y - (ty + sin(angle) * lx + cos(angle) * ly)
+
+    def residual_scalar(self, var, local):
+        return var - local
@@ -1,4 +1,5 @@
-from math import pi
+import random
+from math import pi, atan2, cos, sin, hypot
 
 from . import geom2d as g2d
 
@@ -71,3 +72,330 @@ def problem2():
         all_vars |= set(g.vars)
 
     return geometry, variables, constraints, all_vars
+
+
+# ----------------------------------------------------------
+# Generated Problems
+# ----------------------------------------------------------
+
+
+def linkage_chain(n, seed=0, scale=100.0, noise=0.05, params=False):
+    """
+    Generated sketch: a chain of `n` dimensioned line segments
+
+    Segment lengths are around `scale` (think millimetres) and joints
+    are dimensioned by angles (radians), which gives the mix of units
+    found in real sketches. A circle sits at every third joint. The
+    dimensions are taken from a random target shape, and the initial
+    geometry is the target moved by `noise` times the segment length.
+
+    If `params` is true, dimensions are `Parameter`s instead of vars
+    fixed by `SetVar` constraints (they are listed in `all_vars` only).
+
+    Returns the same tuple as `problem2`.
+    """
+    rng = random.Random(seed)
+
+    # target shape: a random walk with steps around `scale`
+    xy = [(0.0, 0.0)]
+    heading = rng.uniform(-pi, pi)
+    for i in range(n):
+        heading += rng.uniform(-2.0, 2.0)
+        step = rng.uniform(0.1, 2.0) * scale
+        x, y = xy[-1]
+        xy.append((x + step * cos(heading), y + step * sin(heading)))
+
+    def guess(x, y):
+        return (
+            x + rng.gauss(0.0, noise * scale),
+            y + rng.gauss(0.0, noise * scale),
+        )
+
+    points = [g2d.Point("p%d" % i, *guess(x, y)) for i, (x, y) in enumerate(xy)]
+    lines = [
+        g2d.LineSegment("L%d" % i, *(guess(*xy[i]) + guess(*xy[i + 1])))
+        for i in range(n)
+    ]
+    circles = [
+        g2d.Circle("c%d" % i, *guess(*xy[i]), rng.uniform(0.05, 0.2) * scale)
+        for i in range(0, n + 1, 3)
+    ]
+
+    geometry = tuple(points) + tuple(lines) + tuple(circles)
+    variables = []
+    constraints = [
+        g2d.SetVar("x0", points[0].x, 0.0),
+        g2d.SetVar("y0", points[0].y, 0.0),
+    ]
+
+    dim_params = []
+
+    def dimension(name, val):
+        guess = val * rng.uniform(0.8, 1.2)
+        if params:
+            param = g2d.Parameter(name, val)
+            dim_params.append(param)
+            return param
+
+        var = g2d.Var(name, guess)
+        variables.append(var)
+        constraints.append(g2d.SetVar("f" + name, var, val))
+        return var
+
+    # first segment: horizontal and vertical offsets
+    (x0, y0), (x1, y1) = xy[0], xy[1]
+    constraints.append(
+        g2d.HorzDist("h0", points[0], points[1], dimension("dx0", abs(x1 - x0)))
+    )
+    constraints.append(
+        g2d.VertDist("v0", points[0], points[1], dimension("dy0", abs(y1 - y0)))
+    )
+
+    # other segments: length, and angle to the previous segment
+    for i in range(1, n):
+        (xa, ya), (xb, yb), (xc, yc) = xy[i - 1], xy[i], xy[i + 1]
+        d = ((xc - xb) ** 2 + (yc - yb) ** 2) ** 0.5
+        a = abs(atan2(xc - xb, yc - yb) - atan2(xa - xb, ya - yb))
+
+        constraints.append(g2d.LineLength("l%d" % i, lines[i], dimension("d%d" % i, d)))
+        constraints.append(
+            g2d.AnglePoint3(
+                "a%d" % i,
+                points[i - 1],
+                points[i],
+                points[i + 1],
+                dimension("a%d" % i, a),
+            )
+        )
+
+    for i, L in enumerate(lines):
+        constraints.append(g2d.CoincidentPoint2("L%d.c1" % i, L.p1, points[i]))
+        constraints.append(g2d.CoincidentPoint2("L%d.c2" % i, L.p2, points[i + 1]))
+
+    for c in circles:
+        i = int(c.name[1:])
+        constraints.append(g2d.CoincidentPoint2(c.name + ".c", c.p, points[i]))
+        constraints.append(g2d.SetVar(c.name + ".r", c.r, c.r.val))
+
+    all_vars = set(variables) | set(dim_params)
+    for g in geometry:
+        all_vars |= set(g.vars)
+
+    return geometry, tuple(variables), tuple(constraints), all_vars
+
+
+def _bracket_shape(rng, x, y, n, scale):
+    """Joints of the target shape of `dimensioned_bracket`"""
+    # a random walk that turns at every joint (straight joints are where
+    #   angles wrap around)
+    xy = [(x, y)]
+    heading = rng.uniform(-pi, pi)
+    for i in range(n):
+        heading += rng.choice((-1.0, 1.0)) * rng.uniform(0.5, 1.5)
+        step = rng.uniform(0.5, 1.5) * scale
+        xa, ya = xy[-1]
+        xy.append((xa + step * cos(heading), ya + step * sin(heading)))
+
+    return xy
+
+
+def dimensioned_bracket(name, x, y, n=6, seed=0, scale=10.0, noise=0.05):
+    """
+    Generated sub-shape: a bent bracket of `n` dimensioned line segments
+
+    Like `linkage_chain` (lengths, angles, and circles of fixed radius
+    at every third joint), but every segment has a length, so the shape
+    is fixed up to where it is and which way it faces: it isn't placed.
+    The target shape starts at (x, y). Names start with `name`, and
+    dimensions are `Parameter`s.
+
+    Returns `(geometry, constraints)`, with the points of the bracket
+    first in `geometry`, in order.
+    """
+    rng = random.Random(seed)
+    xy = _bracket_shape(rng, x, y, n, scale)
+
+    def guess(x, y):
+        return (
+            x + rng.gauss(0.0, noise * scale),
+            y + rng.gauss(0.0, noise * scale),
+        )
+
+    points = [
+        g2d.Point("%s.p%d" % (name, i), *guess(xa, ya)) for i, (xa, ya) in enumerate(xy)
+    ]
+    lines = [
+        g2d.LineSegment("%s.L%d" % (name, i), *(guess(*xy[i]) + guess(*xy[i + 1])))
+        for i in range(n)
+    ]
+    circles = [
+        g2d.Circle("%s.c%d" % (name, i), *guess(*xy[i]), rng.uniform(0.1, 0.3) * scale)
+        for i in range(0, n + 1, 3)
+    ]
+
+    geometry = tuple(points) + tuple(lines) + tuple(circles)
+    constraints = []
+
+    for i in range(n):
+        (xb, yb), (xc, yc) = xy[i], xy[i + 1]
+        d = ((xc - xb) ** 2 + (yc - yb) ** 2) ** 0.5
+        constraints.append(
+            g2d.LineLength(
+                "%s.l%d" % (name, i), lines[i], g2d.Parameter("%s.d%d" % (name, i), d)
+            )
+        )
+
+        if i > 0:
+            xa, ya = xy[i - 1]
+            a = abs(atan2(xc - xb, yc - yb) - atan2(xa - xb, ya - yb))
+            constraints.append(
+                g2d.AnglePoint3(
+                    "%s.a%d" % (name, i),
+                    points[i - 1],
+                    points[i],
+                    points[i + 1],
+                    g2d.Parameter("%s.a%d" % (name, i), a),
+                )
+            )
+
+    for L, p1, p2 in zip(lines, points, points[1:]):
+        constraints.append(g2d.CoincidentPoint2(L.name + ".c1", L.p1, p1))
+        constraints.append(g2d.CoincidentPoint2(L.name + ".c2", L.p2, p2))
+
+    for c in circles:
+        i = int(c.name.rpartition(".c")[2])
+        constraints.append(g2d.CoincidentPoint2(c.name + ".c", c.p, points[i]))
+        constraints.append(g2d.SetVar(c.name + ".r", c.r, c.r.val))
+
+    return geometry, tuple(constraints)
+
+
+def bracket_row(k, n=6, seed=0, scale=10.0):
+    """
+    Generated sketch: a row of `k` brackets (see `dimensioned_bracket`)
+
+    Each bracket is placed by its first point (fixed by `SetVar`) and
+    the height of its last point above (or below) the first one (a
+    `VertDist` of `Parameter` height). The height is that of the target
+    shape turned by 0.1 radians away from upright, so the brackets turn a
+    little but stay clear of having their last point straight above the
+    first one (where the height can't grow any more).
+
+    Returns `(brackets, constraints)`: a list of the `(geometry,
+    constraints)` of each bracket, and the constraints that place them.
+    """
+    brackets = [
+        dimensioned_bracket("b%d" % i, 4.0 * n * scale * i, 0.0, n, seed + i, scale)
+        for i in range(k)
+    ]
+
+    constraints = []
+    for i, (geometry, _) in enumerate(brackets):
+        first, last = geometry[0], geometry[n]
+
+        # angle of the last point of the target shape above the horizontal
+        dx, dy = _bracket_shape(random.Random(seed + i), 0.0, 0.0, n, scale)[n]
+        a = atan2(abs(dy), abs(dx))
+        a += -0.1 if a > 0.2 else 0.1
+
+        constraints.append(g2d.SetVar("b%d.x" % i, first.x, 4.0 * n * scale * i))
+        constraints.append(g2d.SetVar("b%d.y" % i, first.y, 0.0))
+        constraints.append(
+            g2d.VertDist(
+                "b%d.h" % i,
+                first,
+                last,
+                g2d.Parameter("b%d.h" % i, hypot(dx, dy) * sin(a)),
+                lock=True,
+            )
+        )
+
+    return brackets, tuple(constraints)
+
+
+def dimensioned_grid(nx, ny, seed=0, spacing=10.0, noise=0.1):
+    """
+    Generated sketch: a grid of points dimensioned from their neighbours
+
+    Every point is placed by a horizontal and a vertical distance (with
+    locked branches, `Parameter` dimensions) from the point before it
+    in its row, or below it for the first column. Each row also has a
+    line from its first to its last point, and a point on that line at
+    a horizontal distance from the first point. All the equations are
+    linear in the vars they end up solving for.
+
+    Returns the same tuple as `problem2`.
+    """
+    rng = random.Random(seed)
+
+    def guess(v):
+        return v + rng.gauss(0.0, noise * spacing)
+
+    # target shape: rows at even heights, uneven spacing within rows
+    xy = [
+        [(i * spacing * rng.uniform(0.5, 1.5), j * spacing) for i in range(nx)]
+        for j in range(ny)
+    ]
+
+    points = [
+        [
+            g2d.Point("p%d_%d" % (i, j), guess(x), guess(y))
+            for i, (x, y) in enumerate(row)
+        ]
+        for j, row in enumerate(xy)
+    ]
+
+    geometry = [p for row in points for p in row]
+    params = []
+    constraints = [
+        g2d.SetVar("x0", points[0][0].x, 0.0),
+        g2d.SetVar("y0", points[0][0].y, 0.0),
+    ]
+
+    def dimension(name, val):
+        param = g2d.Parameter(name, val)
+        params.append(param)
+        return param
+
+    for j in range(ny):
+        for i in range(nx):
+            if i == 0 and j == 0:
+                continue
+
+            # from the point before in the row, or the point below
+            i0, j0 = (i - 1, j) if i > 0 else (i, j - 1)
+            (x1, y1), (x2, y2) = xy[j0][i0], xy[j][i]
+            p1, p2 = points[j0][i0], points[j][i]
+            name = "%d_%d" % (i, j)
+
+            constraints.append(
+                g2d.HorzDist(
+                    "h" + name, p1, p2, dimension("dx" + name, x2 - x1), lock=True
+                )
+            )
+            constraints.append(
+                g2d.VertDist(
+                    "v" + name, p1, p2, dimension("dy" + name, y2 - y1), lock=True
+                )
+            )
+
+    for j, row in enumerate(points):
+        (x1, y1), (x2, y2) = xy[j][0], xy[j][-1]
+        L = g2d.LineSegment("L%d" % j, guess(x1), guess(y1), guess(x2), guess(y2))
+        q = g2d.Point("q%d" % j, guess((x1 + x2) / 2.0), guess(y1))
+        geometry += [L, q]
+
+        constraints.append(g2d.CoincidentPoint2("L%d.c1" % j, L.p1, row[0]))
+        constraints.append(g2d.CoincidentPoint2("L%d.c2" % j, L.p2, row[-1]))
+        constraints.append(
+            g2d.HorzDist(
+                "hq%d" % j, row[0], q, dimension("dq%d" % j, (x2 - x1) / 2.0), lock=True
+            )
+        )
+        constraints.append(g2d.PointOnLine("q%d.on" % j, q, L))
+
+    all_vars = set(params)
+    for g in geometry:
+        all_vars |= set(g.vars)
+
+    return tuple(geometry), (), tuple(constraints), all_vars
@@ -0,0 +1,243 @@
+"""
+sensitivity: first-order response of a solved system to its parameters
+
+When a parameter `p` of a solved system changes, the vars `x` solved by
+an equation set move so that its equations `F(x, u) = 0` keep holding,
+where `u` are the set's inputs: its parameters and the vars it requires
+(solved by earlier sets). By the implicit function theorem
+
+    dx = -J_x^-1 J_u du
+
+with the Jacobians of `F` taken at the solved values. Going through the
+equation sets in the order they are solved, the `dx` of one set is part
+of the `du` of the sets that require its vars, so the derivatives of all
+solved vars with respect to the parameters come from one small matrix
+product per affected set. For underconstrained sets the smallest `dx`
+(in the least squares sense) is used.
+
+A `Sensitivity` keeps the matrix `-J_x^-1 J_u` of each set for as long as
+the values it was computed at stay the same, so repeated previews of a
+solved system (like while hovering over a dimension) cost only matrix
+vector products. The residuals at the previewed values estimate the
+error of the linearization, and show when a real update is needed.
+"""
+
+import numpy as np
+
+from .constraint_solver import sparse_jacobian
+from .solve_elements import Parameter
+
+
+class _Linearization(object):
+    """Linear response of the vars solved by an equation set to its inputs"""
+
+    __slots__ = (
+        "unknowns",  # list of vars solved by the set
+        "inputs",  # list of required vars and parameters of the set
+        "versions",  # versions of unknowns and inputs it was computed at
+        "M",  # d unknowns / d inputs (-J_x^-1 J_u)
+    )
+
+    def __init__(self, eqn_set):
+        eqns = list(eqn_set.eqns)
+        self.unknowns = list(eqn_set.solves)
+
+        # inputs: the required vars and parameters that eqns use
+        used = set(_key(var) for eqn in eqns for var in eqn.var_list)
+        params = set(var for var in used if isinstance(var, Parameter))
+        self.inputs = list(used & eqn_set.requires) + list(params)
+
+        columns = self.unknowns + self.inputs
+        self.versions = tuple(var.version for var in columns)
+
+        # per eqn: column index of each arg, or the var if it's not a column
+        index = {var: j for j, var in enumerate(columns)}
+        args = [[index.get(_key(var), var) for var in eqn.var_list] for eqn in eqns]
+
+        def F(V):
+            return np.array(
+                [
+                    eqn.f(*[V[a] if type(a) is int else a.val for a in eqn_args])
+                    for eqn, eqn_args in zip(eqns, args)
+                ]
+            )
+
+        V = np.array([var.val for var in columns], dtype=float)
+        groups = [[j] for j in range(len(columns))]
+        col_rows = [
+            [i for i, eqn_args in enumerate(args) if j in eqn_args]
+            for j in range(len(columns))
+        ]
+        J = sparse_jacobian(F, groups, col_rows)(V)
+
+        n = len(self.unknowns)
+        J_x, J_u = J[:, :n], J[:, n:]
+
+        M = None
+        if J_x.shape[0] == n:
+            try:
+                M = -np.linalg.solve(J_x, J_u)
+            except np.linalg.LinAlgError:
+                pass
+        if M is None:
+            M = -np.linalg.lstsq(J_x, J_u, rcond=None)[0]
+
+        self.M = M
+
+    def is_current(self):
+        """Are the values it was computed at still the current ones?"""
+        columns = self.unknowns + self.inputs
+        return self.versions == tuple(var.version for var in columns)
+
+
+def _key(var):
+    # parameters are never aliased
+    return var if isinstance(var, Parameter) else var.rep()
+
+
+class Sensitivity(object):
+    """
+    Derivatives of the vars of a solved `Solver` with respect to parameters
+
+    Parameters
+    ----------
+    solver
+        the solved `Solver` (its decomposition and values are used)
+    """
+
+    __slots__ = (
+        "solver",  # Solver the derivatives are taken in
+        "linearizations",  # eqn set -> _Linearization at the current values
+        "computed",  # number of linearizations computed
+        "reused",  # number of linearizations reused
+    )
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.linearizations = {}
+        self.computed = 0
+        self.reused = 0
+
+    def _order(self, params):
+        """Equation sets that depend on the parameters, in solve order"""
+        eqn_sets = self.solver.eqn_sets
+
+        start = set(
+            eqn.eqn_set
+            for param in params
+            for eqn in param.eqns
+            if eqn.eqn_set in eqn_sets
+        )
+
+        affected = set(start)
+        stack = list(start)
+        while stack:
+            eqn_set = stack.pop()
+            for var in eqn_set.solves:
+                for eqs in var.required_by:
+                    if eqs not in affected:
+                        affected.add(eqs)
+                        stack.append(eqs)
+
+        # number of affected sets each one is still waiting for
+        waiting = {
+            eqs: len(set(var.solved_by for var in eqs.requires) & affected)
+            for eqs in affected
+        }
+
+        order = []
+        ready = [eqs for eqs, n in waiting.items() if n == 0]
+        while ready:
+            eqn_set = ready.pop()
+            order.append(eqn_set)
+
+            dependents = set(eqs for var in eqn_set.solves for eqs in var.required_by)
+            for eqs in dependents:
+                waiting[eqs] -= 1
+                if waiting[eqs] == 0:
+                    ready.append(eqs)
+
+        return order
+
+    def _linearization(self, eqn_set):
+        lin = self.linearizations.get(eqn_set)
+        if lin is not None and lin.is_current():
+            self.reused += 1
+            return lin
+
+        lin = self.linearizations[eqn_set] = _Linearization(eqn_set)
+        self.computed += 1
+        return lin
+
+    def propagate(self, params):
+        """
+        Derivatives of the solved vars with respect to parameters
+
+        Returns `(derivatives, eqn sets)`: a dict of var -> array of its
+        derivatives with respect to each of `params` (only for vars that
+        depend on them, including aliases), and the equation sets they
+        went through, in solve order
+        """
+        params = list(params)
+        column = {param: k for k, param in enumerate(params)}
+
+        # drop linearizations of sets that are no longer part of the solver
+        eqn_sets = self.solver.eqn_sets
+        for eqn_set in list(self.linearizations):
+            if eqn_set not in eqn_sets:
+                del self.linearizations[eqn_set]
+
+        derivatives = {}
+        order = self._order(params)
+
+        for eqn_set in order:
+            lin = self._linearization(eqn_set)
+
+            dU = np.zeros((len(lin.inputs), len(params)))
+            for i, var in enumerate(lin.inputs):
+                if var in column:
+                    dU[i, column[var]] = 1.0
+                elif var in derivatives:
+                    dU[i] = derivatives[var]
+
+            dX = lin.M @ dU
+            for var, row in zip(lin.unknowns, dX):
+                derivatives[var] = row
+
+        for var in list(derivatives):
+            for alias in var.aliases:
+                derivatives[alias] = derivatives[var]
+
+        return derivatives, order
+
+    def preview(self, changes):
+        """
+        First-order values of the solved vars after changing parameters
+
+        `changes` maps parameters to new values. Returns `(values,
+        error)`: a dict of var -> previewed value for the vars that
+        move, and the largest residual of the affected equations at
+        the previewed values (zero for linear systems). Nothing is
+        changed in the solver.
+        """
+        params = list(changes)
+        dP = np.array([changes[param] - param.val for param in params], dtype=float)
+
+        derivatives, order = self.propagate(params)
+
+        values = {var: var.val + row @ dP for var, row in derivatives.items()}
+
+        lookup = dict(values)
+        lookup.update(changes)
+
+        error = 0.0
+        for eqn_set in order:
+            for eqn in eqn_set.eqns:
+                r = eqn.f(*[lookup.get(var, var.val) for var in eqn.var_list])
+                error = max(error, abs(r))
+
+        return values, error
+
+    def stats(self):
+        """Counters for reporting"""
+        return {"computed": self.computed, "reused": self.reused}
@@ -0,0 +1,287 @@
+"""
+sketch_io: read and write sketches as JSON lines
+
+A sketch file has one JSON object per line, each with a "type":
+
+- geometry, with its initial values:
+    {"type": "point", "name": "p0", "x": 0.0, "y": 0.0}
+    {"type": "line", "name": "L1", "x1": 1.0, "y1": 1.0, "x2": 3.0, "y2": 3.0}
+    {"type": "circle", "name": "c1", "cx": 0.0, "cy": 0.0, "r": 1.0}
+- free vars and parameters (dimensions):
+    {"type": "var", "name": "d1", "val": 1.0}
+    {"type": "parameter", "name": "a", "val": 0.5}
+- constraints, named after their `geom2d` class:
+    {"type": "HorzDist", "name": "f8", "p1": "p0", "p2": "p1", "d": "dx"}
+
+Constraint fields (see `CONSTRAINT_FIELDS`) refer to geometry and vars
+by name. Geometry defines names for its parts: a line "L1" has points
+"L1.p1" and "L1.p2", a circle "c1" has center "c1.p", and a point "p0"
+has vars "p0.x" and "p0.y". A name has to be defined on an earlier line
+than the one it is used on. A point line with the name of a part of
+earlier geometry is that part (so a point of a line isn't created
+twice). Branched constraints take optional "branch" and "lock" fields,
+a "SetVar" takes its value as "val", and a "GroundPoint" its ground
+coordinates as "gx" and "gy".
+
+Files are read one line at a time, and only the names of elements that
+were read are kept, so importing needs memory for the model being
+built, not for the file. The writers stream lines out in the same way.
+"""
+
+import json
+
+from . import geom2d as g2d
+
+# constraint type -> fields after the name, in constructor order; a
+#   field is a reference (by name) unless it is listed in _VALUE_FIELDS,
+#   to a var or parameter if it is listed in _VAR_FIELDS and to geometry
+#   otherwise
+CONSTRAINT_FIELDS = {
+    "SetVar": ("var", "val"),
+    "HorzDist": ("p1", "p2", "d"),
+    "VertDist": ("p1", "p2", "d"),
+    "LineLength": ("L", "d"),
+    "AnglePoint3": ("p1", "p2", "p3", "a"),
+    "TangentLineCircle": ("L", "C"),
+    "PointOnCircle": ("p", "C"),
+    "PointOnLine": ("p", "L"),
+    "GroundPoint": ("p", "gx", "gy"),
+    "CoincidentPoint2": ("p1", "p2"),
+}
+
+_VALUE_FIELDS = {"val", "gx", "gy"}
+_VAR_FIELDS = {"var", "d", "a"}
+
+# ------------------------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------------------------
+
+
+def _geometry(line):
+    kind = line["type"]
+    name = line["name"]
+
+    if kind == "point":
+        return g2d.Point(name, line["x"], line["y"])
+    if kind == "line":
+        return g2d.LineSegment(name, line["x1"], line["y1"], line["x2"], line["y2"])
+    if kind == "circle":
+        return g2d.Circle(name, line["cx"], line["cy"], line["r"])
+
+    return None
+
+
+def _parts(geom):
+    """Named points of a geometry element (itself included)"""
+    if isinstance(geom, g2d.LineSegment):
+        return [geom, geom.p1, geom.p2]
+    if isinstance(geom, g2d.Circle):
+        return [geom, geom.p]
+    return [geom]
+
+
+def read_sketch(lines):
+    """
+    Generator of the elements of a sketch from an iterable of lines
+
+    Yields `(kind, element)` with kind "geometry", "var", "parameter"
+    or "constraint", in file order. Blank lines are skipped. Raises
+    ValueError for unknown types and names that are not defined yet.
+    """
+    geoms = {}  # name -> geometry element (or one of its points)
+    vars = {}  # name -> var or parameter
+
+    def ref(n, line, field):
+        # geometry and vars have separate names (a point "d" and a
+        #   dimension "d" can both be referred to)
+        name = line[field]
+        element = (vars if field in _VAR_FIELDS else geoms).get(name)
+        if element is None:
+            raise ValueError("line %d: %s is not defined" % (n, name))
+        return element
+
+    for n, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+
+        line = json.loads(text)
+        kind = line.get("type")
+
+        if kind == "point" and line["name"] in geoms:
+            # a part of earlier geometry, written on its own too
+            geom = geoms[line["name"]]
+            if not isinstance(geom, g2d.Point):
+                raise ValueError("line %d: %s is not a point" % (n, geom.name))
+            geom.x.val, geom.y.val = line["x"], line["y"]
+            yield "geometry", geom
+            continue
+
+        geom = _geometry(line)
+        if geom is not None:
+            for part in _parts(geom):
+                if part.name in geoms:
+                    raise ValueError("line %d: %s is already defined" % (n, part.name))
+                geoms[part.name] = part
+            for var in geom.vars:
+                vars[var.name] = var
+            yield "geometry", geom
+
+        elif kind == "var":
+            var = vars[line["name"]] = g2d.Var(line["name"], line["val"])
+            yield "var", var
+
+        elif kind == "parameter":
+            param = vars[line["name"]] = g2d.Parameter(line["name"], line["val"])
+            yield "parameter", param
+
+        elif kind in CONSTRAINT_FIELDS:
+            args = [
+                line[field] if field in _VALUE_FIELDS else ref(n, line, field)
+                for field in CONSTRAINT_FIELDS[kind]
+            ]
+            kwargs = {key: line[key] for key in ("branch", "lock") if key in line}
+
+            yield "constraint", getattr(g2d, kind)(line["name"], *args, **kwargs)
+
+        else:
+            raise ValueError("line %d: unknown type %r" % (n, kind))
+
+
+def load_sketch(lines, gcs):
+    """
+    Add the elements of a sketch to a GCS as they are read
+
+    Returns the number of elements that were added
+    """
+    count = 0
+
+    for kind, element in read_sketch(lines):
+        if kind == "geometry":
+            gcs.add_geometry(element)
+        elif kind == "var":
+            gcs.add_variable(element)
+        elif kind == "constraint":
+            gcs.add_constraint(element)
+
+        # parameters only enter the solver through constraints
+        count += 1
+
+    return count
+
+
+def read_problem(path):
+    """
+    Read a sketch file into the same tuple as `sample_problems.problem2`
+
+    `(geometry, variables, constraints, all_vars)`, where all_vars
+    includes parameters. Usable as a `solver_pool` loader.
+    """
+    geometry, variables, constraints = [], [], []
+    all_vars = set()
+
+    with open(path) as f:
+        for kind, element in read_sketch(f):
+            if kind == "geometry":
+                geometry.append(element)
+                all_vars.update(element.vars)
+            elif kind == "var":
+                variables.append(element)
+                all_vars.add(element)
+            elif kind == "parameter":
+                all_vars.add(element)
+            else:
+                constraints.append(element)
+
+    return geometry, variables, constraints, all_vars
+
+
+# ------------------------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------------------------
+
+
+def _geometry_line(geom):
+    if isinstance(geom, g2d.LineSegment):
+        x1, y1, x2, y2 = (var.val for var in geom.vars)
+        return {
+            "type": "line",
+            "name": geom.name,
+            "x1": x1,
+            "y1": y1,
+            "x2": x2,
+            "y2": y2,
+        }
+    if isinstance(geom, g2d.Circle):
+        cx, cy, r = (var.val for var in geom.vars)
+        return {"type": "circle", "name": geom.name, "cx": cx, "cy": cy, "r": r}
+    if isinstance(geom, g2d.Point):
+        return {"type": "point", "name": geom.name, "x": geom.x.val, "y": geom.y.val}
+
+    raise ValueError("can't write geometry: " + str(geom.name))
+
+
+def _var_line(var):
+    kind = "parameter" if isinstance(var, g2d.Parameter) else "var"
+    return {"type": kind, "name": var.name, "val": var.val}
+
+
+def _constraint_line(cstr):
+    kind = type(cstr).__name__
+    if kind not in CONSTRAINT_FIELDS:
+        raise ValueError("can't write constraint: " + str(cstr.name))
+
+    line = {"type": kind, "name": cstr.name}
+    for field in CONSTRAINT_FIELDS[kind]:
+        val = getattr(cstr, field)
+        line[field] = val if field in _VALUE_FIELDS else val.name
+
+    if isinstance(cstr, g2d.BranchedConstraint):
+        line["branch"] = cstr.branch
+        line["lock"] = cstr.locked
+
+    return line
+
+
+def write_sketch(f, geometry, variables, constraints):
+    """
+    Write a sketch to a text file, one element per line
+
+    Geometry and vars are written with their current values. Points
+    that are parts of other elements of `geometry` (like the ends of a
+    line) are written after all other geometry, so they are read as
+    those parts. Vars and parameters that constraints use but that are
+    not part of `geometry` or `variables` are written just before the
+    first constraint using them.
+    """
+    written = set()
+
+    parts = set()
+    for geom in geometry:
+        parts.update(_parts(geom)[1:])
+
+    for geom in sorted(geometry, key=lambda geom: geom in parts):
+        f.write(json.dumps(_geometry_line(geom)) + "\n")
+        written.update(geom.vars)
+
+    for var in variables:
+        f.write(json.dumps(_var_line(var)) + "\n")
+        written.add(var)
+
+    for cstr in constraints:
+        for eqn in cstr.equations:
+            for var in eqn.var_list:
+                if var not in written:
+                    f.write(json.dumps(_var_line(var)) + "\n")
+                    written.add(var)
+
+        f.write(json.dumps(_constraint_line(cstr)) + "\n")
+
+
+def write_values(f, vars):
+    """
+    Stream the values of vars to a text file
+
+    One `{"name": ..., "val": ...}` line per var, like after a solve
+    """
+    for var in vars:
+        f.write(json.dumps({"name": var.name, "val": var.val}) + "\n")
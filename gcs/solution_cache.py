@@ -0,0 +1,148 @@
+"""
+solution_cache: memoized equation set solutions
+
+When the same input values come back (a dimension dragged back and
+forth, stepping through a fixed set of configurations), equation sets
+end up solving the same problem again. A `SolutionCache` remembers
+the solved values of each equation set, keyed on the quantized values
+of the vars and parameters it requires plus the branch of its initial
+guess, and writes them back instead of calling the numeric solver.
+
+All equation sets share a single LRU budget. Entries of an equation
+set are dropped when the set is removed from its solver (it is split,
+or the solver is reset after a structural change).
+"""
+
+from collections import OrderedDict
+
+
+def sign_branch(eqn_set, solves):
+    """Default initial guess branch: the signs of the values being solved for"""
+    return tuple(var.val >= 0.0 for var in solves)
+
+
+class SolutionCache(object):
+    """
+    Bounded LRU cache of equation set solutions
+
+    Parameters
+    ----------
+    max_entries
+        total number of solutions kept, across all equation sets
+    quantum
+        resolution that required var values are rounded to for keys
+    branch_func
+        `branch_func(eqn_set, solves)` returns a hashable description
+        of the initial guess that a solution was found from
+    """
+
+    __slots__ = (
+        "max_entries",  # LRU budget
+        "quantum",  # key resolution
+        "branch_func",  # initial guess branch for keys
+        "entries",  # (eqn_set, key) -> solved values, in LRU order
+        "keys",  # eqn_set -> set of its keys in `entries`
+        "layouts",  # eqn_set -> (requires + parameters list, solves list)
+        "hits",  # number of solves answered from the cache
+        "misses",  # number of solves that had to be computed
+        "evictions",  # number of entries dropped for the budget
+    )
+
+    def __init__(self, max_entries=10000, quantum=1.0e-9, branch_func=sign_branch):
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self.branch_func = branch_func
+
+        self.entries = OrderedDict()
+        self.keys = {}
+        self.layouts = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def layout(self, eqn_set):
+        """Fixed order of the required vars (and parameters) and solved vars"""
+        layout = self.layouts.get(eqn_set)
+        if layout is None:
+            params = set(param for eqn in eqn_set.eqns for param in eqn.params)
+            layout = (
+                sorted(eqn_set.requires | params, key=id),
+                sorted(eqn_set.solves, key=id),
+            )
+            self.layouts[eqn_set] = layout
+        return layout
+
+    def key(self, eqn_set):
+        """Cache key of an equation set for the current var values"""
+        requires, solves = self.layout(eqn_set)
+        q = self.quantum
+        return (
+            tuple(round(var.val / q) for var in requires),
+            self.branch_func(eqn_set, solves),
+        )
+
+    def solve(self, eqn_set, solve_func):
+        """
+        Solve an equation set, using and filling the cache
+
+        Cached values are only used if they satisfy the equation set
+        """
+        key = self.key(eqn_set)
+        vals = self.entries.get((eqn_set, key))
+
+        if vals is not None:
+            solves = self.layout(eqn_set)[1]
+            old_vals = [var.val for var in solves]
+
+            for var, val in zip(solves, vals):
+                var.val = val
+
+            if eqn_set.is_satisfied():
+                self.entries.move_to_end((eqn_set, key))
+                self.hits += 1
+                return True
+
+            for var, val in zip(solves, old_vals):
+                var.val = val
+
+        self.misses += 1
+
+        if not solve_func(eqn_set):
+            return False
+
+        self.store(eqn_set, key)
+        return True
+
+    def store(self, eqn_set, key):
+        """Store the current values solved for by an equation set"""
+        solves = self.layout(eqn_set)[1]
+        self.entries[(eqn_set, key)] = tuple(var.val for var in solves)
+        self.entries.move_to_end((eqn_set, key))
+        self.keys.setdefault(eqn_set, set()).add(key)
+
+        while len(self.entries) > self.max_entries:
+            (old_set, old_key), _ = self.entries.popitem(last=False)
+            self.keys[old_set].discard(old_key)
+            self.evictions += 1
+
+    def invalidate(self, eqn_set):
+        """Drop all entries of an equation set"""
+        for key in self.keys.pop(eqn_set, ()):
+            del self.entries[(eqn_set, key)]
+        self.layouts.pop(eqn_set, None)
+
+    def clear(self):
+        """Drop all entries"""
+        self.entries.clear()
+        self.keys.clear()
+        self.layouts.clear()
+
+    def stats(self):
+        """Counters for reporting"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
@@ -21,11 +21,8 @@ system's topology has to be rearranged and/or re-solved.
 # ------------------------------------------------------------------------------
 
 # TODO: additions to variable arch:
-#   - constants: easy way to define updatable/modifyable constants
 #   - dependent variables: do things like set two angles as equal?? hmm
 # implement these as subclasses of Var?
-#   -> in case of constant, it wouldn't have to be
-#        added to the solve structure?
 
 
 class Var(object):
@@ -41,7 +38,13 @@ class Var(object):
     for it and which equation sets require it to be solved before they
     can solve for their variables.
 
-    A var also tracks the actual value assigned to the variable.
+    A var also tracks the actual value assigned to the variable, and
+    a version number that changes whenever a different value is
+    assigned (which equations use to cache their residuals).
+
+    A var can be an alias of another (representative) var that it is
+    known to be equal to. Its value and version are then those of the
+    representative, which stands in for it in the solve graph.
     """
 
     __slots__ = (
@@ -49,7 +52,10 @@ class Var(object):
         "all_eqns",  # all equations
         "solved_by",  # equation set that solves this
         "required_by",  # equation sets that require this to be solved
-        "val",  # value of this variable
+        "_val",  # value of this variable
+        "_version",  # incremented when the value changes
+        "alias",  # representative var this is an alias of (or None)
+        "aliases",  # vars that are aliases of this one
         "name",  # name of this variable
         "parent",  # containing parent (like a geom or constraint)
     )
@@ -61,10 +67,60 @@ class Var(object):
         self.eqns = set()
         self.all_eqns = set()
 
-        self.val = val
+        self._val = val
+        self._version = 0
+        self.alias = None
+        self.aliases = set()
         self.name = name
         self.parent = parent
 
+    @property
+    def val(self):
+        """Value of this variable"""
+        if self.alias is not None:
+            return self.alias.val
+        return self._val
+
+    @val.setter
+    def val(self, val):
+        if self.alias is not None:
+            self.alias.val = val
+        elif val != self._val:
+            self._val = val
+            self._version += 1
+
+    @property
+    def version(self):
+        """Version of the value of this variable"""
+        if self.alias is not None:
+            return self.alias.version
+        return self._version
+
+    def rep(self):
+        """The var that stands in for this one in the solve graph"""
+        return self.alias or self
+
+    def set_alias(self, alias):
+        """Make this var an alias of another var (or of nothing if None)"""
+        if alias is self.alias:
+            return
+
+        # keep the current value as this var's own value
+        self._val = self.val
+        self._version += 1
+
+        if self.alias is not None:
+            self.alias.aliases.discard(self)
+
+        self.alias = alias
+
+        if alias is not None:
+            alias.aliases.add(self)
+
+        # cached residuals were computed with the old version numbers
+        for eqn in self.all_eqns:
+            eqn.invalidate()
+
     def delete(self):
         """Delete this variable by deleting all equations it appears in"""
         all_eqns = self.all_eqns.copy()
@@ -94,12 +150,55 @@ class Var(object):
 
     def is_constrained(self):
         """Is this var solved by a constrained equation set"""
-        return self.solved_by is not None and self.solved_by.is_constrained()
+        solved_by = self.rep().solved_by
+        return solved_by is not None and solved_by.is_constrained()
 
     def __str__(self):
         return "Var:" + self.name + "=" + str(self.val)
 
 
+class Parameter(object):
+    """
+    A value that is fed into equations but never solved for
+
+    Parameters (dimensions, constants) are not part of the solve graph:
+    equations read their values like vars, but they are not vertices
+    the splitter sees and there is nothing to solve for them. A
+    parameter keeps track of the equations that use it, so that a
+    change only marks the equation sets of those equations as dirty.
+    """
+
+    __slots__ = (
+        "eqns",  # equations that use this parameter
+        "_val",  # value of this parameter
+        "version",  # incremented when the value changes
+        "name",  # name of this parameter
+        "parent",  # containing parent (like a constraint)
+    )
+
+    def __init__(self, name, val, parent=None):
+        self.eqns = set()
+
+        self._val = val
+        self.version = 0
+        self.name = name
+        self.parent = parent
+
+    @property
+    def val(self):
+        """Value of this parameter"""
+        return self._val
+
+    @val.setter
+    def val(self, val):
+        if val != self._val:
+            self._val = val
+            self.version += 1
+
+    def __str__(self):
+        return "Parameter:" + self.name + "=" + str(self.val)
+
+
 class Eqn(object):
     """
     Node of an equation system solver that represents an equation
@@ -109,22 +208,44 @@ class Eqn(object):
     equations get solved, it keeps track of which vars connected
     to it still need to be solved for. Once an eqn is set as solved,
     it keeps track of the equation set that solves it
+
+    Parameters in the argument list are passed to `f` like vars, but
+    are kept out of `vars` and `all_vars`, so they never enter the
+    solve graph. Vars that are aliases are replaced by their
+    representatives in `vars` and `all_vars` when the eqn is reset,
+    while `var_list` keeps the vars the eqn was created with.
+
+    An eqn can be tagged as linear: `f` is affine in the vars of
+    `linear_in` when all its other vars are fixed. If `fixed_coeffs`
+    is also true, the coefficients of those vars are constants (they
+    don't depend on the values of the other vars either).
+
+    The residual of the last evaluation is cached, and reused for as
+    long as none of the equation's vars change.
     """
 
     __slots__ = (
         "vars",  # set of active vars
         "all_vars",  # set of all vars
-        "var_list",  # list of vars in order
+        "params",  # set of parameters
+        "var_list",  # list of vars (and parameters) in order
         "f",  # function to plug variables into
         "name",  # name of this function
         "parent",  # parent (constraint)
         "eqn_set",  # equation set that solves this
+        "linear_in",  # vars that f is affine in (given the others)
+        "fixed_coeffs",  # true if those coefficients are constants
+        "cache_versions",  # var versions the cached residual was computed at
+        "cache_val",  # cached residual
+        "calls",  # number of times this equation was evaluated
+        "evaluations",  # number of times `f` was actually called
     )
 
-    def __init__(self, name, f, vars, parent=None):
-        self.vars = set(vars)
-        self.all_vars = set(vars)
+    def __init__(self, name, f, vars, parent=None, linear_in=(), fixed_coeffs=False):
         self.var_list = list(vars)
+        self.params = set(var for var in vars if isinstance(var, Parameter))
+        self.vars = set(vars) - self.params
+        self.all_vars = set(vars) - self.params
 
         self.f = f
         self.name = name
@@ -132,26 +253,57 @@ class Eqn(object):
 
         self.eqn_set = None
 
+        self.linear_in = frozenset(linear_in)
+        self.fixed_coeffs = fixed_coeffs
+
+        self.cache_versions = None
+        self.cache_val = None
+        self.calls = 0
+        self.evaluations = 0
+
         # add this equation to each var
-        for var in vars:
+        for var in self.all_vars:
             var.eqns.add(self)
             var.all_eqns.add(self)
 
+        for param in self.params:
+            param.eqns.add(self)
+
     def __call__(self):
         """Evaluate this equation with the current variable values"""
-        return self.f(*[var.val for var in self.var_list])
+        self.calls += 1
+
+        versions = tuple(var.version for var in self.var_list)
+        if versions != self.cache_versions:
+            self.cache_val = self.f(*[var.val for var in self.var_list])
+            self.cache_versions = versions
+            self.evaluations += 1
+
+        return self.cache_val
+
+    def invalidate(self):
+        """Drop the cached residual (needed if `f` changes)"""
+        self.cache_versions = None
 
     def delete(self):
         """Delete this equation by removing it from variables and eqn set"""
-        for var in self.all_vars:
-            var.remove(self)
+        for var in self.var_list:
+            if var not in self.params:
+                var.remove(self)
+
+        for param in self.params:
+            param.eqns.discard(self)
 
         # clear references to vars (keep list jic?)
         self.vars = set()
         self.all_vars = set()
+        self.params = set()
 
     def reset(self):
         """Reset this equation by adding all vars back to it"""
+        self.all_vars = set(
+            var.rep() for var in self.var_list if var not in self.params
+        )
         self.vars = self.all_vars.copy()
         self.eqn_set = None
 
@@ -163,6 +315,24 @@ class Eqn(object):
         return "Eqn:" + self.name
 
 
+def _difference(a, b):
+    return a - b
+
+
+class EqualityEqn(Eqn):
+    """
+    Equation that two vars are equal (`var1 - var2 = 0`)
+
+    A solver can merge the two vars instead of solving this equation
+    (see `var_aliases`)
+    """
+
+    __slots__ = ()
+
+    def __init__(self, name, var1, var2, parent=None):
+        super().__init__(name, _difference, [var1, var2], parent, [var1, var2], True)
+
+
 class EqnSet(object):
     """
     A set of Vars and Eqns
@@ -0,0 +1,354 @@
+"""
+solver_pool: serve many independent sketches from a pool of worker processes
+
+Each sketch (document) lives in a GCS inside one long-lived worker
+process. A document is placed on a worker when it is loaded and stays
+there, so its equation set decomposition stays warm between requests.
+Requests for a document go to its worker over a pipe and are handled
+in order, so edits of a single document are serialized while different
+documents are solved in parallel on different cores.
+
+Documents are built by a loader: a picklable callable that returns
+`(geometry, variables, constraints, all_vars)`, like the functions in
+`sample_problems`. Constraints and vars (including parameters, which
+loaders list in `all_vars`) are then addressed by name.
+
+A solved GCS can also be handed to a pool as a deep copy (`load_copy`),
+which keeps its decomposition and values.
+
+`LocalSolverPool` has the same request API but handles everything
+in-process, which is convenient for tests and debugging.
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Future
+
+from .geom_solver import GCS
+from .solve_elements import Parameter
+
+# ----------------------------------------------------------
+# Documents
+# ----------------------------------------------------------
+
+
+class SketchDocument(object):
+    """A GCS built by a loader, with constraints and vars indexed by name"""
+
+    __slots__ = (
+        "gcs",  # the document's solver
+        "constraints",  # constraint name -> constraint
+        "vars",  # var name -> var
+    )
+
+    def __init__(self, loader, *args):
+        loaded = loader(*args)
+
+        if isinstance(loaded, GCS):
+            # a copy: already built (and solved)
+            self.gcs = loaded
+            constraints = loaded.constraints
+            all_vars = set(loaded.solver.vars)
+            for c in constraints:
+                for eqn in c.equations:
+                    all_vars.update(eqn.params)
+        else:
+            geometry, variables, constraints, all_vars = loaded
+
+            self.gcs = GCS()
+
+            for g in geometry:
+                self.gcs.add_geometry(g)
+
+            for v in variables:
+                self.gcs.add_variable(v)
+
+            for c in constraints:
+                self.gcs.add_constraint(c)
+
+        self.constraints = {c.name: c for c in constraints}
+        self.vars = {v.name: v for v in all_vars}
+
+    def modify(self, name, val):
+        """Modify the value of a "set" constraint, a parameter or a var"""
+        if name in self.constraints:
+            self.gcs.modify_set_constraint(self.constraints[name], val)
+            return
+
+        var = self.vars[name]
+        if isinstance(var, Parameter):
+            self.gcs.modify_parameter(var, val)
+        else:
+            self.gcs.modify_variable(var, val)
+
+    def update(self):
+        """Solve the document, returning whether all equations are satisfied"""
+        self.gcs.update()
+        return self.gcs.is_satisfied()
+
+    def values(self, names=None):
+        """Current values of the named vars (all vars if not given)"""
+        names = self.vars if names is None else names
+        return {name: self.vars[name].val for name in names}
+
+
+class DocumentStore(object):
+    """The documents held by one worker, and the request dispatcher for them"""
+
+    __slots__ = ("documents",)  # doc id -> SketchDocument
+
+    def __init__(self):
+        self.documents = {}
+
+    def handle(self, op, doc_id, args):
+        """Handle a single request and return its result"""
+        if op == "load":
+            self.documents[doc_id] = SketchDocument(*args)
+            return None
+
+        if op == "unload":
+            del self.documents[doc_id]
+            return None
+
+        doc = self.documents[doc_id]
+
+        if op == "modify":
+            return doc.modify(*args)
+        if op == "update":
+            return doc.update()
+        if op == "values":
+            return doc.values(*args)
+
+        raise ValueError("unknown request: " + str(op))
+
+
+def _adopt(gcs):
+    """Loader of a document from a GCS"""
+    return gcs
+
+
+def _worker_main(conn):
+    """Request loop run by each worker process"""
+    store = DocumentStore()
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+
+        request_id, op, doc_id, args = request
+        try:
+            response = (request_id, True, store.handle(op, doc_id, args))
+        except Exception as e:
+            response = (request_id, False, e)
+
+        try:
+            conn.send(response)
+        except Exception:
+            # a result or exception that can't be pickled is reported by
+            #   its repr (nothing was sent: pickling comes first)
+            error = RuntimeError("%s request failed: %r" % (op, response[2]))
+            conn.send((request_id, False, error))
+
+    conn.close()
+
+
+# ----------------------------------------------------------
+# Pools
+# ----------------------------------------------------------
+
+
+class _BasePool(object):
+    """
+    Request API shared by the pools
+
+    Every request returns a `concurrent.futures.Future` holding its result
+    """
+
+    __slots__ = ()
+
+    def load(self, doc_id, loader, *args):
+        """Build a document with `loader(*args)`"""
+        return self._submit(doc_id, "load", (loader,) + args)
+
+    def load_copy(self, doc_id, gcs):
+        """Make a copy of a GCS a document (decomposition and values included)"""
+        return self._submit(doc_id, "load", (_adopt, gcs.deep_copy()))
+
+    def unload(self, doc_id):
+        """Discard a document"""
+        return self._submit(doc_id, "unload", ())
+
+    def modify(self, doc_id, name, val):
+        """Modify a document's named "set" constraint, parameter or var"""
+        return self._submit(doc_id, "modify", (name, val))
+
+    def update(self, doc_id):
+        """Solve a document; the result is whether it is satisfied"""
+        return self._submit(doc_id, "update", ())
+
+    def values(self, doc_id, names=None):
+        """Values of a document's named vars (all vars if not given)"""
+        return self._submit(doc_id, "values", (names,))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalSolverPool(_BasePool):
+    """In-process stand-in for `SolverPool` (requests complete immediately)"""
+
+    __slots__ = ("store",)
+
+    def __init__(self):
+        self.store = DocumentStore()
+
+    def _submit(self, doc_id, op, args):
+        future = Future()
+        try:
+            future.set_result(self.store.handle(op, doc_id, args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class _Worker(object):
+    """A worker process and the futures of its outstanding requests"""
+
+    __slots__ = (
+        "process",  # worker process
+        "conn",  # parent end of the pipe to the process
+        "futures",  # request id -> future
+        "send_lock",  # serializes writes to the pipe
+        "reader",  # thread that resolves futures from responses
+        "n_docs",  # number of documents placed on this worker
+        "error",  # exception for requests once the pipe is closed (or None)
+    )
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+        self.futures = {}
+        self.send_lock = threading.Lock()
+        self.n_docs = 0
+        self.error = None
+
+        self.reader = threading.Thread(target=self._read)
+        self.reader.daemon = True
+        self.reader.start()
+
+    def _read(self):
+        while True:
+            try:
+                request_id, ok, result = self.conn.recv()
+            except (EOFError, OSError):
+                break
+
+            future = self.futures.pop(request_id)
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+
+        # the worker is gone: fail its outstanding (and later) requests
+        with self.send_lock:
+            self.error = RuntimeError("solver pool worker exited")
+            futures, self.futures = self.futures, {}
+
+        for future in futures.values():
+            future.set_exception(self.error)
+
+    def send(self, request_id, op, doc_id, args):
+        future = Future()
+        with self.send_lock:
+            if self.error is not None:
+                future.set_exception(self.error)
+                return future
+
+            # registered first: the response can arrive before send returns
+            self.futures[request_id] = future
+            try:
+                self.conn.send((request_id, op, doc_id, args))
+            except Exception as e:
+                # a broken pipe, or arguments that can't be pickled
+                del self.futures[request_id]
+                if isinstance(e, OSError):
+                    self.error = e
+                future.set_exception(e)
+
+        return future
+
+    def close(self):
+        with self.send_lock:
+            if self.error is None:
+                try:
+                    self.conn.send(None)
+                except OSError:
+                    pass
+        self.process.join()
+        self.conn.close()
+
+
+class SolverPool(_BasePool):
+    """
+    Pool of worker processes that documents are sharded across
+
+    Parameters
+    ----------
+    n_workers
+        number of worker processes (defaults to the number of cores)
+    context
+        multiprocessing start method ("fork", "spawn", ...)
+    """
+
+    __slots__ = (
+        "workers",  # list of _Worker
+        "placement",  # doc id -> _Worker
+        "lock",  # protects placement and request ids
+        "n_requests",  # counter used for request ids
+    )
+
+    def __init__(self, n_workers=None, context=None):
+        ctx = multiprocessing.get_context(context)
+
+        self.workers = [_Worker(ctx) for _ in range(n_workers or os.cpu_count())]
+        self.placement = {}
+        self.lock = threading.Lock()
+        self.n_requests = 0
+
+    def _submit(self, doc_id, op, args):
+        with self.lock:
+            worker = self.placement.get(doc_id)
+
+            # sticky placement: new documents go to the least loaded worker
+            if worker is None:
+                worker = min(self.workers, key=lambda w: w.n_docs)
+                worker.n_docs += 1
+                self.placement[doc_id] = worker
+
+            if op == "unload":
+                worker.n_docs -= 1
+                del self.placement[doc_id]
+
+            # send while holding the lock so requests for a document
+            # reach its worker in the order they were made
+            self.n_requests += 1
+            return worker.send(self.n_requests, op, doc_id, args)
+
+    def close(self):
+        """Stop all worker processes"""
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+        self.placement = {}
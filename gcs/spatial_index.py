@@ -0,0 +1,252 @@
+"""
+spatial_index: uniform grid index over geometry for picking and region queries
+
+Each geometry element is stored in every grid cell its bounding box
+overlaps (elements that would cover too many cells are kept in a
+separate list that every query checks). Queries only look at the cells
+around the query region, so their cost depends on the number of nearby
+elements instead of the size of the sketch.
+
+The index also tracks which vars each element depends on, so after a
+solve only the elements whose vars changed have to be re-binned.
+"""
+
+from math import floor, inf
+
+
+class GridIndex(object):
+    """
+    Uniform grid spatial index of geometry elements
+
+    Elements must provide `vars`, `bbox()` and `distance(x, y)` (see
+    `geom2d.Geometry`). Elements without a bounding box (or distance)
+    are ignored.
+
+    Parameters
+    ----------
+    cell_size
+        side length of a grid cell (ideally around the size of a
+        typical element or query region)
+    max_cells
+        elements that would cover more cells than this are not binned
+    """
+
+    __slots__ = (
+        "cell_size",  # side length of a cell
+        "max_cells",  # largest number of cells an element is binned into
+        "cells",  # (i, j) -> set of elements
+        "entries",  # element -> (bbox, cell range or None if oversize)
+        "oversize",  # elements that are not binned
+        "var_geoms",  # var -> set of elements that depend on it
+    )
+
+    def __init__(self, cell_size=1.0, max_cells=64):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+
+        self.cells = {}
+        self.entries = {}
+        self.oversize = set()
+        self.var_geoms = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, geom):
+        return geom in self.entries
+
+    # --------------------------------------------
+    # maintenance
+    # --------------------------------------------
+
+    def _cell(self, x, y):
+        return (int(floor(x / self.cell_size)), int(floor(y / self.cell_size)))
+
+    def _cell_range(self, bbox):
+        i0, j0 = self._cell(bbox[0], bbox[1])
+        i1, j1 = self._cell(bbox[2], bbox[3])
+        return (i0, j0, i1, j1)
+
+    def _place(self, geom, bbox):
+        rng = self._cell_range(bbox)
+        i0, j0, i1, j1 = rng
+
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > self.max_cells:
+            self.oversize.add(geom)
+            self.entries[geom] = (bbox, None)
+            return
+
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.cells.setdefault((i, j), set()).add(geom)
+
+        self.entries[geom] = (bbox, rng)
+
+    def _unplace(self, geom):
+        bbox, rng = self.entries.pop(geom)
+
+        if rng is None:
+            self.oversize.discard(geom)
+            return
+
+        i0, j0, i1, j1 = rng
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = self.cells[(i, j)]
+                cell.discard(geom)
+                if not cell:
+                    del self.cells[(i, j)]
+
+    def insert(self, geom):
+        """Add a geometry element to the index"""
+        bbox = geom.bbox()
+        if bbox is None:
+            return
+
+        if geom in self.entries:
+            self._unplace(geom)
+
+        for var in geom.vars:
+            self.var_geoms.setdefault(var, set()).add(geom)
+
+        self._place(geom, bbox)
+
+    def remove(self, geom):
+        """Remove a geometry element from the index"""
+        if geom not in self.entries:
+            return
+
+        self._unplace(geom)
+
+        for var in geom.vars:
+            geoms = self.var_geoms.get(var)
+            if geoms is not None:
+                geoms.discard(geom)
+                if not geoms:
+                    del self.var_geoms[var]
+
+    def refresh(self, vars):
+        """Re-bin the elements that depend on any of the given vars"""
+        geoms = set()
+        for var in vars:
+            geoms |= self.var_geoms.get(var, set())
+
+        for geom in geoms:
+            bbox = geom.bbox()
+            old_bbox, rng = self.entries[geom]
+
+            if rng is not None and self._cell_range(bbox) == rng:
+                # still in the same cells, only the bbox moved
+                self.entries[geom] = (bbox, rng)
+            else:
+                self._unplace(geom)
+                self._place(geom, bbox)
+
+    # --------------------------------------------
+    # queries
+    # --------------------------------------------
+
+    def _candidates(self, xmin, ymin, xmax, ymax):
+        """Elements in the cells overlapping a rectangle, plus oversize ones"""
+        i0, j0, i1, j1 = self._cell_range((xmin, ymin, xmax, ymax))
+        found = set(self.oversize)
+
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.cells):
+            # the rectangle covers more cells than are occupied
+            for (i, j), geoms in self.cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    found |= geoms
+        else:
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    found |= self.cells.get((i, j), set())
+
+        return found
+
+    def in_rect(self, xmin, ymin, xmax, ymax, contained=False):
+        """
+        Elements whose bounding box intersects a rectangle
+
+        If `contained` is true, only elements whose bounding box lies
+        completely inside the rectangle are returned.
+        """
+        found = []
+
+        for geom in self._candidates(xmin, ymin, xmax, ymax):
+            bx0, by0, bx1, by1 = self.entries[geom][0]
+
+            if contained:
+                if xmin <= bx0 and bx1 <= xmax and ymin <= by0 and by1 <= ymax:
+                    found.append(geom)
+            elif bx0 <= xmax and xmin <= bx1 and by0 <= ymax and ymin <= by1:
+                found.append(geom)
+
+        return found
+
+    def within_radius(self, x, y, r):
+        """Elements within distance `r` of a point"""
+        found = []
+        for geom in self._candidates(x - r, y - r, x + r, y + r):
+            d = geom.distance(x, y)
+            if d is not None and d <= r:
+                found.append(geom)
+
+        return found
+
+    def _ring(self, ci, cj, k):
+        """Cells at Chebyshev distance k from cell (ci, cj)"""
+        if k == 0:
+            yield (ci, cj)
+            return
+
+        for i in range(ci - k, ci + k + 1):
+            yield (i, cj - k)
+            yield (i, cj + k)
+
+        for j in range(cj - k + 1, cj + k):
+            yield (ci - k, j)
+            yield (ci + k, j)
+
+    def nearest(self, x, y, max_dist=inf):
+        """
+        Closest element to a point, as `(geom, distance)`
+
+        Returns `(None, inf)` if no element is within `max_dist`
+        """
+        best, best_d = None, max_dist
+        seen = set()
+
+        def check(geoms):
+            nonlocal best, best_d
+            for geom in geoms:
+                if geom not in seen:
+                    seen.add(geom)
+                    d = geom.distance(x, y)
+                    if d is not None and d <= best_d:
+                        best, best_d = geom, d
+
+        check(self.oversize)
+
+        ci, cj = self._cell(x, y)
+        k = 0
+
+        while True:
+            if 8 * k > len(self.cells):
+                # ring is larger than the occupied grid: check the rest
+                for geoms in self.cells.values():
+                    check(geoms)
+                break
+
+            for cell in self._ring(ci, cj, k):
+                check(self.cells.get(cell, ()))
+
+            # anything outside rings 0..k is at least k cells away
+            if best_d <= k * self.cell_size:
+                break
+
+            k += 1
+
+        if best is None:
+            return None, inf
+
+        return best, best_d
@@ -1,8 +1,20 @@
 from __future__ import division
 
+from functools import partial
+
 from .solve_elements import EqnSet
+from .var_aliases import VarAliases
+from .linear_solver import LinearSolver
+from .residuals import ResidualEngine
+from .sensitivity import Sensitivity
 
-from .equation_solving import split_equation_set, solve_eqn_sets, solve_eqn_set
+from .equation_solving import (
+    split_equation_set_bitset,
+    solve_eqn_sets,
+    solve_eqn_set,
+    solve_drag,
+    SolveCancelled,
+)
 
 
 class Solver(object):
@@ -22,6 +34,8 @@ class Solver(object):
         modify the value of a Var
     delete_variable(self, var):
         delete a variable
+    modify_parameter(self, param, val):
+        modify the value of a Parameter
     
     Equations
     ---------
@@ -29,6 +43,8 @@ class Solver(object):
         add an Eqn
     add_equations(self, eqns):
         add an iterable of Eqns
+    modify_equations(self, eqns):
+        re-solve Eqns whose functions have changed
     delete_equation(self, eqn):
         delete an Eqn
     delete_equations(self, eqns):
@@ -38,13 +54,28 @@ class Solver(object):
     ------
     is_satisfied(self):
         Are all equations satisfied
+    residual_report(self):
+        Residuals, max error and violated constraints of all equations
     is_constrained(self):
         Is this a constrained system (equal number of Vars and Eqns)
+    evaluation_counts(self):
+        Number of equation evaluations requested and actually computed
+    stats(self):
+        Counters of evaluations, split budget, cache, linear solver, etc.
     
     Update
     ------
-    update(self):
+    update(self, cancel=None):
         Update/reset/solve this system
+    drag(self, targets, weight=1.0, cancel=None):
+        Move free vars toward targets without changing the decomposition
+
+    Sensitivity
+    -----------
+    derivatives(self, params):
+        First-order derivatives of solved vars with respect to Parameters
+    preview(self, changes):
+        Linearized values of solved vars for new Parameter values
     """
 
     __slots__ = (
@@ -52,15 +83,33 @@ class Solver(object):
         "eqns",  # all equations
         "eqn_sets",  # equation sets to be solved (includes uc_set)
         "modified_vars",  # set of vars modified since update
+        "updated_vars",  # set of vars whose values changed in the last update
+        "failed_set",  # equation set that failed in the last update (or None)
         "modified",  # true if eqn/var has been deleted (need reset)
         "modified_eqn_sets",  # true if underconstrained set has been modified
         "split_func",  # function that splits equation sets
         "solve_func",  # function that solves a single equation set
         "solve_tol",  # tolerance for deciding an equation is solved
+        "cache",  # SolutionCache of equation set solutions (or None)
+        "aliases",  # VarAliases merging vars of equality eqns (or None)
+        "linear",  # LinearSolver for batches of linear sets (or None)
+        "split_budget",  # SplitBudget passed to split_func (or None)
+        "strategy",  # SolverStrategy passed to solve_func (or None)
+        "residual_engine",  # ResidualEngine of all eqns (None until needed)
+        "retired_sets",  # frozenset of eqns -> eqn set dissolved by reset
+        "sensitivity",  # Sensitivity of solved vars (None until needed)
     )
 
     def __init__(
-        self, split_func=split_equation_set, solve_func=solve_eqn_set, solve_tol=1.0e-6
+        self,
+        split_func=split_equation_set_bitset,
+        solve_func=solve_eqn_set,
+        solve_tol=1.0e-6,
+        cache=None,
+        aliases=True,
+        linear=True,
+        split_budget=None,
+        strategy=None,
     ):
 
         self.vars = set()
@@ -68,6 +117,8 @@ class Solver(object):
         self.eqn_sets = set()
 
         self.modified_vars = set()
+        self.updated_vars = set()
+        self.failed_set = None
         self.modified = False
         self.modified_eqn_sets = set()
 
@@ -75,6 +126,14 @@ class Solver(object):
         self.solve_func = solve_func
 
         self.solve_tol = solve_tol
+        self.cache = cache
+        self.aliases = VarAliases() if aliases else None
+        self.linear = LinearSolver() if linear else None
+        self.split_budget = split_budget
+        self.strategy = strategy
+        self.residual_engine = None
+        self.retired_sets = {}
+        self.sensitivity = None
 
     # --------------------------------------------
     # Variable: add, modify, delete
@@ -93,16 +152,36 @@ class Solver(object):
     def modify_variable(self, var, val):
         """Modify the value of a variable"""
         var.val = val
-        self.modified_vars.add(var)
+        self.modified_vars.add(var.rep())
 
     def delete_variable(self, var):
         """Delete a variable, and all equations that reference it"""
         self.vars.discard(var)
         self.eqns -= var.all_eqns
+
+        if self.aliases is not None:
+            for eqn in var.all_eqns:
+                self.aliases.remove(eqn)
+
         var.delete()
 
         self.modified = True
 
+    def modify_parameter(self, param, val):
+        """
+        Modify the value of a parameter
+
+        Only the equation sets of equations that use the parameter are
+        re-solved (and whatever depends on them)
+        """
+        param.val = val
+
+        # the sets become unsatisfied, so their solved vars re-solve them
+        #   (eqns not split yet are solved by the next update anyway)
+        for eqn in param.eqns:
+            if eqn in self.eqns and eqn.eqn_set is not None:
+                self.modified_vars.update(eqn.eqn_set.solves)
+
     # --------------------------------------------
     # constraint: add, modify, delete
     # --------------------------------------------
@@ -144,24 +223,53 @@ class Solver(object):
         #
         # self.combine_eqn_sets(affected_eqn_sets)
 
+        if self.aliases is not None:
+            for eqn in eqns:
+                self.aliases.add(eqn)
+
         self.eqns.update(eqns)
         self.modified = True
+        self.residual_engine = None
+
+    def modify_equations(self, eqns):
+        """
+        Re-solve equations whose functions have changed (like a flipped
+        branch), without changing the structure of the system
+        """
+        for eqn in eqns:
+            eqn.invalidate()
+
+            if eqn.eqn_set is not None:
+                self.invalidate(eqn.eqn_set)
+
+            self.modified_vars.update(eqn.all_vars)
+
+        self.residual_engine = None
 
     def delete_equation(self, eqn):
         """Delete an equation from the system"""
         self.eqns.discard(eqn)
+
+        if self.aliases is not None:
+            self.aliases.remove(eqn)
+
         eqn.delete()
 
         self.modified = True
+        self.residual_engine = None
 
     def delete_equations(self, eqns):
         """Delete multiple equations"""
         self.eqns.difference_update(eqns)
 
         for eqn in eqns:
+            if self.aliases is not None:
+                self.aliases.remove(eqn)
+
             eqn.delete()
 
         self.modified = True
+        self.residual_engine = None
 
     # --------------------------------------------
     # state: satisfied, constrained
@@ -169,18 +277,82 @@ class Solver(object):
 
     def is_satisfied(self):
         """Are all equations satisfied?"""
-        return all(eqn.is_satisfied(self.solve_tol) for eqn in self.eqns)
+        return self.residual_report()[1] < self.solve_tol
+
+    def residual_report(self):
+        """
+        Evaluate all equations at once (see `ResidualEngine.check`),
+        returning `(residuals, max error, violated constraints)`
+        """
+        if self.residual_engine is None:
+            self.residual_engine = ResidualEngine(self.eqns)
+
+        return self.residual_engine.check(self.solve_tol)
+
+    def refresh_residuals(self, eqns):
+        """Pick up changed constants of eqns at the next residual report"""
+        engine = self.residual_engine
+        if engine is not None and not engine.refresh(eqns):
+            self.residual_engine = None
 
     def is_constrained(self):
         """Is the solve system constrained?"""
         return len(self.eqns) == len(self.vars)
 
+    def evaluation_counts(self):
+        """
+        Equation evaluation counters, summed over all equations
+
+        `calls` is the number of times equations were evaluated, and
+        `evaluations` is the number of those that were not answered
+        by the equations' cached residuals
+        """
+        return {
+            "calls": sum(eqn.calls for eqn in self.eqns),
+            "evaluations": sum(eqn.evaluations for eqn in self.eqns),
+        }
+
+    def stats(self):
+        """
+        Counters for reporting: equation evaluations, and the split
+        budget, solver strategy, solution cache, linear solver and
+        sensitivity (if used)
+        """
+        stats = {"evaluations": self.evaluation_counts()}
+
+        if self.split_budget is not None:
+            stats["split"] = self.split_budget.stats()
+        if self.strategy is not None:
+            stats["strategy"] = dict(self.strategy.counts)
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.linear is not None:
+            stats["linear"] = self.linear.stats()
+        if self.sensitivity is not None:
+            stats["sensitivity"] = self.sensitivity.stats()
+
+        return stats
+
     # --------------------------------------------
     # update, solve, reset
     # --------------------------------------------
 
-    def update(self):
-        """Reset, split, and solve all equation sets"""
+    def eqn_set_solver(self):
+        """solve_func, given the solver strategy (if any)"""
+        if self.strategy is None:
+            return self.solve_func
+        return partial(self.solve_func, strategy=self.strategy)
+
+    def update(self, cancel=None):
+        """
+        Reset, split, and solve all equation sets
+
+        `cancel` is checked between solving equation sets (see
+        `solve_eqn_sets`). If the solve is cancelled, vars that still
+        need solving stay modified for the next update, and False is
+        returned. If an equation set can't be solved, it is kept in
+        `failed_set` and False is returned. Otherwise True is returned.
+        """
 
         # Reset (combine all eqns into one set, and undo solve status)
         #   Do this iff the structure has been modified
@@ -191,7 +363,12 @@ class Solver(object):
         #   It is easier to solve smaller equation sets numerically
         for eqn_set in self.modified_eqn_sets:
             self.eqn_sets.discard(eqn_set)
-            new_sets = self.split_func(eqn_set)
+            self.invalidate(eqn_set)
+            if self.split_budget is None:
+                new_sets = self.split_func(eqn_set)
+            else:
+                new_sets = self.split_func(eqn_set, budget=self.split_budget)
+            new_sets = self.reuse_eqn_sets(new_sets)
             self.eqn_sets.update(new_sets)
 
             # update modified vars - TODO: is this necessary?
@@ -200,10 +377,128 @@ class Solver(object):
             )
 
         self.modified_eqn_sets = set()
+        self.retired_sets = {}
 
         # Solve (re-solve any equation set that has modified vars)
-        solve_eqn_sets(self.eqn_sets, self.modified_vars, self.solve_func)
+        self.updated_vars = set()
+        self.failed_set = None
+        try:
+            self.failed_set = solve_eqn_sets(
+                self.eqn_sets,
+                self.modified_vars,
+                self.eqn_set_solver(),
+                cancel=cancel,
+                cache=self.cache,
+                updated_vars=self.updated_vars,
+                linear=self.linear,
+            )
+        except SolveCancelled as e:
+            self.modified_vars = e.modified_vars
+            self.add_aliases(self.updated_vars)
+            return False
+
         self.modified_vars = set()
+        self.add_aliases(self.updated_vars)
+        return self.failed_set is None
+
+    def drag(self, targets, weight=1.0, cancel=None):
+        """
+        Move vars toward target values, keeping all equations satisfied
+
+        `targets` maps vars to target values. This acts like temporary
+        soft constraints: each underconstrained equation set with a
+        target var is solved as a weighted least squares problem (see
+        `solve_least_squares`), and sets that depend on its vars are
+        re-solved. Equations are never added or removed, so the stored
+        decomposition stays the same for the whole drag (a pending
+        structural change is applied by `update` first).
+
+        Vars in no equation are set to their targets. Vars solved by
+        constrained sets are fixed by their equations and don't move.
+
+        Returns True if all vars could follow, and False if a set could
+        not be solved or the solve was cancelled (see `update`)
+        """
+        if self.modified or self.modified_eqn_sets or self.modified_vars:
+            if not self.update(cancel):
+                return False
+
+        changed = set()
+        uc_targets = {}
+
+        for var, val in targets.items():
+            var = var.rep()
+            eqn_set = var.solved_by
+            if eqn_set is None:
+                var.val = val
+                changed.add(var)
+            elif not eqn_set.is_constrained():
+                uc_targets.setdefault(eqn_set, {})[var] = val
+
+        success = True
+        for eqn_set, set_targets in uc_targets.items():
+            if solve_drag(eqn_set, set_targets, weight):
+                changed |= eqn_set.solves
+            else:
+                success = False
+
+        # dependent sets see the new values as modified required vars
+        self.updated_vars = set()
+        self.failed_set = None
+        try:
+            self.failed_set = solve_eqn_sets(
+                self.eqn_sets,
+                changed,
+                self.eqn_set_solver(),
+                cancel=cancel,
+                cache=self.cache,
+                updated_vars=self.updated_vars,
+                linear=self.linear,
+            )
+        except SolveCancelled as e:
+            self.modified_vars = e.modified_vars
+            self.add_aliases(self.updated_vars)
+            return False
+
+        if self.failed_set is not None:
+            success = False
+
+        self.add_aliases(self.updated_vars)
+        return success
+
+    def derivatives(self, params):
+        """
+        Derivatives of solved vars with respect to Parameters
+
+        Returns a dict of var -> array of its derivatives with respect to
+        each of `params`, for the vars that depend on them, from the
+        Jacobians of the equation sets at the solved values (see
+        `sensitivity`). A pending change is applied by `update` first.
+        """
+        if self.modified or self.modified_eqn_sets or self.modified_vars:
+            self.update()
+
+        if self.sensitivity is None:
+            self.sensitivity = Sensitivity(self)
+
+        return self.sensitivity.propagate(params)[0]
+
+    def preview(self, changes):
+        """
+        Where solved vars would move if Parameters changed, without solving
+
+        `changes` maps Parameters to new values. Returns `(values,
+        error)`: first-order values of the vars that move, and the
+        largest residual at those values, which is small where the
+        preview can stand in for an update (see `Sensitivity.preview`)
+        """
+        if self.modified or self.modified_eqn_sets or self.modified_vars:
+            self.update()
+
+        if self.sensitivity is None:
+            self.sensitivity = Sensitivity(self)
+
+        return self.sensitivity.preview(changes)
 
     def reset(self):
         """
@@ -212,22 +507,98 @@ class Solver(object):
         After this, the only equation set will be a single
         set which contains all equations
         """
+        for eqn_set in self.eqn_sets:
+            self.invalidate(eqn_set)
+
+        # the next split can hand back identical sets as these objects
+        self.retired_sets = {
+            frozenset(eqn_set.eqns): eqn_set for eqn_set in self.eqn_sets
+        }
+
         new_eqn_set = EqnSet()
         self.eqn_sets = {new_eqn_set}
 
+        # merge vars tied by equality eqns before eqns pick up their vars
+        if self.aliases is not None:
+            self.aliases.apply(self.vars)
+
         for var in self.vars:
             var.reset()
 
         for eqn in self.eqns:
             eqn.reset()
 
+        # representatives take over the eqns of their aliases, and the
+        # equality eqns that were merged away are left out
+        if self.aliases is not None:
+            for var in self.vars:
+                if var.alias is not None:
+                    var.alias.eqns |= var.eqns
+                    var.eqns = set()
+
+            for var in self.vars:
+                var.eqns -= self.aliases.eqns
+
         for eqn in self.eqns:
-            new_eqn_set.add(eqn)
+            if self.aliases is None or eqn not in self.aliases.eqns:
+                new_eqn_set.add(eqn)
 
         self.modified = False
         self.modified_eqn_sets = {new_eqn_set}
         self.modified_vars = set(self.vars)
 
+    def invalidate(self, eqn_set):
+        """Drop everything cached about an equation set"""
+        if self.cache is not None:
+            self.cache.invalidate(eqn_set)
+
+        if self.linear is not None:
+            self.linear.invalidate(eqn_set)
+
+    def reuse_eqn_sets(self, new_sets):
+        """
+        Replace split sets by identical sets that reset dissolved
+
+        An identical set (same eqns, solves and requires) takes over the
+        links of the new one, so a decomposition that didn't change
+        keeps its equation set objects (see `journal`)
+        """
+        if not self.retired_sets:
+            return new_sets
+
+        reused = set()
+        for eqn_set in new_sets:
+            old = self.retired_sets.pop(frozenset(eqn_set.eqns), None)
+            if (
+                old is None
+                or old.solves != eqn_set.solves
+                or old.requires != eqn_set.requires
+            ):
+                reused.add(eqn_set)
+                continue
+
+            old.vars = eqn_set.vars
+            old.all_vars = eqn_set.all_vars
+
+            for var in old.solves:
+                var.solved_by = old
+
+            for var in old.requires:
+                var.required_by.discard(eqn_set)
+                var.required_by.add(old)
+
+            for eqn in old.eqns:
+                eqn.eqn_set = old
+
+            reused.add(old)
+
+        return reused
+
+    def add_aliases(self, vars):
+        """Add the aliases of the vars in a set to it"""
+        for var in list(vars):
+            vars |= var.aliases
+
     # --------------------------------------------
     # utility
     # --------------------------------------------
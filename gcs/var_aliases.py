@@ -0,0 +1,103 @@
+"""
+var_aliases: merge vars that equality equations tie together
+
+Equality equations (`EqualityEqn`, like the two equations of a
+coincidence constraint) do not need to be solved: the vars they tie
+together can be merged into one. `VarAliases` keeps the classes of
+equal vars in a union-find structure that is updated as equality
+equations are added and removed, and `apply` makes every var of a
+class an alias of the class representative before a solver splits its
+equations. The splitter and numeric solver then see one var per class
+and none of the equality equations.
+"""
+
+from .solve_elements import EqualityEqn
+
+
+class VarAliases(object):
+    """
+    Union-find classes of vars tied together by equality equations
+
+    Every var of a class points directly at the class root, and classes
+    are merged smaller into larger, so finding a representative is a
+    single lookup. Removing an equation only rebuilds its own class.
+    """
+
+    __slots__ = (
+        "eqns",  # equality eqns that classes are built from
+        "root",  # var -> root var of its class (vars in classes only)
+        "members",  # root var -> set of vars in its class
+    )
+
+    def __init__(self):
+        self.eqns = set()
+        self.root = {}
+        self.members = {}
+
+    def find(self, var):
+        """Representative of the class of a var"""
+        return self.root.get(var, var)
+
+    def add(self, eqn):
+        """Merge the classes of the vars of an equality eqn"""
+        if not isinstance(eqn, EqualityEqn) or eqn in self.eqns:
+            return
+
+        self.eqns.add(eqn)
+        self._union(*eqn.var_list)
+
+    def remove(self, eqn):
+        """Split the class of an equality eqn, without the eqn"""
+        if eqn not in self.eqns:
+            return
+
+        self.eqns.discard(eqn)
+
+        root = self.find(eqn.var_list[0])
+        members = self.members.pop(root, ())
+
+        for var in members:
+            del self.root[var]
+
+        # re-merge with the equations that are left in the class
+        for var in members:
+            for other in var.all_eqns:
+                if other in self.eqns:
+                    self._union(*other.var_list)
+
+    def _union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra is rb:
+            return
+
+        ma = self.members.get(ra, {ra})
+        mb = self.members.get(rb, {rb})
+
+        if len(ma) < len(mb):
+            ra, rb, ma, mb = rb, ra, mb, ma
+
+        for var in mb:
+            self.root[var] = ra
+
+        ma |= mb
+        self.root[ra] = ra
+        self.members[ra] = ma
+        self.members.pop(rb, None)
+
+    def apply(self, vars):
+        """Point every var at the representative of its class"""
+        aliases = {}
+        for var in vars:
+            root = self.find(var)
+            aliases[var] = None if root is var else root
+
+        # detach first, so no var is briefly an alias of its own alias
+        for var, alias in aliases.items():
+            if var.alias is not alias:
+                var.set_alias(None)
+
+        for var, alias in aliases.items():
+            var.set_alias(alias)
+
+    def __len__(self):
+        return len(self.eqns)
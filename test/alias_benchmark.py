@@ -0,0 +1,82 @@
+"""
+Compare solving with and without merging vars of equality constraints
+
+Solves generated linkage chains (every joint is a pair of coincidence
+constraints) with and without the var aliasing pre-pass of `Solver`,
+and reports the number of vars and eqns the splitter sees, the number
+of equation sets, numeric solves and function evaluations, and time
+"""
+
+import timeit
+
+from gcs import sample_problems as samples
+from gcs import constraint_solver as cs
+
+from benchmark_tools import build
+
+
+def solve(n_links, seed, aliases):
+    solver = build(
+        samples.linkage_chain(n_links, seed, params=True), aliases=aliases
+    )
+
+    eqn_sets = solver.solver.eqn_sets
+    n_vars = sum(len(eqn_set.solves) for eqn_set in eqn_sets)
+    n_eqns = sum(len(eqn_set.eqns) for eqn_set in eqn_sets)
+
+    return solver.is_satisfied(), n_vars, n_eqns, len(eqn_sets)
+
+
+def main():
+    N_SKETCHES = 10
+
+    print(
+        "%6s %7s %9s %7s %7s %7s %8s %8s %8s"
+        % (
+            "links",
+            "aliases",
+            "satisfied",
+            "vars",
+            "eqns",
+            "sets",
+            "solves",
+            "nfev",
+            "time",
+        )
+    )
+
+    for n_links in (10, 30):
+        for aliases in (False, True):
+            cs.default_strategy = cs.SolverStrategy()
+            satisfied = n_vars = n_eqns = n_sets = 0
+
+            t = timeit.default_timer()
+            for seed in range(N_SKETCHES):
+                ok, v, e, s = solve(n_links, seed, aliases)
+                satisfied += ok
+                n_vars += v
+                n_eqns += e
+                n_sets += s
+            t = timeit.default_timer() - t
+
+            counts = cs.default_strategy.counts
+
+            print(
+                "%6d %7s %6d/%-2d %7d %7d %7d %8d %8d %7.2fs"
+                % (
+                    n_links,
+                    aliases,
+                    satisfied,
+                    N_SKETCHES,
+                    n_vars // N_SKETCHES,
+                    n_eqns // N_SKETCHES,
+                    n_sets // N_SKETCHES,
+                    counts["solves"] // N_SKETCHES,
+                    counts["nfev"] // N_SKETCHES,
+                    t,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
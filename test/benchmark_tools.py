@@ -0,0 +1,31 @@
+"""
+Helpers shared by the benchmark scripts
+"""
+
+from gcs import geom_solver as gs
+
+
+def build(problem, solve=True, **kwargs):
+    """
+    GCS with the elements of a problem tuple (like the one
+    `sample_problems.problem2` returns) added, and updated if `solve`
+    is true
+
+    Keyword arguments are passed on to `GCS`.
+    """
+    geometry, variables, constraints, all_vars = problem
+
+    solver = gs.GCS(**kwargs)
+
+    for g in geometry:
+        solver.add_geometry(g)
+
+    for v in variables:
+        solver.add_variable(v)
+
+    for c in constraints:
+        solver.add_constraint(c)
+
+    if solve:
+        solver.update()
+    return solver
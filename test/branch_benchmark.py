@@ -0,0 +1,87 @@
+"""
+Compare unsigned and branch-locked constraint formulations
+
+Solves problem2 and generated linkage chains with the unsigned
+constraints (abs/min residuals) and with branches locked from the
+initial geometry (smooth signed residuals), and reports satisfied
+sketches, function evaluations, fallback rates and failures of
+`solve_numeric`
+"""
+
+import timeit
+
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+from gcs import constraint_solver as cs
+
+from benchmark_tools import build
+
+
+def solve(problem):
+    return build(problem).is_satisfied()
+
+
+def main():
+    N_LINKS = 10
+    N_SKETCHES = 40
+
+    cases = (
+        ("problem2", lambda seed: samples.problem2(), 1),
+        (
+            "chain",
+            lambda seed: samples.linkage_chain(N_LINKS, seed, noise=0.1),
+            N_SKETCHES,
+        ),
+        (
+            "chain-noisy",
+            lambda seed: samples.linkage_chain(N_LINKS, seed, noise=0.3),
+            N_SKETCHES,
+        ),
+    )
+
+    print(
+        "%-12s %6s %9s %8s %8s %10s %9s %8s"
+        % (
+            "problem",
+            "locked",
+            "satisfied",
+            "solves",
+            "nfev",
+            "fallbacks",
+            "failures",
+            "time",
+        )
+    )
+
+    for name, make, n in cases:
+        for locked in (False, True):
+            # constraints read the default when they are created
+            g2d.lock_branches = locked
+            cs.default_strategy = cs.SolverStrategy()
+
+            t = timeit.default_timer()
+            satisfied = sum(solve(make(seed)) for seed in range(n))
+            t = timeit.default_timer() - t
+
+            counts = cs.default_strategy.counts
+
+            print(
+                "%-12s %6s %6d/%-2d %8d %8d %9.1f%% %9d %7.2fs"
+                % (
+                    name,
+                    locked,
+                    satisfied,
+                    n,
+                    counts["solves"],
+                    counts["nfev"],
+                    100.0 * counts["fallbacks"] / max(counts["solves"], 1),
+                    counts["failures"],
+                    t,
+                )
+            )
+
+    g2d.lock_branches = False
+
+
+if __name__ == "__main__":
+    main()
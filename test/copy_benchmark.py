@@ -0,0 +1,87 @@
+"""
+Compare rebuilding a solved sketch for each what-if edit with copying it
+
+For generated sketches, times building and solving from scratch, and
+deep copying the solved `GCS` (`GCS.deep_copy`), then applies one edit
+to each of a number of copies and re-solves them. Also reports the
+pickled size of a solver, which is what is sent to a `SolverPool`
+worker by `load_copy`
+"""
+
+import pickle
+import timeit
+
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+
+from benchmark_tools import build
+
+
+def main():
+    N_COPIES = 10
+
+    # edits of dimensions stay on the same branch
+    g2d.lock_branches = True
+
+    problems = [
+        ("chain 100", lambda: samples.linkage_chain(100, 1, params=True)),
+        ("grid 20x20", lambda: samples.dimensioned_grid(20, 20)),
+    ]
+
+    print(
+        "%-12s %9s %9s %9s %9s %10s %10s"
+        % ("sketch", "rebuild", "copy", "pickle", "size", "satisfied", "untouched")
+    )
+
+    for name, make in problems:
+        t = timeit.default_timer()
+        solver = build(make())
+        t_build = timeit.default_timer() - t
+
+        before = {var: var.val for var in solver.solver.vars}
+
+        t = timeit.default_timer()
+        copies = [solver.deep_copy() for _ in range(N_COPIES)]
+        t_copy = (timeit.default_timer() - t) / N_COPIES
+
+        t = timeit.default_timer()
+        data = pickle.dumps(solver, -1)
+        pickle.loads(data)
+        t_pickle = timeit.default_timer() - t
+
+        # one what-if edit per copy: scale one of its length dimensions
+        satisfied = 0
+        for k, copy in enumerate(copies):
+            params = sorted(
+                set(
+                    p
+                    for c in copy.constraints
+                    for eqn in c.equations
+                    for p in eqn.params
+                    if not p.name.startswith("a")
+                ),
+                key=lambda p: p.name,
+            )
+            copy.modify_parameter(params[k], params[k].val * 1.05)
+            copy.update()
+            satisfied += copy.is_satisfied()
+
+        untouched = all(var.val == val for var, val in before.items())
+
+        print(
+            "%-12s %8.3fs %8.3fs %8.3fs %7dkB %7d/%-2d %10s"
+            % (
+                name,
+                t_build,
+                t_copy,
+                t_pickle,
+                len(data) // 1000,
+                satisfied,
+                N_COPIES,
+                untouched,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Compare undoing edits by re-solving with restoring them from a journal
+
+For generated sketches, applies a series of edits (dimension changes,
+and constraints replaced by new ones), each followed by an update, to a
+`GCS` with `undo_steps`, which records the changed states after each
+update (the time to compare all states is shown as "record"). Then
+times undoing every edit the old way, by
+applying the inverse edit and updating, and with `GCS.undo`, which
+restores the recorded states without splitting or solving, and checks
+that the restored values are the ones before the edits. Also times
+frames of dragging a point followed by an update, without and with
+the journal recording each of them ("drag", "drag+j").
+"""
+
+import timeit
+
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+from gcs.sketch_io import CONSTRAINT_FIELDS
+
+from benchmark_tools import build
+
+
+def replacement(cstr):
+    """A new constraint of the same kind on the same elements"""
+    args = [getattr(cstr, field) for field in CONSTRAINT_FIELDS[type(cstr).__name__]]
+    if isinstance(cstr, g2d.BranchedConstraint):
+        return type(cstr)(cstr.name + "'", *args, branch=cstr.branch, lock=True)
+    return type(cstr)(cstr.name + "'", *args)
+
+
+def edits(solver, n_edits):
+    """(do, inverse) pairs of edits"""
+    params = sorted(
+        set(
+            p
+            for c in solver.constraints
+            for eqn in c.equations
+            for p in eqn.params
+            if not p.name.startswith("a")
+        ),
+        key=lambda p: p.name,
+    )
+    constraints = sorted(
+        (c for c in solver.constraints if type(c).__name__ in CONSTRAINT_FIELDS),
+        key=lambda c: c.name,
+    )
+
+    pairs = []
+    for k in range(n_edits):
+        if k % 2 == 0:
+            p = params[(7 * k) % len(params)]
+            val = p.val
+            pairs.append(
+                (
+                    lambda p=p, val=val: solver.modify_parameter(p, val + 0.5),
+                    lambda p=p, val=val: solver.modify_parameter(p, val),
+                )
+            )
+        else:
+            old = constraints[(11 * k) % len(constraints)]
+            new = replacement(old)
+
+            def replace(a, b):
+                solver.delete_constraint(a)
+                solver.add_constraint(b)
+
+            pairs.append(
+                (
+                    lambda old=old, new=new: replace(old, new),
+                    # deleted constraints can't be added back: use a copy
+                    lambda old=old, new=new: replace(new, replacement(old)),
+                )
+            )
+
+    return pairs
+
+
+def drag_frames(solver, n_frames):
+    """Time per frame of dragging the end of the last line and updating"""
+    line = max(
+        (g for g in solver.geometry if isinstance(g, g2d.LineSegment)),
+        key=lambda g: g.name,
+    )
+    p = line.p2
+    x, y = p.x.val, p.y.val
+
+    t = timeit.default_timer()
+    for k in range(n_frames):
+        solver.drag_point(p, x + 0.1 * k, y)
+        solver.update()
+    return (timeit.default_timer() - t) / n_frames
+
+
+def main():
+    N_EDITS = 10
+    N_FRAMES = 20
+
+    # edits of dimensions stay on the same branch
+    g2d.lock_branches = True
+
+    problems = [
+        ("chain 100", lambda: samples.linkage_chain(100, 1, params=True)),
+        ("grid 15x15", lambda: samples.dimensioned_grid(15, 15)),
+    ]
+
+    print(
+        "%-12s %9s %9s %9s %9s %9s %9s %9s %9s"
+        % (
+            "sketch",
+            "elements",
+            "entry",
+            "record",
+            "re-solve",
+            "undo",
+            "restored",
+            "drag",
+            "drag+j",
+        )
+    )
+
+    for name, make in problems:
+        # the old way: apply the inverse edits and update
+        solver = build(make())
+        before = {var: var.val for var in solver.solver.vars}
+        pairs = edits(solver, N_EDITS)
+
+        for do, _ in pairs:
+            do()
+            solver.update()
+
+        t = timeit.default_timer()
+        for _, inverse in reversed(pairs):
+            inverse()
+            solver.update()
+        t_resolve = (timeit.default_timer() - t) / N_EDITS
+
+        # with a journal
+        solver = build(make(), undo_steps=N_EDITS)
+        before = {var: var.val for var in solver.solver.vars}
+        pairs = edits(solver, N_EDITS)
+
+        for do, _ in pairs:
+            do()
+            solver.update()
+
+        journal = solver.journal
+        entry = sum(len(e) for e in journal.undo_entries) / len(journal.undo_entries)
+
+        # with nothing to record, this is the cost of the comparison
+        t = timeit.default_timer()
+        journal.record()
+        t_record = timeit.default_timer() - t
+
+        t = timeit.default_timer()
+        for _ in pairs:
+            solver.undo()
+        t_undo = (timeit.default_timer() - t) / N_EDITS
+
+        restored = all(var.val == val for var, val in before.items())
+        restored = restored and solver.is_satisfied() and not journal.pending()
+
+        t_drag = drag_frames(build(make()), N_FRAMES)
+        t_drag_journal = drag_frames(
+            build(make(), undo_steps=N_FRAMES), N_FRAMES
+        )
+
+        print(
+            "%-12s %9d %9.1f %8.4fs %8.3fs %8.4fs %9s %8.4fs %8.4fs"
+            % (
+                name,
+                len(journal.states),
+                entry,
+                t_record,
+                t_resolve,
+                t_undo,
+                restored,
+                t_drag,
+                t_drag_journal,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
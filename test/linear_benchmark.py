@@ -0,0 +1,103 @@
+"""
+Compare solving linear equation sets one by one and in sparse batches
+
+Solves a generated grid of dimensioned points (all equations linear)
+with and without the batched sparse LU solve of linear equation sets,
+then changes one dimension back and forth and re-solves. Reports
+numeric solves, function evaluations, LU factorizations and reuses,
+and times (the initial solve time leaves out splitting, which is the
+same either way)
+"""
+
+import timeit
+
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+from gcs import constraint_solver as cs
+from gcs.equation_solving import split_equation_set
+
+from benchmark_tools import build
+
+
+def timed_split(times):
+    """split_equation_set that adds its run time to a list"""
+
+    def split(eqn_set):
+        t = timeit.default_timer()
+        eqn_sets = split_equation_set(eqn_set)
+        times.append(timeit.default_timer() - t)
+        return eqn_sets
+
+    return split
+
+
+def main():
+    NX, NY = 30, 30
+    N_EDITS = 20
+
+    print(
+        "%7s %8s %8s %9s %10s %8s %9s %9s"
+        % (
+            "batched",
+            "solves",
+            "nfev",
+            "factored",
+            "reused",
+            "solve",
+            "edits",
+            "per edit",
+        )
+    )
+
+    for linear in (False, True):
+        cs.default_strategy = cs.SolverStrategy()
+
+        problem = samples.dimensioned_grid(NX, NY)
+        all_vars = problem[3]
+
+        split_times = []
+        solver = build(
+            problem,
+            solve=False,
+            split_func=timed_split(split_times),
+            linear=linear,
+        )
+
+        t = timeit.default_timer()
+        solver.update()
+        t_solve = timeit.default_timer() - t - sum(split_times)
+        assert solver.is_satisfied()
+
+        # drag a dimension of the middle row back and forth
+        param = [
+            v for v in all_vars if isinstance(v, g2d.Parameter) and v.name == "dy0_15"
+        ][0]
+        val = param.val
+
+        t = timeit.default_timer()
+        for k in range(N_EDITS):
+            solver.modify_parameter(param, val * (1.0 + 0.1 * (k % 2)))
+            solver.update()
+        t_edit = (timeit.default_timer() - t) / N_EDITS
+        assert solver.is_satisfied()
+
+        counts = cs.default_strategy.counts
+        stats = solver.solver.linear.stats() if linear else {}
+
+        print(
+            "%7s %8d %8d %9d %10d %7.3fs %9d %8.4fs"
+            % (
+                linear,
+                counts["solves"],
+                counts["nfev"],
+                stats.get("factorizations", 0),
+                stats.get("reuses", 0),
+                t_solve,
+                N_EDITS,
+                t_edit,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compare dimensions given as SetVar-fixed vars against Parameters
+
+Builds generated linkage chains with their dimensions as vars fixed by
+`SetVar` constraints and as `Parameter`s, and reports the size of the
+solve graph, the number of numeric solves and the time for the initial
+solve and for re-solving after each dimension is changed
+"""
+
+import timeit
+
+from gcs import geom_solver as gs
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+from gcs import constraint_solver as cs
+
+
+def build(n_links, params):
+    geometry, variables, constraints, all_vars = samples.linkage_chain(
+        n_links, 0, params=params
+    )
+
+    solver = gs.GCS()
+
+    for g in geometry:
+        solver.add_geometry(g)
+
+    for v in variables:
+        solver.add_variable(v)
+
+    for c in constraints:
+        solver.add_constraint(c)
+
+    return solver, constraints, all_vars
+
+
+def main():
+    N_LINKS = 30
+
+    print(
+        "%-8s %6s %6s %8s %8s %8s %8s %8s %9s"
+        % (
+            "dims",
+            "vars",
+            "eqns",
+            "sets",
+            "solves",
+            "time",
+            "edits",
+            "solves",
+            "time",
+        )
+    )
+
+    for params in (False, True):
+        cs.default_strategy = cs.SolverStrategy()
+        solver, constraints, all_vars = build(N_LINKS, params)
+
+        t = timeit.default_timer()
+        solver.update()
+        t_solve = timeit.default_timer() - t
+        solves = cs.default_strategy.counts["solves"]
+
+        # change each length dimension by 1%, re-solving after each
+        if params:
+            dims = [
+                v
+                for v in all_vars
+                if isinstance(v, g2d.Parameter) and v.name.startswith("d")
+            ]
+            edits = [(solver.modify_parameter, v, v.val * 1.01) for v in dims]
+        else:
+            dims = [c for c in constraints if c.name.startswith("fd")]
+            edits = [(solver.modify_set_constraint, c, c.val * 1.01) for c in dims]
+
+        t = timeit.default_timer()
+        for modify, dim, val in edits:
+            modify(dim, val)
+            solver.update()
+        t_edit = timeit.default_timer() - t
+        edit_solves = cs.default_strategy.counts["solves"] - solves
+
+        print(
+            "%-8s %6d %6d %8d %8d %7.3fs %8d %8d %8.3fs"
+            % (
+                "param" if params else "SetVar",
+                len(solver.solver.vars),
+                len(solver.solver.eqns),
+                len(solver.solver.eqn_sets),
+                solves,
+                t_solve,
+                len(edits),
+                edit_solves,
+                t_edit,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -113,8 +113,11 @@ def main():
 
     fig = plt.figure()
 
+    # draw once, then only move the artists of geometry that changed
+    solver.render(fig.gca())
+    plt.axis("equal")
+
     def animate(f):
-        fig.clear()
         t = timeit.default_timer()
 
         solver.modify_set_constraint(constraints[2], (MAX * (f + 1)) / (N + 1))
@@ -126,8 +129,7 @@ def main():
         print(solver.is_satisfied())
         print("-----")
 
-        solver.plot()
-        plt.axis("equal")
+        solver.render()
 
     anim = animation.FuncAnimation(fig, animate, N, repeat=False)
     plt.show()
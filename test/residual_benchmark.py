@@ -0,0 +1,91 @@
+"""
+Compare checking a solved system eqn by eqn against a ResidualEngine
+
+Solves generated linkage chains and dimensioned grids, and times
+checking whether all equations are satisfied with one Python call per
+equation (with the equations' residual caches warm and cold) and with
+`Solver.residual_report`, which evaluates equations grouped by
+constraint kind (warm: no value changed since the last report, which
+is answered from the kept residuals; cold: every group evaluated)
+"""
+
+import timeit
+
+from gcs import sample_problems as samples
+from gcs.residuals import ResidualEngine
+
+from benchmark_tools import build
+
+
+def main():
+    N_CHECKS = 50
+    TOL = 1.0e-6
+
+    problems = [
+        ("chain 100", lambda: samples.linkage_chain(100, 1)),
+        ("grid 20x20", lambda: samples.dimensioned_grid(20, 20)),
+        ("grid 40x40", lambda: samples.dimensioned_grid(40, 40)),
+    ]
+
+    print(
+        "%-12s %6s %7s %7s %11s %11s %11s %11s %10s"
+        % (
+            "sketch",
+            "eqns",
+            "groups",
+            "others",
+            "loop warm",
+            "loop cold",
+            "engine warm",
+            "engine cold",
+            "max error",
+        )
+    )
+
+    for name, make in problems:
+        solver = build(make())
+        eqns = solver.solver.eqns
+
+        def loop():
+            return all(eqn.is_satisfied(TOL) for eqn in eqns)
+
+        def loop_cold():
+            for eqn in eqns:
+                eqn.invalidate()
+            return loop()
+
+        t_warm = timeit.timeit(loop, number=N_CHECKS) / N_CHECKS
+        t_cold = timeit.timeit(loop_cold, number=N_CHECKS) / N_CHECKS
+
+        solver.residual_report()  # group once
+        engine = solver.solver.residual_engine
+        assert isinstance(engine, ResidualEngine)
+
+        def engine_cold():
+            engine.versions = None
+            return solver.residual_report()
+
+        t_engine = timeit.timeit(solver.residual_report, number=N_CHECKS) / N_CHECKS
+        t_engine_cold = timeit.timeit(engine_cold, number=N_CHECKS) / N_CHECKS
+
+        R, max_error, violated = solver.residual_report()
+        assert loop() == (not violated)
+
+        print(
+            "%-12s %6d %7d %7d %9.2fms %9.2fms %9.2fms %9.2fms %10.1e"
+            % (
+                name,
+                len(eqns),
+                len(engine.groups),
+                len(engine.others),
+                1e3 * t_warm,
+                1e3 * t_cold,
+                1e3 * t_engine,
+                1e3 * t_engine_cold,
+                max_error,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
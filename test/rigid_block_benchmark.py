@@ -0,0 +1,140 @@
+"""
+Compare solving a row of brackets flat with solving them as rigid blocks
+
+For rows of generated brackets (see `samples.bracket_row`), builds one
+`GCS` with every bracket's geometry and constraints, and one in which
+each bracket is a `RigidBlock` (solved once on its own, and placed by
+three vars). Reports the number of eqns and vars of each solver, the
+time to build the blocks (their local solves), and the update times:
+the first one, after changing a dimension inside one bracket, and after
+changing the placement of one bracket, the size of the largest
+equation set, and the largest residual of the brackets' own
+constraints (which blocks no longer solve in the parent). When both
+solvers are satisfied, the speedups of blocks over flat solving follow
+(the first update counts the local solves of the blocks).
+"""
+
+import sys
+import timeit
+
+from gcs import geom_solver as gs
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+from gcs.rigid_block import RigidBlock
+
+
+def timed(f):
+    t = timeit.default_timer()
+    f()
+    return timeit.default_timer() - t
+
+
+def build(k, blocks):
+    brackets, constraints = samples.bracket_row(k)
+    solver = gs.GCS()
+    t_blocks = 0.0
+
+    # dimensions to edit: a length inside the first bracket, and its height
+    inner = brackets[0][1][0].d
+    height = constraints[2].d
+
+    block = None
+    for i, (geometry, bracket_constraints) in enumerate(brackets):
+        if blocks:
+            t = timeit.default_timer()
+            b = RigidBlock("B%d" % i, geometry, bracket_constraints)
+            t_blocks += timeit.default_timer() - t
+            solver.add_block(b)
+            block = block or b
+        else:
+            for g in geometry:
+                solver.add_geometry(g)
+            for c in bracket_constraints:
+                solver.add_constraint(c)
+
+    for c in constraints:
+        solver.add_constraint(c)
+
+    # (small edits: a bracket can't reach every height)
+    def edit_inner():
+        if blocks:
+            solver.modify_block_parameter(block, inner, 1.02 * inner.val)
+        else:
+            solver.modify_parameter(inner, 1.02 * inner.val)
+
+    def edit_height():
+        solver.modify_parameter(height, 0.9 * height.val)
+
+    return solver, brackets, t_blocks, edit_inner, edit_height
+
+
+def main(sizes):
+    # edits of dimensions stay on the same branch
+    g2d.lock_branches = True
+
+    print(
+        "%-9s %-7s %6s %6s %9s %9s %9s %9s %8s %9s %10s"
+        % (
+            "brackets",
+            "blocks",
+            "eqns",
+            "vars",
+            "local",
+            "first",
+            "inner",
+            "placement",
+            "largest",
+            "residual",
+            "satisfied",
+        )
+    )
+
+    for k in sizes:
+        times = {}
+        for blocks in (False, True):
+            solver, brackets, t_blocks, edit_inner, edit_height = build(k, blocks)
+
+            t_first = timed(solver.update)
+            edit_inner()
+            t_inner = timed(solver.update)
+            edit_height()
+            t_height = timed(solver.update)
+
+            largest = max(len(eqs.eqns) for eqs in solver.solver.eqn_sets)
+            residual = max(
+                abs(eqn())
+                for _, bracket_constraints in brackets
+                for c in bracket_constraints
+                for eqn in c.equations
+            )
+
+            print(
+                "%-9d %-7s %6d %6d %8.3fs %8.3fs %8.3fs %8.3fs %8d %9.1e %10s"
+                % (
+                    k,
+                    blocks,
+                    len(solver.solver.eqns),
+                    len(solver.solver.vars),
+                    t_blocks,
+                    t_first,
+                    t_inner,
+                    t_height,
+                    largest,
+                    residual,
+                    solver.is_satisfied(),
+                )
+            )
+
+            if solver.is_satisfied():
+                times[blocks] = (t_blocks + t_first, t_inner, t_height)
+
+        if len(times) == 2:
+            speedups = [flat / block for flat, block in zip(times[False], times[True])]
+            print(
+                "%-9d %-7s %6s %6s %9s %8.1fx %8.1fx %8.1fx"
+                % ((k, "speedup", "", "", "") + tuple(speedups))
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10, 40])
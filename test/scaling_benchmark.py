@@ -0,0 +1,78 @@
+"""
+Compare numeric solving with and without automatic scaling
+
+Solves generated linkage chains at several length scales and reports
+function evaluations (iterations), fallback rates and failures of
+`solve_numeric` for unscaled and scaled solving, and how many scaled
+solves only succeeded unscaled
+"""
+
+import timeit
+
+from gcs import sample_problems as samples
+from gcs import constraint_solver as cs
+
+from benchmark_tools import build
+
+
+def solve_all(n_links, n_sketches, scale, noise):
+    """Solve a batch of generated sketches, returning (satisfied, seconds)"""
+    satisfied = 0
+    t = timeit.default_timer()
+
+    for seed in range(n_sketches):
+        solver = build(
+            samples.linkage_chain(n_links, seed, scale=scale, noise=noise)
+        )
+        satisfied += solver.is_satisfied()
+
+    return satisfied, timeit.default_timer() - t
+
+
+def main():
+    N_LINKS = 10
+    N_SKETCHES = 40
+    NOISE = 0.1
+
+    print(
+        "%8s %6s %9s %8s %8s %10s %9s %9s %8s"
+        % (
+            "length",
+            "scaled",
+            "satisfied",
+            "solves",
+            "nfev",
+            "fallbacks",
+            "unscaled",
+            "failures",
+            "time",
+        )
+    )
+
+    for length in (0.01, 1.0, 100.0, 1000.0):
+        for scaled in (False, True):
+            # solve_eqn_set uses the default strategy
+            cs.default_strategy = cs.SolverStrategy(scale=scaled)
+
+            satisfied, t = solve_all(N_LINKS, N_SKETCHES, length, NOISE)
+            counts = cs.default_strategy.counts
+
+            print(
+                "%8g %6s %6d/%-2d %8d %8d %9.1f%% %9d %9d %7.2fs"
+                % (
+                    length,
+                    scaled,
+                    satisfied,
+                    N_SKETCHES,
+                    counts["solves"],
+                    counts["nfev"],
+                    100.0 * counts["fallbacks"] / max(counts["solves"], 1),
+                    counts["unscaled"],
+                    counts["failures"],
+                    t,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
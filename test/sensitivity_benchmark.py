@@ -0,0 +1,102 @@
+"""
+Compare previewing dimension changes with `GCS.preview` to updating
+
+For generated sketches, picks the parameter that moves the most vars
+(from `GCS.derivatives` with respect to all parameters at once), and
+changes it by growing steps. For each step, times the linearized
+preview (the first one computes the Jacobians of the affected equation
+sets, later ones reuse them) and a real update, and reports how far
+the previewed values are from the solved ones next to the preview's
+own error estimate (largest residual at the previewed values)
+"""
+
+import timeit
+
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+
+from benchmark_tools import build
+
+
+def main():
+    # edits of dimensions stay on the same branch
+    g2d.lock_branches = True
+
+    problems = [
+        ("chain 100", lambda: samples.linkage_chain(100, 1, params=True)),
+        ("grid 20x20", lambda: samples.dimensioned_grid(20, 20)),
+    ]
+
+    print(
+        "%-12s %-6s %6s %6s %9s %9s %9s %9s %9s"
+        % (
+            "sketch",
+            "param",
+            "step",
+            "moved",
+            "first",
+            "preview",
+            "update",
+            "dev",
+            "error",
+        )
+    )
+
+    for name, make in problems:
+        solver = build(make())
+
+        params = sorted(
+            set(
+                p for c in solver.constraints for eqn in c.equations for p in eqn.params
+            ),
+            key=lambda p: p.name,
+        )
+        derivatives = solver.derivatives(params)
+        moved = [0] * len(params)
+        for row in derivatives.values():
+            for k, d in enumerate(row):
+                moved[k] += d != 0.0
+        param = params[moved.index(max(moved))]
+
+        val = param.val
+        for step in (1e-3, 1e-2, 5e-2):
+            changes = {param: val * (1.0 + step)}
+
+            # values are unchanged, so only the first preview linearizes
+            solver.solver.sensitivity = None
+            t = timeit.default_timer()
+            solver.preview(changes)
+            t_first = timeit.default_timer() - t
+
+            t = timeit.default_timer()
+            values, error = solver.preview(changes)
+            t_preview = timeit.default_timer() - t
+
+            t = timeit.default_timer()
+            solver.modify_parameter(param, changes[param])
+            solver.update()
+            t_update = timeit.default_timer() - t
+
+            dev = max(abs(var.val - x) for var, x in values.items())
+
+            print(
+                "%-12s %-6s %5.1f%% %6d %8.4fs %8.4fs %8.4fs %9.1e %9.1e"
+                % (
+                    name,
+                    param.name,
+                    100 * step,
+                    len(values),
+                    t_first,
+                    t_preview,
+                    t_update,
+                    dev,
+                    error,
+                )
+            )
+
+            solver.modify_parameter(param, val)
+            solver.update()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Stream generated sketches through JSON-lines files
+
+Writes dimensioned grids of increasing size to sketch files, imports
+them into a GCS line by line with `gcs.sketch_io.load_sketch`, solves
+them and streams the solved values back out. Reports file sizes, times
+and the peak memory of the import next to the memory of the model it
+built
+"""
+
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+from gcs import geom_solver as gs
+from gcs import sample_problems as samples
+from gcs import sketch_io
+
+
+def main():
+    print(
+        "%-10s %9s %8s %9s %9s %9s %9s %9s"
+        % ("grid", "elements", "file", "write", "import", "model", "peak", "values")
+    )
+
+    tmp = tempfile.mkdtemp()
+
+    for n in (10, 30, 60):
+        path = os.path.join(tmp, "grid%d.jsonl" % n)
+
+        geometry, variables, constraints, all_vars = samples.dimensioned_grid(n, n)
+        t = timeit.default_timer()
+        with open(path, "w") as f:
+            sketch_io.write_sketch(f, geometry, variables, constraints)
+        t_write = timeit.default_timer() - t
+        del geometry, variables, constraints, all_vars
+
+        tracemalloc.start()
+        t = timeit.default_timer()
+        solver = gs.GCS()
+        with open(path) as f:
+            n_elements = sketch_io.load_sketch(f, solver)
+        t_import = timeit.default_timer() - t
+        model, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        solver.update()
+        t = timeit.default_timer()
+        with open(path + ".values", "w") as f:
+            sketch_io.write_values(f, solver.solver.vars)
+        t_values = timeit.default_timer() - t
+
+        print(
+            "%-10s %9d %6.1fMB %8.3fs %8.3fs %7.1fMB %7.1fMB %8.3fs"
+            % (
+                "%dx%d" % (n, n),
+                n_elements,
+                os.path.getsize(path) / 1e6,
+                t_write,
+                t_import,
+                model / 1e6,
+                peak / 1e6,
+                t_values,
+            )
+        )
+
+        os.remove(path)
+        os.remove(path + ".values")
+
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
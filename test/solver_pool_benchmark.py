@@ -0,0 +1,74 @@
+"""
+Measure the throughput of a SolverPool with a growing number of workers
+
+Loads a number of generated sketches (see `samples.linkage_chain`) as
+documents of a `LocalSolverPool` and of `SolverPool`s with 1, 2, 4, ...
+worker processes (up to the number of cores), then edits a dimension of
+every document and updates it, a few rounds in a row, with the requests
+of all documents in flight together. Reports the load time, the update
+throughput and its speedup over the in-process pool, and whether every
+document ended up satisfied.
+"""
+
+import os
+import sys
+import timeit
+
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+from gcs.solver_pool import LocalSolverPool, SolverPool
+
+
+def run(pool, n_docs, n_links, rounds):
+    t = timeit.default_timer()
+    loads = [
+        pool.load(i, samples.linkage_chain, n_links, i, 100.0, 0.05, True)
+        for i in range(n_docs)
+    ]
+    for future in loads + [pool.update(i) for i in range(n_docs)]:
+        future.result()
+    t_load = timeit.default_timer() - t
+
+    t = timeit.default_timer()
+    for k in range(rounds):
+        for i in range(n_docs):
+            pool.modify(i, "d1", 100.0 + k)
+        updates = [pool.update(i) for i in range(n_docs)]
+        satisfied = sum(future.result() for future in updates)
+    t_updates = timeit.default_timer() - t
+
+    return t_load, n_docs * rounds / t_updates, satisfied
+
+
+def main(n_docs=32, n_links=40, rounds=5):
+    # edits of dimensions stay on the same branch
+    g2d.lock_branches = True
+
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+
+    print("%d documents of %d links, %d cores" % (n_docs, n_links, os.cpu_count()))
+    print(
+        "%-8s %9s %11s %8s %10s"
+        % ("workers", "load", "updates/s", "speedup", "satisfied")
+    )
+
+    with LocalSolverPool() as pool:
+        t_load, local, satisfied = run(pool, n_docs, n_links, rounds)
+    print(
+        "%-8s %8.3fs %11.1f %8.2f %7d/%d"
+        % ("local", t_load, local, 1.0, satisfied, n_docs)
+    )
+
+    for n in workers:
+        with SolverPool(n) as pool:
+            t_load, throughput, satisfied = run(pool, n_docs, n_links, rounds)
+        print(
+            "%-8d %8.3fs %11.1f %8.2f %7d/%d"
+            % (n, t_load, throughput, throughput / local, satisfied, n_docs)
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,120 @@
+"""
+Benchmark the grid spatial index against linear scans over 100k entities
+"""
+
+import random
+import timeit
+
+from gcs import geom2d
+from gcs.spatial_index import GridIndex
+
+
+def make_geometry(n, size, rng):
+    """Random mix of points, line segments and circles in a square"""
+    geometry = []
+
+    for i in range(n):
+        x, y = rng.uniform(0.0, size), rng.uniform(0.0, size)
+        kind = i % 3
+
+        if kind == 0:
+            geometry.append(geom2d.Point("p%d" % i, x, y))
+        elif kind == 1:
+            geometry.append(
+                geom2d.LineSegment(
+                    "L%d" % i, x, y, x + rng.uniform(-5, 5), y + rng.uniform(-5, 5)
+                )
+            )
+        else:
+            geometry.append(geom2d.Circle("c%d" % i, x, y, rng.uniform(0.1, 3.0)))
+
+    return geometry
+
+
+def main():
+    N = 100000
+    SIZE = 1000.0
+    N_QUERIES = 100
+
+    rng = random.Random(0)
+    geometry = make_geometry(N, SIZE, rng)
+    queries = [(rng.uniform(0, SIZE), rng.uniform(0, SIZE)) for _ in range(N_QUERIES)]
+
+    # -----------------------------------------------------
+    # build
+    # -----------------------------------------------------
+
+    index = GridIndex(cell_size=5.0)
+
+    t = timeit.default_timer()
+    for g in geometry:
+        index.insert(g)
+    print("build:          %8.3f s" % (timeit.default_timer() - t))
+
+    # -----------------------------------------------------
+    # queries: index vs linear scan
+    # -----------------------------------------------------
+
+    def scan_nearest(x, y):
+        return min(geometry, key=lambda g: g.distance(x, y))
+
+    def scan_radius(x, y, r):
+        return [g for g in geometry if g.distance(x, y) <= r]
+
+    def scan_rect(x0, y0, x1, y1):
+        found = []
+        for g in geometry:
+            bx0, by0, bx1, by1 = g.bbox()
+            if bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1:
+                found.append(g)
+        return found
+
+    cases = (
+        ("nearest", lambda x, y: index.nearest(x, y)[0], scan_nearest),
+        (
+            "radius",
+            lambda x, y: index.within_radius(x, y, 10.0),
+            lambda x, y: scan_radius(x, y, 10.0),
+        ),
+        (
+            "rect",
+            lambda x, y: index.in_rect(x, y, x + 20.0, y + 20.0),
+            lambda x, y: scan_rect(x, y, x + 20.0, y + 20.0),
+        ),
+    )
+
+    for name, query, scan in cases:
+        t = timeit.default_timer()
+        for x, y in queries:
+            query(x, y)
+        t_index = (timeit.default_timer() - t) / N_QUERIES
+
+        # the linear scan is slow, only time a few queries
+        t = timeit.default_timer()
+        for x, y in queries[:5]:
+            scan(x, y)
+        t_scan = (timeit.default_timer() - t) / 5
+
+        print(
+            "%-8s index: %10.6f s   scan: %10.6f s   (x%.0f)"
+            % (name, t_index, t_scan, t_scan / t_index)
+        )
+
+    # -----------------------------------------------------
+    # refresh after 1% of the geometry moved
+    # -----------------------------------------------------
+
+    moved = rng.sample(geometry, N // 100)
+    changed_vars = set()
+    for g in moved:
+        for var in g.vars:
+            var.val += rng.uniform(-10.0, 10.0)
+            changed_vars.add(var)
+
+    t = timeit.default_timer()
+    index.refresh(changed_vars)
+    print("refresh (1%%):   %8.3f s" % (timeit.default_timer() - t))
+
+
+if __name__ == "__main__":
+    main()
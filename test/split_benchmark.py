@@ -0,0 +1,126 @@
+"""
+Compare the decompositions of the registered equation set splitters
+
+Runs every split function in `SPLIT_FUNCS` on the same problems: the
+sample problem2, generated sketches, and sketch files given on the
+command line (see `gcs.sketch_io`). For each, reports the split time,
+the peak memory allocated while splitting, the number of equation sets,
+the size of the largest set (in eqns, which drives the numeric cost),
+the time to solve the decomposition, and whether the result satisfies
+all equations.
+
+Usage: python test/split_benchmark.py [sketch.jsonl ...]
+"""
+
+import sys
+import timeit
+import tracemalloc
+
+from gcs import geom2d as g2d
+from gcs import sample_problems as samples
+from gcs import equation_solving as es
+from gcs import eqn_set_splitting_proto as proto
+from gcs import sketch_io
+
+from benchmark_tools import build
+
+# name -> split function (`split_func(eqn_set)` -> set of equation sets)
+SPLIT_FUNCS = {
+    "bitset": es.split_equation_set_bitset,
+    "pq": es.split_equation_set,
+    "proto v1": proto.split_equation_set_v1,
+    "proto v2": proto.split_equation_set_v2,
+    "proto v3": proto.split_equation_set_v3,
+    "coupled": lambda eqn_set: es.coupled_eqn_sets(eqn_set.eqns),
+}
+
+
+def measured(split_func, results, trace):
+    """Split function that records its time (or peak memory if `trace`)"""
+
+    def split(eqn_set):
+        if trace:
+            tracemalloc.start()
+
+        t = timeit.default_timer()
+        eqn_sets = split_func(eqn_set)
+        results["split"] += timeit.default_timer() - t
+
+        if trace:
+            results["peak"] = max(results["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        return eqn_sets
+
+    return split
+
+
+def run(problem, split_func, trace=False):
+    results = {"split": 0.0, "peak": 0}
+
+    solver = build(
+        problem(), solve=False, split_func=measured(split_func, results, trace)
+    )
+
+    t = timeit.default_timer()
+    solver.update()
+    results["solve"] = timeit.default_timer() - t - results["split"]
+
+    eqn_sets = solver.solver.eqn_sets
+    results["sets"] = len(eqn_sets)
+    results["largest"] = max((len(eqn_set.eqns) for eqn_set in eqn_sets), default=0)
+    results["satisfied"] = solver.is_satisfied()
+
+    return results
+
+
+def main(paths):
+    # generated dimensions stay on the same branch
+    g2d.lock_branches = True
+
+    problems = [
+        ("problem2", samples.problem2),
+        ("chain 20", lambda: samples.linkage_chain(20, 1, params=True)),
+        ("chain 60", lambda: samples.linkage_chain(60, 1, params=True)),
+        ("grid 8x8", lambda: samples.dimensioned_grid(8, 8)),
+        ("grid 15x15", lambda: samples.dimensioned_grid(15, 15)),
+    ]
+    for path in paths:
+        problems.append((path, lambda path=path: sketch_io.read_problem(path)))
+
+    print(
+        "%-12s %-9s %9s %9s %6s %8s %9s %10s"
+        % (
+            "problem",
+            "splitter",
+            "split",
+            "peak",
+            "sets",
+            "largest",
+            "solve",
+            "satisfied",
+        )
+    )
+
+    for name, problem in problems:
+        for split_name, split_func in SPLIT_FUNCS.items():
+            results = run(problem, split_func)
+            results["peak"] = run(problem, split_func, trace=True)["peak"]
+
+            print(
+                "%-12s %-9s %8.3fs %7.2fMB %6d %8d %8.3fs %10s"
+                % (
+                    name,
+                    split_name,
+                    results["split"],
+                    results["peak"] / 1e6,
+                    results["sets"],
+                    results["largest"],
+                    results["solve"],
+                    results["satisfied"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""
+Compare a fixed method chain with a learning solver strategy
+
+Solves generated linkage chains with a `SolverStrategy` given to the
+solver (`GCS(strategy=...)`) whose chain starts with a method that is
+a poor fit for these equation sets. Runs the fixed chain, a learning
+strategy starting from an empty table, and a learning strategy loaded
+from the table the second run saved, and reports attempts, fallbacks
+and function evaluations of each, and the method order the learned
+table gives the most common set signature
+"""
+
+import os
+import tempfile
+import timeit
+
+from gcs import sample_problems as samples
+from gcs import constraint_solver as cs
+
+from benchmark_tools import build
+
+
+METHODS = ("df-sane", "hybr", "lm")
+BUDGETS = {"df-sane": 200}
+
+
+def solve_all(strategy, n_links, n_sketches):
+    """Solve a batch of generated sketches, returning (satisfied, seconds)"""
+    satisfied = 0
+    t = timeit.default_timer()
+
+    for seed in range(n_sketches):
+        solver = build(
+            samples.linkage_chain(n_links, seed, noise=0.1), strategy=strategy
+        )
+        satisfied += solver.is_satisfied()
+
+    return satisfied, timeit.default_timer() - t
+
+
+def main():
+    N_LINKS = 10
+    N_SKETCHES = 40
+
+    print(
+        "%8s %9s %8s %9s %10s %8s %8s"
+        % ("strategy", "satisfied", "solves", "attempts", "fallbacks", "nfev", "time")
+    )
+
+    path = os.path.join(tempfile.mkdtemp(), "strategy.json")
+    learned = None
+
+    for name in ("fixed", "learning", "loaded"):
+        strategy = cs.SolverStrategy(METHODS, BUDGETS, learn=name != "fixed")
+        if name == "loaded":
+            strategy.load(path)
+
+        satisfied, t = solve_all(strategy, N_LINKS, N_SKETCHES)
+        counts = strategy.counts
+
+        if name == "learning":
+            strategy.save(path)
+            learned = strategy
+
+        print(
+            "%8s %6d/%-2d %8d %9d %10d %8d %7.2fs"
+            % (
+                name,
+                satisfied,
+                N_SKETCHES,
+                counts["solves"],
+                counts["attempts"],
+                counts["fallbacks"],
+                counts["nfev"],
+                t,
+            )
+        )
+
+    # method order of the most attempted signature
+    def attempts(sig):
+        return sum(n_s + n_f for n_s, n_f, _ in learned.table[sig].values())
+
+    sig = max(learned.table, key=attempts)
+    print()
+    print("chain order:   %s" % ", ".join(METHODS))
+    print("learned order: %s (for %s)" % (", ".join(learned.order(sig)), sig))
+
+
+if __name__ == "__main__":
+    main()